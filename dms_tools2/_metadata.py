@@ -1,4 +1,4 @@
-__version__ = '2.6.4'
+__version__ = '2.6.5'
 __author__ = '`the Bloom Lab <https://github.com/jbloomlab/dms_tools2/graphs/contributors>`_'
 __url__ = 'http://jbloomlab.github.io/dms_tools2'
 __author_email__ = 'jbloom@fredhutch.org'
@@ -17,10 +17,15 @@ import functools
 import subprocess
 import tempfile
 import collections
+import collections.abc
 import random
+import copy
+import operator
+import multiprocessing
 
 import packaging.version
 import numpy
+import pandas
 import Bio.SeqIO
 
 from dms_tools2 import NTS
@@ -138,6 +143,153 @@ def checkAlignment(a, target, query):
         return True
 
 
+class AlignmentTable:
+    """Compact struct-of-arrays storage for many :class:`Alignment`.
+
+    Storing one :class:`Alignment` per row in a pandas object column
+    (as done by :meth:`dms_tools2.pacbio.alignSeqs`) costs a Python
+    tuple, several int objects, the CIGAR string, and a list for
+    `additional` for every query. This class instead holds:
+
+        - the numeric fields in typed numpy arrays,
+        - target names interned once, with an integer code per row,
+        - all CIGAR strings concatenated into a single string arena
+          indexed by an array of offsets,
+        - any additional alignments in a nested :class:`AlignmentTable`
+          indexed by another array of offsets.
+
+    Missing alignments (`None`) are allowed and are returned as `None`.
+
+    Args:
+        `alignments` (iterable)
+            :class:`Alignment` objects or `None`.
+
+    Attributes:
+        `targets` (list)
+            Interned target names; `target_codes` indexes into this.
+        `target_codes` (numpy array)
+            Code of target for each row, or -1 if `None`.
+        `r_st`, `r_en`, `r_len`, `q_st`, `q_en`, `q_len`, `strand`, `score`
+            Numpy arrays with these :class:`Alignment` fields.
+        `cigar_arena` (str)
+            All CIGAR strings concatenated.
+        `cigar_offsets` (numpy array)
+            CIGAR of row `i` is `cigar_arena[cigar_offsets[i] :
+            cigar_offsets[i + 1]]`.
+        `additional` (:class:`AlignmentTable` or `None`)
+            Table of all additional alignments, or `None` if there
+            are no additional alignments.
+        `additional_offsets` (numpy array)
+            Additional alignments for row `i` are rows
+            `additional_offsets[i]` to `additional_offsets[i + 1]`
+            of `additional`.
+
+    Example:
+
+    >>> a1 = Alignment(target='t1', r_st=0, r_en=4, r_len=4, q_st=0,
+    ...         q_en=4, q_len=4, strand=1, cigar_str='=AT*ag=C',
+    ...         additional=[], score=5)
+    >>> a2 = a1._replace(target='t2', cigar_str='=ATGC', score=8,
+    ...         additional=[a1])
+    >>> table = AlignmentTable([a1, None, a2])
+    >>> len(table)
+    3
+    >>> table.targets
+    ['t1', 't2']
+    >>> table.target_codes
+    array([ 0, -1,  1])
+    >>> table.cigar_arena
+    '=AT*ag=C=ATGC'
+    >>> table[1] is None
+    True
+    >>> table[0] == a1
+    True
+    >>> table[2] == a2
+    True
+    >>> list(table) == [a1, None, a2]
+    True
+    >>> table[-1] == a2
+    True
+    >>> table[3]
+    Traceback (most recent call last):
+    ...
+    IndexError: AlignmentTable index out of range
+    """
+
+    _INT_FIELDS = ['r_st', 'r_en', 'r_len', 'q_st', 'q_en', 'q_len',
+                   'strand', 'score']
+
+    def __init__(self, alignments):
+        """See main class doc string."""
+        alignments = list(alignments)
+        n = len(alignments)
+        target_index = {}
+        self.targets = []
+        self.target_codes = numpy.full(n, -1, dtype='int')
+        ints = {f:numpy.zeros(n, dtype='int') for f in self._INT_FIELDS}
+        cigars = []
+        self.cigar_offsets = numpy.zeros(n + 1, dtype='int')
+        additional = []
+        self.additional_offsets = numpy.zeros(n + 1, dtype='int')
+        for i, a in enumerate(alignments):
+            if a is not None:
+                if a.target not in target_index:
+                    target_index[a.target] = len(self.targets)
+                    self.targets.append(sys.intern(a.target))
+                self.target_codes[i] = target_index[a.target]
+                for f in self._INT_FIELDS:
+                    ints[f][i] = getattr(a, f)
+                cigars.append(a.cigar_str)
+                additional += a.additional
+                self.cigar_offsets[i + 1] = len(a.cigar_str)
+                self.additional_offsets[i + 1] = len(a.additional)
+        for f, arr in ints.items():
+            setattr(self, f, arr)
+        self.cigar_offsets = numpy.cumsum(self.cigar_offsets)
+        self.additional_offsets = numpy.cumsum(self.additional_offsets)
+        self.cigar_arena = ''.join(cigars)
+        if additional:
+            self.additional = AlignmentTable(additional)
+        else:
+            self.additional = None
+
+    def __len__(self):
+        return len(self.target_codes)
+
+    def __getitem__(self, i):
+        """Gets :class:`Alignment` (or `None`) for row `i`.
+
+        Negative `i` counts from the end, as for a list.
+        """
+        n = len(self)
+        i = operator.index(i)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError('AlignmentTable index out of range')
+        code = self.target_codes[i]
+        if code < 0:
+            return None
+        i_add, j_add = self.additional_offsets[i : i + 2]
+        return Alignment(
+                target=self.targets[code],
+                r_st=int(self.r_st[i]),
+                r_en=int(self.r_en[i]),
+                r_len=int(self.r_len[i]),
+                q_st=int(self.q_st[i]),
+                q_en=int(self.q_en[i]),
+                q_len=int(self.q_len[i]),
+                strand=int(self.strand[i]),
+                cigar_str=self.cigar_arena[self.cigar_offsets[i] :
+                                           self.cigar_offsets[i + 1]],
+                additional=[self.additional[j] for j in
+                            range(i_add, j_add)],
+                score=int(self.score[i]))
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+
 class Mutations:
     """Class to hold mutations.
 
@@ -858,13 +1010,127 @@ class MutationCaller:
                   in coordinates of the chromosome, which is "fluNS".
                 - "fluNS-del11to13" for deletion.
         """
+        return Mutations(**self._mutationTuples(a, qvals))
+
+
+    def callTable(self, alignments, qvals=None, *, names=None, ncpus=1):
+        """Call mutations in many alignments, return long data frame.
+
+        Gives the same mutations as :meth:`MutationCaller.call`, but
+        rather than creating a :class:`Mutations` object for each
+        alignment returns all mutations as rows of one data frame.
+        The alignments can be processed in parallel.
+
+        Args:
+            `alignments` (list-like)
+                :class:`Alignment` objects, or `None` for queries
+                that did not align (these have no mutations).
+            `qvals` (`None` or list-like)
+                If not `None`, numpy arrays of Q-values for each
+                query in `alignments`, as for :meth:`MutationCaller.call`.
+            `names` (`None` or list-like)
+                Names for the queries in `alignments`; by default they
+                are numbered 0, 1, ...
+            `ncpus` (int)
+                Number of processes used to call the mutations.
+
+        Returns:
+            A pandas DataFrame with a row for each mutation and columns:
+
+                - "name": name of query with mutation
+                - "mutation_type": "substitution", "insertion", or
+                  "deletion"
+                - "site": site of mutation, as from
+                  :meth:`Mutations.substitutions` (with
+                  `returnval='site'`) and the related methods
+                - "mutation": mutation string named as for
+                  :meth:`MutationCaller.call`
+                - "wildtype" and "mutant": for substitutions, the
+                  wildtype and mutant nucleotides, otherwise empty
+                - "accuracy": accuracy computed from Q-values, or
+                  `nan` if not known
+                - "homopolymer_length": homopolymer length for indels,
+                  `nan` for substitutions
+
+            Within each query, rows are substitutions, insertions, then
+            deletions, each ordered by site.
+
+        >>> with tempfile.NamedTemporaryFile(mode='w') as targetfile:
+        ...         _ = targetfile.write('>target\\nATGCATGGATCGAAT')
+        ...         targetfile.flush()
+        ...         mapper = Mapper(targetfile.name, OPTIONS_CODON_DMS)
+        >>> a = Alignment(q_st=2, q_en=14, q_len=14, strand=1,
+        ...         r_st=0, r_en=12, r_len=15, score=16, target='target',
+        ...         cigar_str='=ATG*ca=A*tc=G-aa=T+at=C*gt', additional=[])
+        >>> qvals = numpy.array([50, 50, 1, 2, 3, 4, 5, 6, 7, 10, 50, 50, 11, 12])
+        >>> mutcaller = MutationCaller(mapper)
+        >>> df = mutcaller.callTable([a, None], [qvals, None],
+        ...                          names=['read1', 'read2'])
+        >>> df[['name', 'mutation_type', 'site', 'mutation', 'wildtype',
+        ...     'mutant']]
+            name mutation_type  site   mutation wildtype mutant
+        0  read1  substitution     4        C4A        C      A
+        1  read1  substitution     6        T6C        T      C
+        2  read1  substitution    12       G12T        G      T
+        3  read1     insertion     1   ins1len2                
+        4  read1     insertion    11  ins11len2                
+        5  read1      deletion     8    del8to9                
+        6  read1      deletion    13  del13to15                
+        >>> muts = mutcaller.call(a, qvals)
+        >>> numpy.allclose(df.accuracy, muts.substitutions(returnval='accuracy')
+        ...         + muts.insertions(returnval='accuracy')
+        ...         + muts.deletions(returnval='accuracy'), equal_nan=True)
+        True
+        """
+        alignments = list(alignments)
+        n = len(alignments)
+        if qvals is None:
+            qvals = [None] * n
+        else:
+            qvals = list(qvals)
+        if names is None:
+            names = list(range(n))
+        else:
+            names = list(names)
+        if not (len(qvals) == len(names) == n):
+            raise ValueError("`alignments`, `qvals`, `names` differ in length")
+
+        ncpus = max(1, min(ncpus, multiprocessing.cpu_count(), n))
+        if ncpus == 1:
+            cols = _callTableChunk(self, alignments, qvals, names)
+        else:
+            bounds = numpy.linspace(0, n, ncpus + 1).astype('int')
+            chunks = [(self, alignments[i : j], qvals[i : j], names[i : j])
+                      for i, j in zip(bounds[ : -1], bounds[1 : ])]
+            with multiprocessing.Pool(ncpus) as pool:
+                results = pool.starmap(_callTableChunk, chunks)
+            cols = {c:[x for r in results for x in r[c]] for c in
+                    results[0]}
+
+        return pandas.DataFrame(cols, columns=_MUTATION_TABLE_COLS)
+
+
+    def _mutationTuples(self, a, qvals):
+        """Tuples to initialize :class:`Mutations` for :meth:`call`."""
+
+        if qvals is not None:
+            # query site aligned to each target site, built once per call
+            t_to_q = targetToQueryMap(a)
+
+        def _query_index(i):
+            """Index in query aligned to target `i`, or `None`."""
+            i -= self.targetindex
+            if i < a.r_st or i >= a.r_en or t_to_q[i] < 0:
+                return None
+            else:
+                return int(t_to_q[i])
 
         def _get_qval(i):
             """Q-value for site aligning to target `i`."""
             if qvals is None:
                 return math.nan
             else:
-                j = iTargetToQuery(a, i - self.targetindex)
+                j = _query_index(i)
                 if j is None:
                     return math.nan
                 else:
@@ -922,7 +1188,7 @@ class MutationCaller:
                 if qvals is None:
                     i_qvals = None
                 else:
-                    i = iTargetToQuery(a, itarget - self.targetindex)
+                    i = _query_index(itarget)
                     if i is None:
                         i_qvals = None
                     else:
@@ -1042,9 +1308,66 @@ class MutationCaller:
             deletion_tuples = new_deletion_tuples
 
 
-        return Mutations(substitution_tuples=substitution_tuples,
-                         insertion_tuples=insertion_tuples,
-                         deletion_tuples=deletion_tuples)
+        return {'substitution_tuples':substitution_tuples,
+                'insertion_tuples':insertion_tuples,
+                'deletion_tuples':deletion_tuples}
+
+
+#: columns in data frame returned by :meth:`MutationCaller.callTable`
+_MUTATION_TABLE_COLS = ['name', 'mutation_type', 'site', 'mutation',
+                        'wildtype', 'mutant', 'accuracy',
+                        'homopolymer_length']
+
+#: matches indels named by :class:`MutationCaller`
+_INDEL_MATCH = re.compile(r'^(?:ins(?P<ins_site>\d+)len(?P<ins_len>\d+)|'
+                          r'del(?P<del_start>\d+)to(?P<del_end>\d+))$')
+
+#: matches wildtype and mutant nucleotide in substitution string
+_SUBSTITUTION_NTS_MATCH = re.compile(r'^(?:.*-)?([A-Z])\d+([A-Z])(?:_|$)')
+
+
+def _callTableChunk(mutationcaller, alignments, qvals, names):
+    """Columns of :meth:`MutationCaller.callTable` for some alignments."""
+    cols = {c:[] for c in _MUTATION_TABLE_COLS}
+    sub_q = []
+    sub_rows = []
+    for a, q, name in zip(alignments, qvals, names):
+        if a is None:
+            continue
+        tuples = mutationcaller._mutationTuples(a, q)
+        for i, mut_str, qi in sorted(tuples['substitution_tuples']):
+            m = _SUBSTITUTION_NTS_MATCH.match(mut_str)
+            assert m, "can't match {0}".format(mut_str)
+            sub_rows.append(len(cols['name']))
+            sub_q.append(qi)
+            for c, val in [('name', name), ('mutation_type', 'substitution'),
+                           ('site', i), ('mutation', mut_str),
+                           ('wildtype', m.group(1)), ('mutant', m.group(2)),
+                           ('accuracy', math.nan),
+                           ('homopolymer_length', math.nan)]:
+                cols[c].append(val)
+        for i, _, mut_str, qs, hplen in sorted(tuples['insertion_tuples']):
+            for c, val in [('name', name), ('mutation_type', 'insertion'),
+                           ('site', i), ('mutation', mut_str),
+                           ('wildtype', ''), ('mutant', ''),
+                           ('accuracy',
+                            dms_tools2.pacbio.qvalsToAccuracy(qs)),
+                           ('homopolymer_length', hplen)]:
+                cols[c].append(val)
+        for istart, _, mut_str, qi, hplen in sorted(tuples['deletion_tuples']):
+            for c, val in [('name', name), ('mutation_type', 'deletion'),
+                           ('site', istart), ('mutation', mut_str),
+                           ('wildtype', ''), ('mutant', ''),
+                           ('accuracy',
+                            dms_tools2.pacbio.qvalsToAccuracy(qi)),
+                           ('homopolymer_length', hplen)]:
+                cols[c].append(val)
+    # substitutions are most common, so compute their accuracies at once
+    if sub_rows:
+        acc = 1 - 10**(numpy.array(sub_q, dtype='float') / -10)
+        for irow, acc_i in zip(sub_rows, acc):
+            cols['accuracy'][irow] = acc_i
+    return cols
 
 
 class MutationConsensus:
@@ -1432,6 +1755,179 @@ class MutationConsensus:
         return ' '.join(mutlist)
 
 
+    def callConsensusTable(self, mutations, nseqs, mutation_type, *,
+            barcode_col='barcode', include_stats=False):
+        """Calls consensus for many barcodes from long data frame.
+
+        Gives the same result as calling :meth:`MutationConsensus.callConsensus`
+        separately for the sequences of each barcode, but does the
+        calling for all barcodes at once with grouped operations.
+
+        Args:
+            `mutations` (pandas DataFrame)
+                Mutations of type `mutation_type`, with a row for each
+                mutation in each sequence. Must have columns named
+                `barcode_col`, "mutation", and "accuracy" (which can
+                be `nan`). For indels, can also have a column
+                "homopolymer_length" (otherwise all homopolymer lengths
+                are unknown). Indels must be named as by
+                :class:`MutationCaller` (e.g., "ins5len2" or "del8to9").
+                Rows for each barcode should be ordered by sequence and
+                then by site, as in the output of
+                :meth:`MutationCaller.callTable`.
+            `nseqs` (dict or pandas Series)
+                Number of sequences for each barcode, including
+                sequences without mutations.
+            `mutation_type` (str)
+                Type of mutation to call. Should be one of
+                'substitutions', 'insertions', or 'deletions'.
+            `barcode_col` (str)
+                Column in `mutations` giving the barcode.
+            `include_stats` (bool)
+                As for :meth:`MutationConsensus.callConsensus`.
+
+        Returns:
+            A pandas DataFrame with columns named `barcode_col` and
+            "consensus", with a row for each barcode in `nseqs`. The
+            consensus is the string that would be returned by
+            :meth:`MutationConsensus.callConsensus`.
+
+        >>> mutcons = MutationConsensus()
+        >>> mutations = pandas.DataFrame.from_records(
+        ...         [('bc1', 'A1G', 0.9999), ('bc1', 'A1G', 0.9999),
+        ...          ('bc1', 'T2A', 0.9999), ('bc2', 'A1G', 0.9999),
+        ...          ('bc3', 'C5T', 0.9)],
+        ...         columns=['barcode', 'mutation', 'accuracy'])
+        >>> mutcons.callConsensusTable(mutations,
+        ...         {'bc1':3, 'bc2':1, 'bc3':2, 'bc4':2}, 'substitutions')
+          barcode consensus
+        0     bc1       A1G
+        1     bc2   unknown
+        2     bc3          
+        3     bc4          
+
+        Indels that overlap the most common indel are grouped with it:
+
+        >>> deletions = pandas.DataFrame.from_records(
+        ...         [('bc1', 'del8to17', math.nan, 1)] +
+        ...         [('bc1', 'del9to17', math.nan, 1)] * 4,
+        ...         columns=['barcode', 'mutation', 'accuracy',
+        ...                  'homopolymer_length'])
+        >>> mutcons.callConsensusTable(deletions, {'bc1':6}, 'deletions',
+        ...                            include_stats=True)
+          barcode       consensus
+        0     bc1  del9to17_(5/6)
+        """
+        if mutation_type == 'substitutions':
+            min_mut_frac = self.min_sub_frac
+            homopolymer_min_mut_frac = self.min_sub_frac
+        elif mutation_type in {'insertions', 'deletions'}:
+            min_mut_frac = self.min_indel_frac
+            homopolymer_min_mut_frac = self.homopolymer_min_indel_frac
+        else:
+            raise ValueError("invalid `mutation_type` {0}".format(
+                    mutation_type))
+
+        nseqs = pandas.Series(nseqs)
+        if (nseqs < 1).any():
+            raise ValueError("barcodes in `nseqs` with no sequences")
+
+        df = mutations[[barcode_col, 'mutation', 'accuracy']].reset_index(
+                drop=True)
+        if self.min_acc is not None:
+            df = df[(df.accuracy >= self.min_acc) | df.accuracy.isnull()]
+        if not df[barcode_col].isin(nseqs.index).all():
+            raise ValueError("barcodes in `mutations` not in `nseqs`")
+
+        if mutation_type == 'substitutions':
+            df = df.assign(group=df.mutation, homopolymer=False)
+        else:
+            indels = df.mutation.str.extract(_INDEL_MATCH.pattern)
+            if indels.isnull().all(axis=1).any():
+                raise ValueError("cannot parse indel in `mutations`")
+            indels = indels.astype('float')
+            if 'homopolymer_length' in mutations.columns:
+                hplen = (mutations['homopolymer_length']
+                         .reset_index(drop=True)
+                         [df.index].fillna(0).values)
+            else:
+                hplen = numpy.zeros(len(df))
+            df = df.assign(
+                    start=indels.ins_site.fillna(indels.del_start).values,
+                    length=indels.ins_len.fillna(indels.del_end -
+                                                 indels.del_start + 1).values,
+                    homopolymer=lambda x: (x.length == 1) & (hplen >= 3),
+                    )
+
+            # group indels that overlap with most common (then longest)
+            # indel for the barcode; statistics are from first occurrence
+            g = df.groupby([barcode_col, 'mutation'], sort=False)
+            indel_stats = (g[['start', 'length']].first()
+                           .assign(n=g.size())
+                           .reset_index()
+                           )
+            top = (indel_stats
+                   .sort_values([barcode_col, 'n', 'length', 'mutation'])
+                   .drop_duplicates(barcode_col, keep='last')
+                   [[barcode_col, 'mutation', 'start', 'length']]
+                   .rename(columns={'mutation':'top',
+                                    'start':'top_start',
+                                    'length':'top_length'})
+                   )
+            indel_stats = indel_stats.merge(top, on=barcode_col)
+            end = indel_stats.start + indel_stats.length
+            top_end = indel_stats.top_start + indel_stats.top_length
+            overlap_frac = ((numpy.minimum(end, top_end) -
+                             numpy.maximum(indel_stats.start,
+                                           indel_stats.top_start)) /
+                            (numpy.maximum(end, top_end) -
+                             numpy.minimum(indel_stats.start,
+                                           indel_stats.top_start)))
+            indel_stats['group'] = indel_stats.mutation.where(
+                    overlap_frac < self.group_indel_frac, indel_stats.top)
+            df = df.merge(indel_stats[[barcode_col, 'mutation', 'group']],
+                          on=[barcode_col, 'mutation'], how='left')
+
+        # an indel group is a homopolymer indel if the indel it is
+        # named for is in a homopolymer
+        homopolymer = (df.groupby([barcode_col, 'mutation'])
+                       .homopolymer.any()
+                       .rename_axis([barcode_col, 'group'])
+                       .rename('homopolymer')
+                       .reset_index()
+                       )
+        counts = (df.groupby([barcode_col, 'group'])
+                  .size()
+                  .rename('n')
+                  .reset_index()
+                  .merge(homopolymer, on=[barcode_col, 'group'])
+                  .assign(nseqs=lambda x: x[barcode_col].map(nseqs).values,
+                          frac=lambda x: x.n / x.nseqs)
+                  )
+        called = (counts
+                  [((~counts.homopolymer & (counts.n >= self.n_mut)) |
+                    (counts.n >= self.homopolymer_n_mut)) &
+                   ((~counts.homopolymer & (counts.frac >= min_mut_frac)) |
+                    (counts.frac >= homopolymer_min_mut_frac))]
+                  .sort_values([barcode_col, 'n', 'group'],
+                               ascending=[True, False, True])
+                  )
+        if include_stats:
+            called = called.assign(group=lambda x: x.group + '_(' +
+                    x.n.astype(str) + '/' + x.nseqs.astype(str) + ')')
+        consensus = (called
+                     .groupby(barcode_col, sort=False)
+                     .group
+                     .agg(' '.join)
+                     .reindex(nseqs.index, fill_value='')
+                     )
+        unknown = (nseqs < self.n_mut) & nseqs.index.isin(df[barcode_col])
+        return pandas.DataFrame({
+                barcode_col:nseqs.index,
+                'consensus':consensus.where(~unknown, 'unknown').values,
+                })
+
+
 class Mapper:
     """Class to run ``minimap2`` and get results.
 
@@ -1478,6 +1974,10 @@ class Mapper:
             by `target_isoforms` at initialization plus
             ensuring that each target is listed as an isoform
             of itself.
+        `indexfile` (str or `None`)
+            Prebuilt ``minimap2`` index of `targetfile` used for
+            alignment, or `None` if the index is built on each call
+            to :class:`Mapper.map`. See :class:`Mapper.buildIndex`.
 
     Here is an example where we align a few reads to two target
     sequences.
@@ -1577,6 +2077,7 @@ class Mapper:
 
         self.prog = prog
         self.options = options
+        self.indexfile = None
         assert os.path.isfile(targetfile), \
                 "no `targetfile` {0}".format(targetfile)
         self.targetfile = targetfile
@@ -1600,6 +2101,40 @@ class Mapper:
                 self.target_isoforms[target].update(addtl_targets)
 
 
+    def buildIndex(self, indexfile):
+        """Build ``minimap2`` index of the targets.
+
+        Building the index is part of every call to ``minimap2``.
+        When aligning many sets of queries (for instance, chunks
+        processed in parallel), it is faster to build it once.
+
+        Args:
+            `indexfile` (str)
+                Name of created index file.
+
+        Returns:
+            A copy of this :class:`Mapper` that has its `indexfile`
+            attribute set to `indexfile`, and so aligns against the
+            prebuilt index. The index is built with `options`, so
+            it is appropriate for aligning with these options.
+        """
+        stderr = tempfile.TemporaryFile()
+        try:
+            _ = subprocess.check_call(
+                    [self.prog] + self.options +
+                    ['-d', indexfile, self.targetfile],
+                    stdout=subprocess.DEVNULL, stderr=stderr)
+        except:
+            stderr.seek(0)
+            sys.stderr.write('\n{0}\n'.format(stderr.read()))
+            raise
+        finally:
+            stderr.close()
+        mapper = copy.copy(self)
+        mapper.indexfile = indexfile
+        return mapper
+
+
     def map(self, queryfile, *, outfile=None, introns_to_gaps=True,
             shift_indels=True, check_alignments=True):
         """Map query sequences to target.
@@ -1661,7 +2196,8 @@ class Mapper:
         stderr = tempfile.TemporaryFile()
         try:
             _ = subprocess.check_call(
-                    [self.prog] + self.options + [self.targetfile, queryfile],
+                    [self.prog] + self.options +
+                    [self.indexfile or self.targetfile, queryfile],
                     stdout=fout, stderr=stderr)
             fout.seek(0)
             dlist = collections.defaultdict(list)
@@ -1993,7 +2529,9 @@ class TargetVariants:
             raise ValueError("alignment has unrecognized target {0}"
                     .format(a.target))
 
-        querysites_w_None = [iTargetToQuery(a, i) for i in sites]
+        t_to_q = targetToQueryMap(a)
+        querysites_w_None = [int(t_to_q[i]) if t_to_q[i] >= 0 else None
+                             for i in sites]
         querysites = [i for i in querysites_w_None if i is not None]
 
         if not querysites:
@@ -2003,8 +2541,8 @@ class TargetVariants:
         if qvals is not None and self.variantsites_min_acc:
             if a.q_len != len(qvals):
                 raise ValueError("invalid length of `qvals`")
-            if any(dms_tools2.pacbio.qvalsToAccuracy(q) <
-                    self.variantsites_min_acc for q in qvals[querysites]):
+            if (dms_tools2.pacbio.qvalsToAccuracy(qvals[querysites],
+                    no_avg=True) < self.variantsites_min_acc).any():
                 return ('low accuracy', a)
 
         query = cigarToQueryAndTarget(a.cigar_str)[0]
@@ -2254,7 +2792,7 @@ def parsePAF(paf_file, targets=None, introns_to_gaps=False):
         paf_file = open(paf_file, 'r')
         close_paf_file = True
 
-    elif not isinstance(paf_file, collections.Iterable):
+    elif not isinstance(paf_file, collections.abc.Iterable):
         raise ValueError("`paf_file` must be file name or iterable")
 
     for line in paf_file:
@@ -2607,9 +3145,68 @@ def removeCIGARmutations(cigar, muts_to_remove):
     return ''.join(newcigar)
 
 
+def targetToQueryMap(a):
+    """Array mapping each target index to the aligned query index.
+
+    The array is built by a single pass through the CIGAR string,
+    so it is faster to look up many sites of an alignment in this
+    array than to call :meth:`iTargetToQuery` for each site.
+
+    Args:
+        `a` (:class:`Alignment`)
+            The alignment.
+
+    Returns:
+        A numpy integer array of length `a.r_len`. Element `i` is
+        the index in the query that aligns to site `i` of the target
+        (0-based numbering), or -1 if there is no aligned query site.
+
+    >>> a = Alignment(target='target', r_st=1, r_en=9, r_len=10,
+    ...         q_st=3, q_en=10, q_len=7, strand=1,
+    ...         cigar_str='=T*ga=CA-ga=T+c=T',
+    ...         additional=[], score=-1)
+    >>> targetToQueryMap(a)
+    array([-1,  3,  4,  5,  6, -1, -1,  7,  9, -1])
+    """
+    t_to_q = numpy.full(a.r_len, -1, dtype='int')
+    i_query = a.q_st
+    i_target = a.r_st
+    i_cigar = 0
+    for m in _CIGAR_GROUP_MATCH.finditer(a.cigar_str):
+        assert m.start() == i_cigar, "can't match CIGAR:\n{0}".format(
+                a.cigar_str)
+        i_cigar = m.end()
+        op = m.group()[0]
+        if op == '=':
+            n = len(m.group()) - 1
+            t_to_q[i_target : i_target + n] = numpy.arange(
+                    i_query, i_query + n)
+            i_target += n
+            i_query += n
+        elif op == '*':
+            t_to_q[i_target] = i_query
+            i_target += 1
+            i_query += 1
+        elif op == '-':
+            i_target += len(m.group()) - 1
+        elif op == '+':
+            i_query += len(m.group()) - 1
+        elif op == '~':
+            raise ValueError("Cannot handle intron operations")
+        else:
+            raise RuntimeError("should never get here")
+    assert i_cigar == len(a.cigar_str), "can't match CIGAR:\n{0}".format(
+            a.cigar_str)
+    assert i_target == a.r_en, "CIGAR does not span `r_st` to `r_en`"
+    return t_to_q
+
+
 def iTargetToQuery(a, i):
     """Gets index in query aligned to target index.
 
+    To look up many sites of the same alignment, it is faster to
+    index the array returned by :meth:`targetToQueryMap`.
+
     Args:
         `a` (:class:`Alignment`)
             The alignment.
@@ -16,6 +16,9 @@ import subprocess
 import collections
 import tempfile
 import numbers
+import multiprocessing
+import functools
+import json
 
 import regex
 import numpy
@@ -31,6 +34,32 @@ import matplotlib.pyplot as plt
 from plotnine import *
 
 
+#: matches fuzzy constraints such as ``{e<=2}`` in `regex` patterns
+_FUZZY_CONSTRAINT_MATCH = regex.compile(r'\{[^{}]*[eids]\s*<=?\s*\d+[^{}]*\}')
+
+#: matches top-level named groups of literal nucleotides with fuzziness
+_LITERAL_GROUP_MATCH = regex.compile(r'\(\?P<[^>]+>(?P<literal>[ACGT]+'
+                                     r'(?:\|[ACGT]+)*)\)'
+                                     r'(?:\{(?P<fuzzy>[^{}]*)\})?')
+
+#: matches a single limit in a fuzzy constraint, such as ``e<=2``
+_FUZZY_LIMIT_MATCH = regex.compile(r'\s*(?P<type>[eids])\s*(?P<op><=?)'
+                                   r'\s*(?P<n>\d+)\s*')
+
+#: shortest exact seed used to prefilter fuzzy matching
+_MIN_SEED_LENGTH = 4
+
+#: error probability for each Q-value that fits in a byte (Sanger
+#: encoded Q-values range from 0 to 93)
+_QVAL_ERROR_PROBS = 10**(numpy.arange(256) / -10)
+
+#: key in Arrow schema metadata used by :meth:`toArrowTable`
+_ARROW_METADATA_KEY = b'dms_tools2.pacbio'
+
+#: matches reports made by ``ccs`` 3.0.0
+_CCS_REPORT_MATCH = regex.compile('^ZMW Yield\n(?P<zmw>(.+\n)+)\n\n'
+                                  'Subread Yield\n(?P<subread>(.+\n)+)$')
+
 class CCS:
     """Class to handle results of ``ccs``.
 
@@ -56,6 +85,13 @@ class CCS:
         `reportfile` (str or `None`)
             Report file created by ``ccs``, or
             `None` if you have no reports.
+        `compact_qvals` (bool)
+            Store the Q-values compactly: rather than a separate
+            integer array for each CCS, all Q-values are held as
+            `uint8` in one contiguous buffer, and the arrays in the
+            "CCS_qvals" column of `df` are views into this buffer.
+            To process files too large to hold in memory, see
+            :meth:`iterCCSchunks`.
 
     Attributes:
         `samplename` (str)
@@ -239,9 +275,11 @@ class CCS:
 
     """
 
-    def __init__(self, samplename, ccsfile, reportfile):
+    def __init__(self, samplename, ccsfile, reportfile, *,
+            compact_qvals=False):
         """See main class doc string."""
         self.samplename = samplename
+        self.compact_qvals = compact_qvals
 
         assert os.path.isfile(ccsfile), f"can't find {ccsfile}"
         self.ccsfile = ccsfile
@@ -265,93 +303,133 @@ class CCS:
 
     def _parse_report(self):
         """Set `zmw_report` and `subread_report` using `reportfile`."""
-        # match reports made by ccs 3.0.0
-        reportmatch = regex.compile('^ZMW Yield\n(?P<zmw>(.+\n)+)\n\n'
-                            'Subread Yield\n(?P<subread>(.+\n)+)$')
-
-        with open(self.reportfile) as f:
-            report = f.read()
-        m = reportmatch.search(report)
-        assert m, "Cannot match {0}\n\n{1}".format(
-                self.reportfile, report)
-
-        for read_type in ['zmw', 'subread']:
-            df = (pandas.read_csv(
-                        io.StringIO(m.group(read_type)),
-                        names=['status', 'number', 'percent']
-                        )
-                  .assign(fraction=lambda x: 
-                        x.percent.str.slice(None, -1)
-                        .astype('float') / 100)
-                  )
-            setattr(self, read_type + '_report', df)
+        self.zmw_report, self.subread_report = parseCCSreport(
+                self.reportfile)
 
 
     def _build_df_from_ccsfile(self):
         """Builds `df` from `ccsfile`."""
-        # read into dictionary
-        d = collections.defaultdict(list)
-
-        # get file type by extensions
-        base, ext = [s.lower() for s in os.path.splitext(self.ccsfile)]
-        if ext in {'.gz', '.gzip'}:
-            gzipped = True
-            ext = os.path.splitext(base)[1].lower()
-        else:
-            gzipped = False
-
-        # extract data based on file extension
-        if ext == '.bam':
-            if gzipped:
-                raise ValueError("Cannot handle gzipped BAM")
-            for s in pysam.AlignmentFile(self.ccsfile, 'rb',
-                                         check_sq=False):
-                d['CCS'].append(s.query_sequence)
-                d['CCS_qvals'].append(numpy.asarray(s.query_qualities,
-                                                    dtype='int'))
-                d['name'].append(s.query_name)
-                d['passes'].append(s.get_tag('np'))
-                d['CCS_accuracy'].append(s.get_tag('rq'))
-                d['CCS_length'].append(s.query_length)
-                d['samplename'].append(self.samplename)
-
-        elif ext in {'.fq', '.fastq'}:
-            headmatch = re.compile(r'^(?P<name>\S+)\s+'
-                                   r'np:i:(?P<passes>\d+)\s+'
-                                   r'rq:f:(?P<accuracy>\d+\.{0,1}\d*)')
-            for a in pysam.FastxFile(self.ccsfile):
-                if a.comment is not None:
-                    head = f"{a.name} {a.comment}"
-                else:
-                    head = a.name
-                m = headmatch.match(head)
-                if not m:
-                    raise ValueError(f"could not match {head}")
-                d['CCS'].append(a.sequence)
-                qvals = numpy.array([ord(qi) - 33 for qi in a.quality],
-                                    dtype='int')
-                d['CCS_qvals'].append(qvals)
-                d['name'].append(m.group('name'))
-                d['passes'].append(int(m.group('passes')))
-                d['CCS_accuracy'].append(float(m.group('accuracy')))
-                d['CCS_length'].append(len(a.sequence))
-                d['samplename'].append(self.samplename)
-
-        else:
-            raise ValueError(f"invalid file extension {ext}")
-
-        # create data frame
-        self.df = pandas.DataFrame(d)
+        self.df = _ccsRecordsToDF(_iterCCSrecords(self.ccsfile),
+                                  self.samplename, self.compact_qvals)
 
         # some checks on `df`
         assert self.df.name.size == self.df.name.unique().size,\
-                "non-unique names for {0}".format(self.name)
+                "non-unique names for {0}".format(self.samplename)
         assert (self.df.CCS_length == self.df.CCS.apply(len)).all(),\
                 "CCS not correct length"
         assert (self.df.CCS_length == self.df.CCS_qvals.apply(len)).all(),\
                 "qvals not correct length"
 
 
+def iterCCSchunks(samplename, ccsfile, chunksize, *, compact_qvals=True):
+    """Iterate over CCSs in a file in chunks.
+
+    Rather than reading all of `ccsfile` into memory as is done
+    by :class:`CCS`, yields data frames each holding up to
+    `chunksize` CCSs.
+
+    Args:
+        `samplename` (str)
+            Sample name, as for :class:`CCS`.
+        `ccsfile` (str)
+            BAM or FASTQ file of CCSs, as for :class:`CCS`.
+        `chunksize` (int)
+            Maximum number of CCSs in each chunk.
+        `compact_qvals` (bool)
+            Meaning as for :class:`CCS`, except that there is a
+            buffer for each chunk.
+
+    Returns:
+        A generator of pandas DataFrames, each with the columns
+        in the `df` attribute of :class:`CCS`.
+    """
+    if chunksize < 1:
+        raise ValueError("`chunksize` must be >= 1")
+    records = []
+    for record in _iterCCSrecords(ccsfile):
+        records.append(record)
+        if len(records) == chunksize:
+            yield _ccsRecordsToDF(records, samplename, compact_qvals)
+            records = []
+    if records:
+        yield _ccsRecordsToDF(records, samplename, compact_qvals)
+
+
+def _iterCCSrecords(ccsfile):
+    """Iterates over `(name, CCS, qvals, passes, accuracy)` in file.
+
+    `qvals` are returned as `uint8` numpy arrays.
+    """
+    # get file type by extensions
+    base, ext = [s.lower() for s in os.path.splitext(ccsfile)]
+    if ext in {'.gz', '.gzip'}:
+        gzipped = True
+        ext = os.path.splitext(base)[1].lower()
+    else:
+        gzipped = False
+
+    # extract data based on file extension
+    if ext == '.bam':
+        if gzipped:
+            raise ValueError("Cannot handle gzipped BAM")
+        for s in pysam.AlignmentFile(ccsfile, 'rb', check_sq=False):
+            yield (s.query_name,
+                   s.query_sequence,
+                   numpy.asarray(s.query_qualities, dtype='uint8'),
+                   s.get_tag('np'),
+                   s.get_tag('rq'))
+
+    elif ext in {'.fq', '.fastq'}:
+        headmatch = re.compile(r'^(?P<name>\S+)\s+'
+                               r'np:i:(?P<passes>\d+)\s+'
+                               r'rq:f:(?P<accuracy>\d+\.{0,1}\d*)')
+        for a in pysam.FastxFile(ccsfile):
+            if a.comment is not None:
+                head = f"{a.name} {a.comment}"
+            else:
+                head = a.name
+            m = headmatch.match(head)
+            if not m:
+                raise ValueError(f"could not match {head}")
+            qvals = numpy.frombuffer(a.quality.encode('ascii'),
+                                     dtype='uint8') - 33
+            yield (m.group('name'),
+                   a.sequence,
+                   qvals,
+                   int(m.group('passes')),
+                   float(m.group('accuracy')))
+
+    else:
+        raise ValueError(f"invalid file extension {ext}")
+
+
+def _ccsRecordsToDF(records, samplename, compact_qvals):
+    """Data frame of records from :meth:`_iterCCSrecords`."""
+    d = collections.defaultdict(list)
+    for name, seq, qvals, passes, accuracy in records:
+        d['CCS'].append(seq)
+        d['CCS_qvals'].append(qvals)
+        d['name'].append(name)
+        d['passes'].append(passes)
+        d['CCS_accuracy'].append(accuracy)
+        d['CCS_length'].append(len(seq))
+        d['samplename'].append(samplename)
+
+    if compact_qvals:
+        offsets = numpy.cumsum([0] + d['CCS_length'])
+        if d['CCS_qvals']:
+            qvals_buffer = numpy.concatenate(d['CCS_qvals'])
+        else:
+            qvals_buffer = numpy.array([], dtype='uint8')
+        d['CCS_qvals'] = [qvals_buffer[i : j] for i, j in
+                          zip(offsets[ : -1], offsets[1 : ])]
+    else:
+        d['CCS_qvals'] = [qvals.astype('int') for qvals in d['CCS_qvals']]
+
+    return pandas.DataFrame(d, columns=['CCS', 'CCS_qvals', 'name',
+            'passes', 'CCS_accuracy', 'CCS_length', 'samplename'])
+
+
 TerminiVariantTag = collections.namedtuple(
         'TerminiVariantTag', ['termini', 'site', 'nucleotides'])
 TerminiVariantTag.__doc__ = "Variant tag at termini."
@@ -576,7 +654,7 @@ def matchAndAlignCCS(ccslist, mapper, *,
         targetvariants=None, mutationcaller=None,
         terminiVariantTagCaller=None,
         tagged_termini_remove_indels=True,
-        rc_barcode_umi=True):
+        rc_barcode_umi=True, ncpus=1):
     """Identify CCSs that match pattern and align them.
 
     This is a convenience function that runs :meth:`matchSeqs`
@@ -652,6 +730,12 @@ def matchAndAlignCCS(ccslist, mapper, *,
             the gene. Typically this is desirable because actual
             barcode sequencing goes in the reverse direction of the
             gene.
+        `ncpus` (int)
+            Number of processes to use. If > 1, the CCSs are split
+            into chunks that are matched and aligned in parallel,
+            with all chunks sharing one ``minimap2`` index built
+            by :py:mod:`dms_tools2.minimap2.Mapper.buildIndex`.
+            The returned data frame is the same as with one CPU.
 
     Returns:
         A pandas dataframe that will have all columns already in the
@@ -729,33 +813,6 @@ def matchAndAlignCCS(ccslist, mapper, *,
     else:
         df = ccslist.df
 
-    # internal function:
-    def _align_CCS_both_orientations(df, mapper):
-        """Try align CCS both ways, adds columns.
-          `CCS_aligned`, `CCS_aligned_alignment`, and
-        `CCS_aligned_target`."""
-        df_bi = (df.pipe(dms_tools2.pacbio.alignSeqs,
-                         mapper=mapper,
-                         query_col='CCS',
-                         aligned_col='CCS_for_aligned')
-                   .assign(CCS_rev=lambda x: x.CCS.map(
-                           dms_tools2.utils.reverseComplement))
-                   .pipe(dms_tools2.pacbio.alignSeqs,
-                         mapper=mapper,
-                         query_col='CCS_rev',
-                         aligned_col='CCS_rev_aligned')
-                   )
-        return (df.assign(CCS_aligned=df_bi.CCS_for_aligned |
-                          df_bi.CCS_rev_aligned)
-                .assign(CCS_aligned_alignment=
-                        df_bi.CCS_for_aligned_alignment.where(
-                        df_bi.CCS_for_aligned,
-                        df_bi.CCS_rev_aligned_alignment))
-                .assign(CCS_aligned_target=lambda x:
-                        x.CCS_aligned_alignment.map(
-                        lambda x: x.target if x is not None else ''))
-                )
-
     # build match_str
     match_str = collections.OrderedDict()
 
@@ -792,6 +849,66 @@ def matchAndAlignCCS(ccslist, mapper, *,
     else:
         remove_indels = []
 
+    pipeline_kwargs = dict(match_str=match_str,
+                           remove_indels=remove_indels,
+                           targetvariants=targetvariants,
+                           mutationcaller=mutationcaller,
+                           terminiVariantTagCaller=terminiVariantTagCaller,
+                           rc_barcode=rc_barcode_umi and barcode is not None,
+                           rc_umi=rc_barcode_umi and umi is not None)
+
+    ncpus = max(1, min(ncpus, multiprocessing.cpu_count(), len(df)))
+    if ncpus == 1:
+        return _matchAndAlignCCSdf(df, mapper, **pipeline_kwargs)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        indexed_mapper = mapper.buildIndex(os.path.join(tmpdir,
+                                                        'targets.mmi'))
+        bounds = numpy.linspace(0, len(df), ncpus + 1).astype('int')
+        with multiprocessing.Pool(ncpus) as pool:
+            results = [pool.apply_async(_matchAndAlignCCSdf,
+                                        (df.iloc[i : j], indexed_mapper),
+                                        pipeline_kwargs)
+                       for i, j in zip(bounds[ : -1], bounds[1 : ])]
+            return pandas.concat([r.get() for r in results], sort=False)
+
+
+def _alignCCSBothOrientations(df, mapper):
+    """Try align CCS both ways, adds columns.
+
+    Adds `CCS_aligned`, `CCS_aligned_alignment`, and
+    `CCS_aligned_target`. The alignment in the forward orientation
+    is used if there is one, so only CCSs that fail to align in
+    that orientation are reverse complemented and aligned again.
+    """
+    align_kwargs = dict(mapper=mapper,
+                        query_col='CCS',
+                        aligned_col='CCS_aligned',
+                        add_n_trimmed=False,
+                        add_n_additional=False,
+                        add_n_additional_difftarget=False)
+    df_for = alignSeqs(df[['name', 'CCS']], **align_kwargs)
+    newcols = collections.OrderedDict(
+            (c, df_for[c].values.copy()) for c in
+            ['CCS_aligned', 'CCS_aligned_alignment', 'CCS_aligned_target'])
+
+    failed = ~newcols['CCS_aligned']
+    if failed.any():
+        df_rev = alignSeqs(df[['name', 'CCS']][failed]
+                           .assign(CCS=lambda x: x.CCS.map(
+                                   dms_tools2.utils.reverseComplement)),
+                           **align_kwargs)
+        for c, values in newcols.items():
+            values[failed] = df_rev[c].values
+
+    return df.assign(**newcols)
+
+
+def _matchAndAlignCCSdf(df, mapper, *, match_str, remove_indels,
+        targetvariants, mutationcaller, terminiVariantTagCaller,
+        rc_barcode, rc_umi):
+    """Runs the matching and alignment for :meth:`matchAndAlignCCS`."""
+
     # now create df
     df = (
         df
@@ -804,25 +921,14 @@ def matchAndAlignCCS(ccslist, mapper, *,
               match_col='barcoded',
               remove_indels=remove_indels)
     
-        # look for just termini or spacer
-        .pipe(dms_tools2.pacbio.matchSeqs, 
-              match_str=match_str['termini5'],
-              col_to_match='CCS',
-              match_col='has_termini5',
-              add_polarity=False,
-              add_group_cols=False)
-        .pipe(dms_tools2.pacbio.matchSeqs, 
-              match_str=match_str['termini3'],
+        # look for just termini or spacer, all of which are in any
+        # barcoded sequence
+        .pipe(dms_tools2.pacbio.hasMatches,
+              match_strs={'has_termini5':match_str['termini5'],
+                          'has_termini3':match_str['termini3'],
+                          'has_spacer':match_str['spacer']},
               col_to_match='CCS',
-              match_col='has_termini3',
-              add_polarity=False,
-              add_group_cols=False)
-        .pipe(dms_tools2.pacbio.matchSeqs, 
-              match_str=match_str['spacer'],
-              col_to_match='CCS',
-              match_col='has_spacer',
-              add_polarity=False,
-              add_group_cols=False)
+              implied_by='barcoded')
     
         # see if gene aligns in correct orientation
         .pipe(dms_tools2.pacbio.alignSeqs,
@@ -833,7 +939,7 @@ def matchAndAlignCCS(ccslist, mapper, *,
               mutationcaller=mutationcaller)
     
         # look for any alignment of CCS, take best in either orientation
-        .pipe(_align_CCS_both_orientations,
+        .pipe(_alignCCSBothOrientations,
               mapper=mapper)
         )
 
@@ -842,12 +948,11 @@ def matchAndAlignCCS(ccslist, mapper, *,
                 terminiVariantTagCaller.call, axis=1))
 
     # reverse complement barcode and UMI
-    if rc_barcode_umi:
-        if barcode is not None:
-            df.barcode = df.barcode.map(dms_tools2.utils.reverseComplement)
+    if rc_barcode:
+        df.barcode = df.barcode.map(dms_tools2.utils.reverseComplement)
 
-        if umi is not None:
-            df.UMI = df.UMI.map(dms_tools2.utils.reverseComplement)
+    if rc_umi:
+        df.UMI = df.UMI.map(dms_tools2.utils.reverseComplement)
 
     return df
 
@@ -869,7 +974,10 @@ def matchSeqs(df, match_str, col_to_match, match_col, *,
             If `None` we just return `df`. Note that we use
             `regex` rather than `re`, so fuzzy matching is
             enabled. Note that the matching uses the *BESTMATCH*
-            flag to find the best match.
+            flag to find the best match. Sequences that lack exact
+            seeds of literal groups that must be present for a match
+            (by the pigeonhole principle given the fuzziness of the
+            group) are not searched, as they cannot match.
         `col_to_match` (str)
             Name of column in `df` that contains the sequences
             to match.
@@ -1020,6 +1128,8 @@ def matchSeqs(df, match_str, col_to_match, match_col, *,
     if expandIUPAC:
         match_str = re_expandIUPAC(match_str)
     matcher = regex.compile(match_str, flags=regex.BESTMATCH)
+    # sequences lacking exact seeds can't match, so don't search them
+    seedmatchers = _seedMatchers(match_str)
 
     newcols = [match_col]
     if add_polarity:
@@ -1061,89 +1171,336 @@ def matchSeqs(df, match_str, col_to_match, match_col, *,
                 "columns that we are supposed to add:\n{0}"
                 .format(dup_cols))
 
-    # look for matches for each row
-    match_d = {c:[] for c in newcols}
-    for tup in df.itertuples():
-        s = getattr(tup, col_to_match)
-        m = matcher.search(s)
-        if add_group_cols and (add_accuracy or add_qvals):
-            qs = getattr(tup, match_qvals_col)
-        if m:
-            polarity = 1
+    # find match for each row, first to sequence and then to its reverse
+    # complement, recording spans of groups in the matched orientation
+    seqs = df[col_to_match].values
+    nrows = len(seqs)
+    matched = numpy.zeros(nrows, dtype='bool')
+    polarities = numpy.zeros(nrows, dtype='int')
+    starts = numpy.zeros((len(groupnames), nrows), dtype='int')
+    ends = numpy.zeros((len(groupnames), nrows), dtype='int')
+    matched_seqs = {}
+    indels = {}
+    for irow, s in enumerate(seqs):
+        for polarity in [1, -1]:
+            if polarity == -1:
+                s = dms_tools2.utils.reverseComplement(s)
+            if all(seedmatcher.search(s) for seedmatcher in seedmatchers):
+                m = matcher.search(s)
+                if m:
+                    break
         else:
-            m = matcher.search(dms_tools2.utils.reverseComplement(s))
-            polarity = -1
-            if add_group_cols and (add_accuracy or add_qvals):
-                qs = numpy.flip(qs, axis=0)
-        if m:
-            match_d[match_col].append(True)
-            if add_polarity:
-                match_d[polarity_col].append(polarity)
-            ins_sites = m.fuzzy_changes[1]
-            del_sites = m.fuzzy_changes[2]
-            for g in groupnames:
-                g_start = m.start(g)
-                g_end = m.end(g)
-                if g in remove_indels:
-                    g_ins_sites = [i for i in ins_sites
-                                  if g_start <= i < g_end]
-                    g_del_sites = [i for i in del_sites
-                                   if g_start <= i < g_end]
-                else:
-                    g_ins_sites = []
-                    g_del_sites = []
-                if add_qvals:
-                    g_qs = qs[g_start : g_end]
-                    g_qs_list = []
+            continue
+        matched[irow] = True
+        polarities[irow] = polarity
+        for ig, g in enumerate(groupnames):
+            starts[ig, irow], ends[ig, irow] = m.span(g)
+        if add_group_cols:
+            matched_seqs[irow] = s
+        if remove_indels:
+            indels[irow] = (m.fuzzy_changes[1], m.fuzzy_changes[2])
+
+    # now build the new columns from the group spans
+    match_d = {match_col:matched}
+    if add_polarity:
+        match_d[polarity_col] = polarities
+    matched_rows = numpy.flatnonzero(matched)
+    if add_group_cols and (add_accuracy or add_qvals):
+        row_qvals = df[match_qvals_col].values[matched_rows]
+        row_lengths = numpy.fromiter(map(len, row_qvals), dtype='int',
+                                     count=len(matched_rows))
+        rc = polarities[matched_rows] == -1
+    if add_group_cols and add_accuracy:
+        # accuracy of all groups from Q-values in original orientation
+        row_starts = starts[:, matched_rows]
+        row_ends = ends[:, matched_rows]
+        accuracies = qvalsToSpanAccuracies(
+                row_qvals,
+                numpy.tile(numpy.arange(len(matched_rows)), len(groupnames)),
+                numpy.where(rc, row_lengths - row_ends, row_starts).ravel(),
+                numpy.where(rc, row_lengths - row_starts, row_ends).ravel(),
+                ).reshape(len(groupnames), len(matched_rows))
+    if add_group_cols and add_qvals and len(matched_rows):
+        # Q-values of matched rows concatenated in orientation of match,
+        # so Q-values of each group are slices given by the group spans
+        row_offsets = numpy.concatenate([[0], numpy.cumsum(row_lengths)])
+        site_rows = numpy.repeat(numpy.arange(len(matched_rows)),
+                                 row_lengths)
+        isites = numpy.arange(row_offsets[-1])
+        row_offsets = row_offsets[ : -1]
+        oriented_qvals = numpy.concatenate(row_qvals)[numpy.where(
+                rc[site_rows],
+                2 * row_offsets[site_rows] + row_lengths[site_rows] - 1
+                    - isites,
+                isites)]
+    for ig, g in enumerate(groupnames):
+        g_starts = starts[ig]
+        g_ends = ends[ig]
+        g_seqs = numpy.full(nrows, '', dtype='object')
+        g_seqs[matched_rows] = [matched_seqs[i][g_starts[i] : g_ends[i]]
+                                for i in matched_rows]
+        if add_qvals:
+            g_qvals = numpy.empty(nrows, dtype='object')
+            g_qvals.fill(numpy.array([], dtype='int'))
+            if len(matched_rows):
+                g_qvals[matched_rows] = numpy.split(oriented_qvals,
+                        numpy.column_stack([
+                            row_offsets + g_starts[matched_rows],
+                            row_offsets + g_ends[matched_rows]]).ravel()
+                        )[1 : : 2]
+        if add_accuracy:
+            g_accuracy = numpy.full(nrows, -1, dtype='float')
+            g_accuracy[matched_rows] = accuracies[ig]
+            match_d[g + '_accuracy'] = g_accuracy
+        if g in remove_indels:
+            for i, (ins_sites, del_sites) in indels.items():
+                g_ins_sites = [j - g_starts[i] for j in ins_sites
+                               if g_starts[i] <= j < g_ends[i]]
+                g_del_sites = [j - g_starts[i] for j in del_sites
+                               if g_starts[i] <= j < g_ends[i]]
                 if g_ins_sites or g_del_sites:
-                    g_seq = []
-                    for i, x in enumerate(m.group(g)):
-                        if i + g_start in g_ins_sites:
-                            pass
-                        elif i + g_start in g_del_sites:
-                            g_seq.append(x + '-')
-                            if add_qvals:
-                                g_qs_list.append(g_qs[i])
-                                g_qs_list.append(numpy.nan)
-                        else:
-                            g_seq.append(x)
-                            if add_qvals:
-                                g_qs_list.append(g_qs[i])
-                    g_seq = ''.join(g_seq)
+                    g_seqs[i], g_qs = _removeIndels(g_seqs[i],
+                            g_qvals[i] if add_qvals else None,
+                            g_ins_sites, g_del_sites)
                     if add_qvals:
-                        g_qs = numpy.array(g_qs_list)
-                else:
-                    g_seq = m.group(g)
-                match_d[g].append(g_seq)
-                if add_qvals:
-                    match_d[g + '_qvals'].append(g_qs)
-                if add_accuracy:
-                    match_d[g + '_accuracy'].append(qvalsToAccuracy(
-                            qs[g_start : g_end]))
-        else:
-            match_d[match_col].append(False)
-            if add_polarity:
-                match_d[polarity_col].append(0)
-            for g in groupnames:
-                match_d[g].append('')
-                if add_qvals:
-                    match_d[g + '_qvals'].append(numpy.array([], dtype='int'))
-                if add_accuracy:
-                    match_d[g + '_accuracy'].append(-1)
+                        g_qvals[i] = g_qs
+        match_d[g] = g_seqs
+        if add_qvals:
+            match_d[g + '_qvals'] = g_qvals
 
-    # set index to make sure matches `df`
-    indexname = df.index.name
-    assert indexname not in match_d
-    match_d[indexname] = df.index.tolist()
     if (not overwrite) and dup_cols:
         raise ValueError("overwriting columns")
     return pandas.concat(
             [df.drop(dup_cols, axis=1),
-                pandas.DataFrame(match_d).set_index(indexname),
+                pandas.DataFrame(match_d, index=df.index, columns=newcols),
             ],
             axis=1)
 
 
+def _removeIndels(seq, qvals, ins_sites, del_sites):
+    """Removes insertions and marks deletions in a matched sequence.
+
+    Args:
+        `seq` (str)
+            Sequence matching a group.
+        `qvals` (numpy array or `None`)
+            Q-values for `seq`, or `None` if not being computed.
+        `ins_sites` (list)
+            Sites (0-based in `seq`) that are insertions called by
+            fuzzy matching, and so are removed.
+        `del_sites` (list)
+            Sites (0-based in `seq`) after which there is a deletion
+            called by fuzzy matching, and so a `-` gap is added.
+
+    Returns:
+        The 2-tuple `(new_seq, new_qvals)`, where `new_qvals` has
+        a `nan` for each gap and is `None` if `qvals` is `None`.
+
+    >>> _removeIndels('ATAC', numpy.array([30, 31, 32, 33]), [], [1])
+    ('AT-AC', array([30., 31., nan, 32., 33.]))
+    >>> _removeIndels('AAAT', None, [0], [])
+    ('AAT', None)
+    """
+    new_seq = []
+    new_qvals = []
+    for i, x in enumerate(seq):
+        if i in ins_sites:
+            pass
+        elif i in del_sites:
+            new_seq.append(x + '-')
+            if qvals is not None:
+                new_qvals.append(qvals[i])
+                new_qvals.append(numpy.nan)
+        else:
+            new_seq.append(x)
+            if qvals is not None:
+                new_qvals.append(qvals[i])
+    if qvals is not None:
+        new_qvals = numpy.array(new_qvals)
+    else:
+        new_qvals = None
+    return ''.join(new_seq), new_qvals
+
+
+def hasMatches(df, match_strs, col_to_match, *, implied_by=None,
+        expandIUPAC=True, overwrite=False):
+    """Flag sequences that match any of several patterns in one pass.
+
+    This gives the same result as calling :meth:`matchSeqs` with
+    `add_polarity=False` and `add_group_cols=False` once for each
+    pattern, but reverse complements each sequence only once,
+    tries a fast exact search before any fuzzy search, only does
+    the fuzzy search if the sequence contains exact seeds that
+    are required for a match, and can skip rows that are already
+    known to match.
+
+    Args:
+        `df` (pandas DataFrame)
+            Data frame with column holding sequences to match.
+        `match_strs` (dict)
+            Keyed by name of column to add, values are strings that
+            give the pattern to search for as for :meth:`matchSeqs`.
+            Entries with a value of `None` are ignored.
+        `col_to_match` (str)
+            Name of column in `df` that contains the sequences
+            to match.
+        `implied_by` (str or `None`)
+            Name of a boolean column in `df`, such as the `match_col`
+            added by :meth:`matchSeqs`, that is only `True` for rows
+            that are guaranteed to match **all** of `match_strs`. This
+            is the case if each pattern in `match_strs` is a named group
+            (with its fuzziness) in the pattern that created the column.
+            Rows that are `True` in this column are not searched.
+        `expandIUPAC` (bool)
+            Expand ambiguous nucleotides in `match_strs` using
+            :meth:`re_expandIUPAC`.
+        `overwrite` (bool)
+            If `False`, raise an error if any of the columns to
+            add already exist in `df`.
+
+    Returns:
+        A **copy** of `df` with a column for each pattern in
+        `match_strs` that is `True` if there is a match to the
+        sequence in `col_to_match` or its reverse complement.
+
+    >>> df_in = pandas.DataFrame({'CCS':['GGACATTTT', 'AAAATGTCC',
+    ...                                  'GGACTTCCC', 'CCCCCCCCC']})
+    >>> df = hasMatches(df_in, {'has_ACAT':'ACAT',
+    ...                         'has_fuzzyACAT':'(ACAT){e<=1}'},
+    ...                 'CCS')
+    >>> df.has_ACAT.tolist()
+    [True, True, False, False]
+    >>> df.has_fuzzyACAT.tolist()
+    [True, True, True, False]
+    """
+    match_strs = {col:match_str for col, match_str in match_strs.items()
+                  if match_str is not None}
+
+    assert col_to_match in df.columns, \
+            "`df` lacks `col_to_match` column {0}".format(col_to_match)
+    if not overwrite:
+        dup_cols = set(match_strs).intersection(set(df.columns))
+        if dup_cols:
+            raise ValueError("`df` already contains some of the "
+                    "columns that we are supposed to add:\n{0}"
+                    .format(dup_cols))
+    if implied_by is not None:
+        implied = df[implied_by].values.astype('bool')
+    else:
+        implied = numpy.zeros(len(df), dtype='bool')
+
+    # For each pattern, an exact matcher without fuzzy constraints,
+    # and a fuzzy matcher only if there are fuzzy constraints.
+    # A match to the exact pattern is also a match to the fuzzy one.
+    matchers = []
+    for match_str in match_strs.values():
+        if expandIUPAC:
+            match_str = re_expandIUPAC(match_str)
+        exact_str = _FUZZY_CONSTRAINT_MATCH.sub('', match_str)
+        if exact_str != match_str:
+            fuzzy = regex.compile(match_str, flags=regex.BESTMATCH)
+        else:
+            fuzzy = None
+        matchers.append((regex.compile(exact_str), fuzzy,
+                         _seedMatchers(match_str)))
+
+    results = numpy.ones((len(matchers), len(df)), dtype='bool')
+    for irow, s in enumerate(df[col_to_match].values):
+        if implied[irow]:
+            continue
+        s_rc = None
+        for imatch, (exact, fuzzy, seedmatchers) in enumerate(matchers):
+            if exact.search(s):
+                continue
+            if s_rc is None:
+                s_rc = dms_tools2.utils.reverseComplement(s)
+            if exact.search(s_rc):
+                continue
+            if fuzzy is not None and any(
+                    all(seedmatcher.search(si) for seedmatcher in seedmatchers)
+                    and fuzzy.search(si) for si in [s, s_rc]):
+                continue
+            results[imatch, irow] = False
+
+    df = df.copy()
+    for col, col_results in zip(match_strs, results):
+        df[col] = col_results
+    return df
+
+
+def _seedMatchers(match_str):
+    """Exact seed matchers that are necessary for `match_str` to match.
+
+    Finds named groups at the top level of `match_str` that are a
+    literal nucleotide sequence (or alternation of such sequences)
+    with at most *k* fuzzy errors. By the pigeonhole principle, any
+    match must contain one of *k + 1* pieces of the literal exactly.
+
+    Returns:
+        List of compiled `re` patterns, one per such group. A
+        sequence can only match `match_str` if all of these patterns
+        are found in it. The list is empty if no groups qualify.
+
+    >>> [m.pattern for m in _seedMatchers(
+    ...         '(?P<t5>ACGTACGA|GGGGCCCC){e<=1}(?P<g>[ACGT]+)(?P<t3>TTTTT)')]
+    ['ACGA|ACGT|CCCC|GGGG', 'TTTTT']
+    >>> _seedMatchers('(?P<t5>ACGTAC){e<=1}|(?P<t3>TTTTT)')
+    []
+    """
+    # depth of nesting in groups of each character in `match_str`
+    depth = []
+    d = 0
+    in_class = escaped = False
+    for c in match_str:
+        if escaped:
+            escaped = False
+        elif c == '\\':
+            escaped = True
+        elif in_class:
+            in_class = c != ']'
+        elif c == '[':
+            in_class = True
+        elif c == '(':
+            d += 1
+        elif c == ')':
+            d -= 1
+        elif c == '|' and d == 0:
+            return []  # top-level alternation, so no group is required
+        depth.append(d)
+
+    seedmatchers = []
+    for m in _LITERAL_GROUP_MATCH.finditer(match_str):
+        if m.start() > 0 and depth[m.start() - 1] != 0:
+            continue
+        if match_str[m.end() : m.end() + 1] in {'?', '*', '+', '{'}:
+            continue  # group is optional or repeated
+        if m.group('fuzzy') is None:
+            k = 0
+        else:
+            limits = {}
+            for constraint in m.group('fuzzy').split(','):
+                c_m = _FUZZY_LIMIT_MATCH.fullmatch(constraint)
+                if not c_m:
+                    limits = None
+                    break
+                limits[c_m.group('type')] = (int(c_m.group('n')) -
+                        int(c_m.group('op') == '<'))
+            if limits is None:
+                continue
+            k = limits['e'] if 'e' in limits else sum(limits.values())
+        seeds = set()
+        for literal in m.group('literal').split('|'):
+            n = len(literal)
+            if n // (k + 1) < _MIN_SEED_LENGTH:
+                seeds = None
+                break
+            seeds.update(literal[n * i // (k + 1) : n * (i + 1) // (k + 1)]
+                         for i in range(k + 1))
+        if seeds:
+            seedmatchers.append(re.compile('|'.join(sorted(seeds))))
+    return seedmatchers
+
+
 def alignSeqs(df, mapper, query_col, aligned_col, *,
         add_alignment=True, add_target=True,
         add_n_trimmed=True, add_n_additional=True,
@@ -1219,6 +1576,8 @@ def alignSeqs(df, mapper, query_col, aligned_col, *,
               "best" alignment, and the remaining alignments are in
               the :py:mod:`dms_tools2.minimap2.Alignment.additional`
               attribute.
+              Use :meth:`compactAlignments` to store this column
+              more compactly.
 
             - If `add_target` is `True`, add column named
               `aligned_col` suffixed by "_target" that gives
@@ -1381,6 +1740,354 @@ def alignSeqs(df, mapper, query_col, aligned_col, *,
             axis=1)
 
 
+def compactAlignments(df, alignment_col):
+    """Move a column of alignments into a compact table.
+
+    Columns of :py:mod:`dms_tools2.minimap2.Alignment` objects such as
+    those added by :meth:`alignSeqs` are memory hungry in wide data
+    frames. This function moves them into a
+    :py:mod:`dms_tools2.minimap2.AlignmentTable`.
+
+    Args:
+        `df` (pandas DataFrame)
+            Data frame with column of alignments (or `None`).
+        `alignment_col` (str)
+            Name of column in `df` with the alignments.
+
+    Returns:
+        The 2-tuple `(new_df, table)`. `new_df` is a copy of `df`
+        in which `alignment_col` is replaced by a column of the same
+        name suffixed by "_index" that gives the row in `table` holding
+        the alignment. The alignment for any row can be retrieved as
+        ``table[i]``, which is `None` if there was no alignment.
+
+    >>> a = dms_tools2.minimap2.Alignment(target='t', r_st=0, r_en=4,
+    ...         r_len=4, q_st=0, q_en=4, q_len=4, strand=1,
+    ...         cigar_str='=ATGC', additional=[], score=8)
+    >>> df = pandas.DataFrame({'name':['x', 'y'],
+    ...                        'aligned_alignment':[None, a]})
+    >>> new_df, table = compactAlignments(df, 'aligned_alignment')
+    >>> list(new_df.columns)
+    ['name', 'aligned_alignment_index']
+    >>> [table[i] for i in new_df.aligned_alignment_index] == [None, a]
+    True
+    """
+    if alignment_col not in df.columns:
+        raise ValueError(f"`df` lacks `alignment_col` {alignment_col}")
+    index_col = alignment_col + '_index'
+    if index_col in df.columns:
+        raise ValueError(f"`df` already has column {index_col}")
+    table = dms_tools2.minimap2.AlignmentTable(df[alignment_col].values)
+    new_df = (df
+              .assign(**{index_col:numpy.arange(len(df))})
+              .drop(alignment_col, axis=1)
+              )
+    return (new_df, table)
+
+
+def toArrowTable(df):
+    """Convert data frame with alignments and mutations to Arrow table.
+
+    Data frames returned by :meth:`alignSeqs` and :meth:`matchAndAlignCCS`
+    have columns of Python objects that can only be saved with `pickle`.
+    This function converts them to a columnar `Arrow
+    <https://arrow.apache.org>`_ table with typed columns. It
+    requires `pyarrow <https://arrow.apache.org/docs/python>`_.
+    Also see :meth:`writeParquet`, which saves the table to a
+    Parquet file, and :meth:`fromArrowTable`, which reverses the
+    conversion.
+
+    Columns are converted as follows:
+
+      - A column `col` of :py:mod:`dms_tools2.minimap2.Alignment`
+        objects (or `None`) is flattened into columns named
+        `col.<field>` for each field of the alignment other than
+        `additional`. These are null if there is no alignment. The
+        additional alignments are in columns named
+        `col.additional.<field>`, which are lists with an entry for
+        each additional alignment.
+
+      - A column `col` of :class:`dms_tools2.minimap2.Mutations`
+        objects (or `None`) is flattened into columns of lists
+        with an entry for each mutation, which are null if the
+        value is `None`. These columns are `col.substitutions.<x>`
+        where `<x>` is `site`, `mutation`, and `accuracy`;
+        `col.insertions.<x>` where `<x>` is `site`, `length`,
+        `mutation`, `accuracy`, and `homopolymer_length`; and
+        `col.deletions.<x>` where `<x>` is `start`, `end`,
+        `mutation`, `accuracy`, and `homopolymer_length`.
+        Unknown homopolymer lengths are null.
+
+      - A column of numpy arrays, such as the Q-values in
+        :class:`CCS.df`, is stored as lists of `uint8` if all values
+        are integers from 0 to 255, and otherwise as lists of floats.
+
+      - Other columns are converted by `pyarrow.Table.from_pandas`.
+
+    Args:
+        `df` (pandas DataFrame)
+            Data frame to convert.
+
+    Returns:
+        A `pyarrow.Table`.
+    """
+    pa = _import_pyarrow()
+    alignment_fields, mutation_fields = _arrowTypes()
+
+    coltypes = collections.OrderedDict()
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        values = df[col].values
+        first = next((x for x in values if x is not None), None)
+        if isinstance(first, dms_tools2.minimap2.Alignment):
+            coltypes[col] = 'alignment'
+        elif isinstance(first, dms_tools2.minimap2.Mutations):
+            coltypes[col] = 'mutations'
+        elif isinstance(first, numpy.ndarray):
+            coltypes[col] = 'array'
+
+    table = pa.Table.from_pandas(df.drop(list(coltypes), axis=1))
+    for col, coltype in coltypes.items():
+        values = df[col].values
+        if coltype == 'alignment':
+            for field in alignment_fields:
+                table = table.append_column(f"{col}.{field.name}",
+                        pa.array([None if a is None else
+                                  getattr(a, field.name) for a in values],
+                                 type=field.type))
+            for field in alignment_fields:
+                table = table.append_column(
+                        f"{col}.additional.{field.name}",
+                        pa.array([None if a is None else
+                                  [getattr(a2, field.name)
+                                   for a2 in a.additional]
+                                  for a in values],
+                                 type=pa.list_(field.type)))
+        elif coltype == 'mutations':
+            for muttype, (attr, fields) in mutation_fields.items():
+                for ifield, field in enumerate(fields):
+                    table = table.append_column(
+                            f"{col}.{muttype}.{field.name}",
+                            pa.array([None if m is None else
+                                      [_nanToNone(tup[ifield])
+                                       for tup in getattr(m, attr)]
+                                      for m in values],
+                                     type=pa.list_(field.type)))
+        else:
+            lengths = numpy.fromiter(map(len, values), dtype='int',
+                                     count=len(values))
+            flat = (numpy.concatenate(values) if lengths.sum()
+                    else numpy.array([], dtype='uint8'))
+            if flat.dtype.kind in 'iu' and ((flat.size == 0) or
+                    (flat.min() >= 0 and flat.max() < 256)):
+                flat = flat.astype('uint8')
+            else:
+                flat = flat.astype('float')
+            offsets = numpy.concatenate([[0], numpy.cumsum(lengths)])
+            table = table.append_column(col, pa.ListArray.from_arrays(
+                    pa.array(offsets.astype('int32')), pa.array(flat)))
+
+    metadata = dict(table.schema.metadata or {})
+    metadata[_ARROW_METADATA_KEY] = json.dumps(
+            {'columns':list(map(str, df.columns)),
+             'coltypes':coltypes}).encode()
+    return table.replace_schema_metadata(metadata)
+
+
+def fromArrowTable(table):
+    """Convert Arrow table from :meth:`toArrowTable` to a data frame.
+
+    Args:
+        `table` (`pyarrow.Table`)
+            Table created by :meth:`toArrowTable`, or a subset of
+            its columns.
+
+    Returns:
+        A pandas DataFrame. Any alignment and mutation columns flattened
+        by :meth:`toArrowTable` are turned back into
+        :py:mod:`dms_tools2.minimap2.Alignment` and
+        :class:`dms_tools2.minimap2.Mutations` objects if all of their
+        flattened columns are in `table`. Columns of arrays are numpy
+        arrays.
+    """
+    pa = _import_pyarrow()
+    alignment_fields, mutation_fields = _arrowTypes()
+    alignment_fieldnames = [field.name for field in alignment_fields]
+    metadata = json.loads((table.schema.metadata or {}).get(
+            _ARROW_METADATA_KEY, b'{}').decode())
+    coltypes = metadata.get('coltypes', {})
+
+    df = table.to_pandas()
+    newcols = {}
+    for col, coltype in coltypes.items():
+        if coltype == 'alignment':
+            flatcols = [f"{col}.{name}" for name in alignment_fieldnames]
+            addcols = [f"{col}.additional.{name}" for name in
+                       alignment_fieldnames]
+            if not set(flatcols + addcols) <= set(df.columns):
+                continue
+            newcols[col] = [
+                    None if a[0] is None else
+                    dms_tools2.minimap2.Alignment(
+                        additional=[dms_tools2.minimap2.Alignment(
+                                    additional=[],
+                                    **dict(zip(alignment_fieldnames, a2)))
+                                    for a2 in zip(*add)],
+                        **dict(zip(alignment_fieldnames, a)))
+                    for a, add in zip(
+                        zip(*[df[c].tolist() for c in flatcols]),
+                        zip(*[df[c].tolist() for c in addcols]))]
+            df = df.drop(flatcols + addcols, axis=1)
+        elif coltype == 'mutations':
+            flatcols = collections.OrderedDict(
+                    (muttype, [f"{col}.{muttype}.{field.name}"
+                               for field in fields])
+                    for muttype, (_, fields) in mutation_fields.items())
+            if not (set(c for cs in flatcols.values() for c in cs) <=
+                    set(df.columns)):
+                continue
+            muttuples = {}
+            for muttype, cs in flatcols.items():
+                converters = [_intOrNan if field.type == pa.int64() else
+                              (lambda x: x) for field in
+                              mutation_fields[muttype][1]]
+                muttuples[muttype] = [
+                        None if m[0] is None else
+                        [tuple(f(x) for f, x in zip(converters, tup))
+                         for tup in zip(*m)]
+                        for m in zip(*[df[c].tolist() for c in cs])]
+            newcols[col] = [
+                    None if subs is None else
+                    dms_tools2.minimap2.Mutations(
+                        substitution_tuples=subs,
+                        insertion_tuples=ins,
+                        deletion_tuples=dels,
+                        acc_not_q=True)
+                    for subs, ins, dels in zip(*muttuples.values())]
+            df = df.drop([c for cs in flatcols.values() for c in cs], axis=1)
+    df = df.assign(**newcols)
+
+    # restore order of columns in data frame passed to `toArrowTable`
+    order = {c:i for i, c in enumerate(metadata.get('columns', []))}
+    return df[sorted(df.columns, key=lambda c: order.get(c, len(order)))]
+
+
+def writeParquet(df, parquetfile, **kwargs):
+    """Write data frame with alignments and mutations to Parquet file.
+
+    Args:
+        `df` (pandas DataFrame)
+            Data frame, such as one returned by :meth:`matchAndAlignCCS`.
+        `parquetfile` (str)
+            Name of created Parquet file.
+        `**kwargs`
+            Other keyword arguments to `pyarrow.parquet.write_table`.
+
+    The data frame is converted with :meth:`toArrowTable`, which
+    describes the schema. Read it with :meth:`readParquet`.
+    """
+    _import_pyarrow()
+    import pyarrow.parquet
+    pyarrow.parquet.write_table(toArrowTable(df), parquetfile, **kwargs)
+
+
+def readParquet(parquetfile, *, columns=None, memory_map=True):
+    """Read data frame written by :meth:`writeParquet`.
+
+    Args:
+        `parquetfile` (str)
+            Parquet file written by :meth:`writeParquet`.
+        `columns` (`None` or list)
+            Read only these columns. Columns of alignments or
+            mutations can be specified either by their original name
+            (in which case all of their flattened columns are read and
+            turned back into objects) or by the names of individual
+            flattened columns described in :meth:`toArrowTable`.
+        `memory_map` (bool)
+            Memory map the file when reading.
+
+    Returns:
+        A pandas DataFrame created by :meth:`fromArrowTable`.
+    """
+    _import_pyarrow()
+    import pyarrow.parquet
+    if columns is not None:
+        schema = pyarrow.parquet.read_schema(parquetfile)
+        filecols = set(schema.names)
+        columns = [c for col in columns for c in
+                   ([col] if col in filecols else
+                    [name for name in schema.names
+                     if name.startswith(col + '.')])]
+    table = pyarrow.parquet.read_table(parquetfile, columns=columns,
+                                       memory_map=memory_map,
+                                       use_pandas_metadata=True)
+    return fromArrowTable(table)
+
+
+def _nanToNone(x):
+    """Convert `nan` to `None` (null in Arrow), otherwise return `x`."""
+    if isinstance(x, numbers.Real) and math.isnan(x):
+        return None
+    return x
+
+
+def _intOrNan(x):
+    """Convert `x` read from Arrow integer column to `int` or `nan`."""
+    if x is None or math.isnan(x):
+        return math.nan
+    return int(x)
+
+
+def _import_pyarrow():
+    """Import and return `pyarrow`, which is an optional dependency."""
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("You must install `pyarrow` to use Arrow "
+                          "or Parquet output")
+    return pyarrow
+
+
+@functools.lru_cache(maxsize=1)
+def _arrowTypes():
+    """Arrow types used by :meth:`toArrowTable`.
+
+    Returns:
+        The 2-tuple `(alignment_fields, mutation_fields)`.
+        `alignment_fields` lists fields of alignments other than
+        `additional`. `mutation_fields` is ordered dict keyed by
+        the type of mutation with values `(attribute, fields)` giving
+        the attribute of :class:`dms_tools2.minimap2.Mutations`
+        holding tuples for those mutations, and fields of the tuples.
+    """
+    pa = _import_pyarrow()
+    alignment_fields = [
+            pa.field(name, pa.string() if name in {'target', 'cigar_str'}
+                     else pa.int64())
+            for name in dms_tools2.minimap2.Alignment._fields
+            if name != 'additional']
+    mutation_fields = collections.OrderedDict([
+            ('substitutions', ('_substitution_tuples', [
+                pa.field('site', pa.int64()),
+                pa.field('mutation', pa.string()),
+                pa.field('accuracy', pa.float64())])),
+            ('insertions', ('_insertion_tuples', [
+                pa.field('site', pa.int64()),
+                pa.field('length', pa.int64()),
+                pa.field('mutation', pa.string()),
+                pa.field('accuracy', pa.float64()),
+                pa.field('homopolymer_length', pa.int64())])),
+            ('deletions', ('_deletion_tuples', [
+                pa.field('start', pa.int64()),
+                pa.field('end', pa.int64()),
+                pa.field('mutation', pa.string()),
+                pa.field('accuracy', pa.float64()),
+                pa.field('homopolymer_length', pa.int64())])),
+            ])
+    return (alignment_fields, mutation_fields)
+
+
 def qvalsToAccuracy(qvals, encoding='numbers', no_avg=False):
     r"""Converts set of quality scores into average accuracy.
 
@@ -1425,7 +2132,9 @@ def qvalsToAccuracy(qvals, encoding='numbers', no_avg=False):
     True
     """
     if encoding == 'numbers':
-        if isinstance(qvals, numbers.Number):
+        if isinstance(qvals, numbers.Integral) and 0 <= qvals < 256:
+            return 1 - _QVAL_ERROR_PROBS[qvals]
+        elif isinstance(qvals, numbers.Number):
             qvals = numpy.array([qvals])
             no_avg = False
         elif isinstance(qvals, list):
@@ -1437,23 +2146,142 @@ def qvalsToAccuracy(qvals, encoding='numbers', no_avg=False):
     if encoding == 'numbers':
         pass
     elif encoding == 'sanger':
-        qvals = numpy.array([ord(q) - 33 for q in qvals])
+        qvals = numpy.frombuffer(qvals.encode('ascii'), dtype='uint8') - 33
     else:
         raise RuntimeError("invalid `encoding`: {0}".format(encoding))
 
+    accs = 1 - _qvalsToErrorProbs(qvals)
     if no_avg:
-        return 1 - 10**(qvals / -10)
+        return accs
+    else:
+        return accs.sum() / len(qvals)
+
+
+def qvalsToSpanAccuracies(qvals, reads, starts, ends):
+    """Average accuracies of Q-values over many spans of many reads.
+
+    Equivalent to calling :meth:`qvalsToAccuracy` on each span,
+    but rather than averaging each span separately, computes the
+    cumulative sum of error probabilities along each read (all reads
+    concatenated into one array), so the average for any span is a
+    difference of two sums.
+
+    Args:
+        `qvals` (list or numpy array of numpy arrays)
+            Q-values for each read, as numbers.
+        `reads` (numpy array)
+            Index in `qvals` of the read for each span.
+        `starts` (numpy array)
+            Start (0-based, inclusive) of each span in its read.
+        `ends` (numpy array)
+            End (0-based, exclusive) of each span in its read.
+
+    Returns:
+        Numpy array with average accuracy of each span, or `nan`
+        for empty spans.
+
+    >>> qvals = [numpy.array([13, 77, 93]), numpy.array([15])]
+    >>> qvalsToSpanAccuracies(qvals, numpy.array([0, 0, 1, 1]),
+    ...         numpy.array([0, 1, 0, 1]), numpy.array([3, 3, 1, 1])
+    ...         ).round(3)
+    array([0.983, 1.   , 0.968,   nan])
+    """
+    reads = numpy.asarray(reads)
+    starts = numpy.asarray(starts)
+    ends = numpy.asarray(ends)
+    lengths = numpy.fromiter(map(len, qvals), dtype='int', count=len(qvals))
+    offsets = numpy.concatenate([[0], numpy.cumsum(lengths)])
+    if offsets[-1]:
+        errs = _qvalsToErrorProbs(numpy.concatenate(qvals))
     else:
-        return (1 - 10**(qvals / -10)).sum() / len(qvals)
+        errs = numpy.array([])
+    cumerrs = numpy.concatenate([[0], numpy.cumsum(errs)])
+    read_offsets = offsets[reads]
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        return 1 - ((cumerrs[read_offsets + ends] -
+                     cumerrs[read_offsets + starts]) / (ends - starts))
+
+
+def _qvalsToErrorProbs(qvals):
+    """Error probabilities for numpy array of Q-values.
+
+    Uses lookup table for integer Q-values, and computes
+    directly for other Q-values (for instance, `nan`).
+
+    >>> _qvalsToErrorProbs(numpy.array([10, 20], dtype='uint8'))
+    array([0.1 , 0.01])
+    >>> _qvalsToErrorProbs(numpy.array([10, numpy.nan]))
+    array([0.1, nan])
+    """
+    if qvals.dtype == numpy.uint8:
+        return _QVAL_ERROR_PROBS[qvals]
+    elif qvals.dtype.kind in 'iu' and (0 <= qvals.min()) and (
+            qvals.max() < len(_QVAL_ERROR_PROBS)):
+        return _QVAL_ERROR_PROBS[qvals]
+    else:
+        return 10**(qvals / -10)
+
+
+def parseCCSreport(reportfile):
+    """Parse report file created by ``ccs``.
+
+    Args:
+        `reportfile` (str)
+            Report file created by ``ccs`` version 3.0.0.
+
+    Returns:
+        The 2-tuple `(zmw_report, subread_report)` of data frames
+        as described for the attributes of same name in :class:`CCS`.
+    """
+    with open(reportfile) as f:
+        report = f.read()
+    m = _CCS_REPORT_MATCH.search(report)
+    assert m, "Cannot match {0}\n\n{1}".format(reportfile, report)
+
+    dfs = []
+    for read_type in ['zmw', 'subread']:
+        dfs.append(pandas.read_csv(
+                        io.StringIO(m.group(read_type)),
+                        names=['status', 'number', 'percent']
+                        )
+                   .assign(fraction=lambda x:
+                        x.percent.str.slice(None, -1)
+                        .astype('float') / 100)
+                   )
+    return tuple(dfs)
+
+
+def parseCCSreports(reportfiles, *, ncpus=1):
+    """Parse many report files created by ``ccs``, in parallel.
+
+    Args:
+        `reportfiles` (list)
+            Report files created by ``ccs``.
+        `ncpus` (int)
+            Number of CPUs used to parse the reports.
+
+    Returns:
+        List of 2-tuples `(zmw_report, subread_report)` as returned
+        by :meth:`parseCCSreport` for each file in `reportfiles`.
+    """
+    ncpus = max(1, min(ncpus, multiprocessing.cpu_count(), len(reportfiles)))
+    if ncpus > 1:
+        with multiprocessing.Pool(ncpus) as pool:
+            return pool.map(parseCCSreport, reportfiles)
+    else:
+        return [parseCCSreport(reportfile) for reportfile in reportfiles]
 
 
 def summarizeCCSreports(ccslist, report_type, plotfile,
-                        plotminfrac=0.005):
+                        plotminfrac=0.005, *, ncpus=1, plot=True):
     """Summarize and plot `CCS` reports.
 
     Args:
         `ccslist` (`CCS` object or list of them)
-            `CCS` objects to summarize
+            `CCS` objects to summarize. Can also be a dict keyed
+            by sample name with values the ``ccs`` report files,
+            in which case the reports are summarized without
+            loading any CCSs.
         `report_type` (str "zmw" or "subread")
             Which type of report to summarize
         `plotfile` (str or `None`)
@@ -1462,29 +2290,47 @@ def summarizeCCSreports(ccslist, report_type, plotfile,
         `plotminfrac` (float)
             Only plot status categories with >=
             this fraction in at least one `CCS`
+        `ncpus` (int)
+            Number of CPUs used to parse reports if `ccslist`
+            is a dict of report files.
+        `plot` (bool)
+            Make a plot? If `False`, `plotfile` is ignored.
 
     Returns:
 
-        - If `plotfile` is a str, returns a pandas DataFrame
-          aggregating the reports and creates `plotfile`.
+        - If `plot` is `False`, just returns a pandas DataFrame
+          aggregating the reports.
+
+        - If `plotfile` is a str, returns the data frame
+          and creates `plotfile`.
 
         - If `plotfile` is `None`, returns the 2-tuple
           containing the data frame and the plot.
     """
-    if isinstance(ccslist, CCS):
-        ccslist = [ccslist]
-    assert all([isinstance(ccs, CCS) for ccs in ccslist]), \
-            "`ccslist` not a list of `CCS` objects"
-
     assert report_type in ['zmw', 'subread']
-    report = report_type + '_report'
 
-    df = (pandas.concat([getattr(ccs, report).assign(sample=ccs.samplename)
-                for ccs in ccslist])
+    if isinstance(ccslist, dict):
+        samplenames = list(ccslist.keys())
+        reports = [report_tup[['zmw', 'subread'].index(report_type)]
+                   for report_tup in parseCCSreports(ccslist.values(),
+                                                     ncpus=ncpus)]
+    else:
+        if isinstance(ccslist, CCS):
+            ccslist = [ccslist]
+        assert all([isinstance(ccs, CCS) for ccs in ccslist]), \
+                "`ccslist` not a list of `CCS` objects"
+        samplenames = [ccs.samplename for ccs in ccslist]
+        reports = [getattr(ccs, report_type + '_report') for ccs in ccslist]
+
+    df = (pandas.concat([report.assign(sample=samplename)
+                for samplename, report in zip(samplenames, reports)])
           .sort_values(['sample', 'number'], ascending=False)
           [['sample', 'status', 'number', 'fraction']]
           )
 
+    if not plot:
+        return df
+
     # version of df that only has categories with `plotminfrac`
     plot_df = (df.assign(maxfrac=lambda x: x.groupby('status')
                          .fraction.transform('max'))
@@ -1509,7 +2355,7 @@ def summarizeCCSreports(ccslist, report_type, plotfile,
     else:
         p.save(plotfile, 
                height=3,
-               width=(2 + 0.3 * len(ccslist)),
+               width=(2 + 0.3 * len(samplenames)),
                verbose=False)
         plt.close()
         return df
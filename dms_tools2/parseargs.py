@@ -247,9 +247,10 @@ def prefsParentParser():
             formatter_class=argparse.ArgumentDefaultsHelpFormatter)
 
     parser.add_argument('--method', default='bayesian', 
-            choices=['ratio', 'bayesian'], help="Method to "
-            "estimate preferences: normalized enrichment ratios "
-            "or Bayesian inference.")
+            choices=['ratio', 'bayesian', 'laplace'], help="Method to "
+            "estimate preferences: normalized enrichment ratios, "
+            "Bayesian inference by MCMC, or fast approximate Bayesian "
+            "inference by a Laplace approximation.")
 
     parser.add_argument('--indir', help="Input counts files in this "
             "directory.")
@@ -265,12 +266,19 @@ def prefsParentParser():
     parser.add_argument('--conc', nargs=3, default=[1, 1, 1],
             type=float, metavar=('Cprefs', 'Cmut', 'Cerr'),
             help="Concentration parameters for priors for "
-            "``--method bayesian``. Priors are over preferences, "
+            "``--method bayesian`` or ``laplace``. Priors are over preferences, "
             "mutagenesis rate, and error rate(s).")
 
     parser.add_argument('--pseudocount', default=1,
             help="Pseudocount used with ``--method ratio``.")
 
+    parser.add_argument('--prefs_cachedir', help="Cache converged "
+            "``--method bayesian`` results for each site in this directory, "
+            "and re-use cached results for sites with the same counts, "
+            "priors, and MCMC settings. Entries are never removed, so "
+            "clear this directory after updating ``dms_tools2``. By "
+            "default, results are not cached.")
+
     return parser
 
 
@@ -11,12 +11,20 @@ to perform MCMC for Bayesian inferences.
 """
 
 
+import os
+import sys
 import time
 import math
 import tempfile
 import pickle
+import hashlib
+import platform
 import random
 import collections
+import functools
+import multiprocessing
+import multiprocessing.managers
+import multiprocessing.util
 
 import natsort
 import numpy
@@ -30,17 +38,119 @@ import dms_tools2
 #: minimum value for Dirichlet prior elements
 PRIOR_MIN_VALUE = 1.0e-7 
 
+#: directory for on-disk cache of compiled ``pystan`` models, which can
+#: be set by the environment variable ``DMS_TOOLS2_STAN_CACHE``. Set to
+#: `None` to disable the on-disk cache.
+STAN_MODEL_CACHE_DIR = os.environ.get('DMS_TOOLS2_STAN_CACHE',
+        os.path.join(os.path.expanduser('~'), '.cache', 'dms_tools2',
+                     'stan_models'))
+
+#: directory for on-disk cache of converged results of
+#: :func:`inferSitePrefs`, which can be set by the environment variable
+#: ``DMS_TOOLS2_PREFS_CACHE``. Set to `None` to disable the cache.
+SITE_PREFS_CACHE_DIR = os.environ.get('DMS_TOOLS2_PREFS_CACHE',
+        os.path.join(os.path.expanduser('~'), '.cache', 'dms_tools2',
+                     'site_prefs'))
+
+#: compiled ``pystan`` models already loaded in this process
+_STAN_MODELS = {}
+
+
+def _readCacheFile(cachefile):
+    """Unpickles object from `cachefile`.
+
+    Returns `None` if `cachefile` does not exist or cannot be read.
+    """
+    try:
+        with open(cachefile, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.PickleError, EOFError):
+        return None
+
+
+def _writeCacheFile(cachefile, obj):
+    """Pickles `obj` to `cachefile`, ignoring failures to write.
+
+    Writes to a temporary file that is then renamed, so concurrent
+    processes never read a partially written `cachefile`.
+    """
+    tmpfile = None
+    try:
+        os.makedirs(os.path.dirname(cachefile), exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(cachefile),
+                suffix='.tmp', delete=False) as f:
+            tmpfile = f.name
+            pickle.dump(obj, f)
+        os.replace(tmpfile, cachefile)
+        tmpfile = None
+    except (OSError, pickle.PickleError):
+        pass # cannot write cache
+    finally:
+        if tmpfile is not None:
+            try:
+                os.remove(tmpfile)
+            except OSError:
+                pass
+
+
+def _cachedStanModel(pystancode, verbose=False, cache=True):
+    """Get compiled ``pystan`` model, using cache if possible.
+
+    Compiling ``pystan`` models takes a minute or more, so compiled
+    models are pickled in :data:`STAN_MODEL_CACHE_DIR` and re-used
+    by later processes. Models are keyed by a hash of the model code,
+    the ``pystan`` version (which determines the Stan version),
+    :data:`PRIOR_MIN_VALUE`, and the Python version and platform.
+
+    Args:
+        `pystancode` (str)
+            Code for ``pystan`` model.
+        `verbose` (bool)
+            Verbose compilation if model is compiled.
+        `cache` (bool)
+            Use on-disk cache in :data:`STAN_MODEL_CACHE_DIR`?
+
+    Returns:
+        A `pystan.StanModel`.
+    """
+    key = hashlib.sha256('\n'.join([
+            pystancode,
+            pystan.__version__,
+            repr(PRIOR_MIN_VALUE),
+            sys.version,
+            platform.machine(),
+            sys.platform,
+            ]).encode()).hexdigest()
+    if key in _STAN_MODELS:
+        return _STAN_MODELS[key]
+
+    model = None
+    if cache and STAN_MODEL_CACHE_DIR:
+        cachefile = os.path.join(STAN_MODEL_CACHE_DIR,
+                                 'stanmodel_{0}.pickle'.format(key))
+        model = _readCacheFile(cachefile)
+    if model is None:
+        model = pystan.StanModel(model_code=pystancode, verbose=verbose)
+        if cache and STAN_MODEL_CACHE_DIR:
+            _writeCacheFile(cachefile, model)
+
+    _STAN_MODELS[key] = model
+    return model
+
 
 class StanModelNoneErr(object):
     """``pystan`` model when `error_model` is `none`.
     
     For use by inferSitePrefs`."""
-    def __init__(self, verbose=False):
-        """Compile ``pystan`` model.
+    def __init__(self, verbose=False, *, cache=True):
+        """Compile ``pystan`` model, or get it from cache.
 
         Args:
             `verbose` (bool)
                 Set to `True` if you want verbose compilation.
+            `cache` (bool)
+                Use compiled model cached in :data:`STAN_MODEL_CACHE_DIR`
+                if available, and cache model if compiled.
         """
         self.pystancode =\
 """
@@ -66,20 +176,23 @@ model {{
     nrpost ~ multinomial(fr);
 }}
 """.format(PRIOR_MIN_VALUE)
-        self.model = pystan.StanModel(model_code=self.pystancode, 
-                verbose=verbose)
+        self.model = _cachedStanModel(self.pystancode, verbose=verbose,
+                cache=cache)
 
 
 class StanModelSameErr:
     """``pystan`` model when `error_model` is `same`.
     
     For use by inferSitePrefs`."""
-    def __init__(self, verbose=False):
-        """Compile ``pystan`` model.
+    def __init__(self, verbose=False, *, cache=True):
+        """Compile ``pystan`` model, or get it from cache.
 
         Args:
             `verbose` (bool)
                 Set to `True` if you want verbose compilation.
+            `cache` (bool)
+                Use compiled model cached in :data:`STAN_MODEL_CACHE_DIR`
+                if available, and cache model if compiled.
         """
         self.pystancode =\
 """
@@ -120,20 +233,23 @@ model {{
     nrpost ~ multinomial(fr_plus_err);
 }}
 """.format(PRIOR_MIN_VALUE)
-        self.model = pystan.StanModel(model_code=self.pystancode,
-                verbose=verbose)
+        self.model = _cachedStanModel(self.pystancode, verbose=verbose,
+                cache=cache)
 
 
 class StanModelDifferentErr:
     """``pystan`` model when `error_model` is `different`.
     
     For use by inferSitePrefs`."""
-    def __init__(self, verbose=False):
-        """Compile ``pystan`` model.
+    def __init__(self, verbose=False, *, cache=True):
+        """Compile ``pystan`` model, or get it from cache.
 
         Args:
             `verbose` (bool)
                 Set to `True` if you want verbose compilation.
+            `cache` (bool)
+                Use compiled model cached in :data:`STAN_MODEL_CACHE_DIR`
+                if available, and cache model if compiled.
         """
         self.pystancode =\
 """
@@ -179,80 +295,169 @@ model {{
     nrpost ~ multinomial(fr_plus_err);
 }}
 """.format(PRIOR_MIN_VALUE)
-        self.model = pystan.StanModel(model_code=self.pystancode,
-                verbose=verbose)
+        self.model = _cachedStanModel(self.pystancode, verbose=verbose,
+                cache=cache)
 
 
-def _initialValuePrefs(error_model, nchains, iwtchar, nchars):
+def _initialValuePrefs(error_model, nchains, iwtchar, nchars, seed=None):
     """Gets valid initial values for ``pystan`` preference inference.
 
     Values initialized by ``pystan`` frequently have invalid values.
     This function will generate random values that are valid
     for initialization and return a list that can be passed to the 
-    `StanModel` as the `init` argument.
+    `StanModel` as the `init` argument. Candidate values for all
+    chains are drawn and checked at once.
+
+    Args:
+        `error_model` (str)
+            The error model: `none`, `same`, or `different`.
+        `nchains` (int)
+            Number of chains to initialize.
+        `iwtchar` (int)
+            Index of wildtype character.
+        `nchars` (int)
+            Number of characters.
+        `seed` (int or `None`)
+            Seed for the random values, so they are the same in any
+            process. If `None`, uses the global `numpy.random` state.
+
+    Returns:
+        List of `nchains` dicts keyed by parameter name.
+
+    >>> init = _initialValuePrefs('different', 4, 0, 20, seed=1)
+    >>> len(init)
+    4
+    >>> sorted(init[0].keys())
+    ['epsilonr', 'mur', 'pir', 'rhor']
+    >>> all(numpy.allclose(x.sum(), 1) for i in init for x in i.values())
+    True
+    >>> init2 = _initialValuePrefs('different', 4, 0, 20, seed=1)
+    >>> all((i[p] == i2[p]).all() for (i, i2) in zip(init, init2) for p in i)
+    True
     """
     initattempts = 10 # might fail for pathological random values
     nrescales = 10 # rescale non-wildtype values down this many times
     rescalefactor = 5.0 # rescale non-wildtype values down by this much
+    if seed is None:
+        random_state = numpy.random
+    else:
+        random_state = numpy.random.RandomState(seed)
     deltar = numpy.zeros(nchars)
     deltar[iwtchar] = 1.0
-    init = []
-    concparams = [1.0 for ichar in range(nchars)]
+    concparams = numpy.ones(nchars)
     concparams[iwtchar] = 10.0 # make this element bigger
     if error_model == 'none':
-        for chain in range(nchains):
-            while True:
-                chain_init = {
-                        'pir':numpy.random.dirichlet(concparams),
-                        'mur':numpy.random.dirichlet(concparams),
-                        }
-                if (all(chain_init['pir'] > PRIOR_MIN_VALUE) and 
-                        all(chain_init['mur'] > PRIOR_MIN_VALUE)):
-                    init.append(chain_init)
-                    break
-        return init
+        params = ['pir', 'mur']
+        errnames = []
     elif error_model == 'same':
-        posterrname = 'epsilonr'
+        params = ['pir', 'mur', 'epsilonr']
+        errnames = ['epsilonr']
     elif error_model == 'different':
-        posterrname = 'rhor'
+        params = ['pir', 'mur', 'epsilonr', 'rhor']
+        errnames = ['epsilonr', 'rhor']
     else:
         raise ValueError("Invalid error_model {0}".format(error_model))
-    for chain in range(nchains):
-        for iattempt in range(initattempts):
-            chain_init = {
-                    'pir':numpy.random.dirichlet(concparams),
-                    'mur':numpy.random.dirichlet(concparams),
-                    'epsilonr':numpy.random.dirichlet(concparams),
-                    }
-            if error_model == 'different':
-                chain_init['rhor'] = numpy.random.dirichlet(concparams)
-            irescale = 0
-            while irescale < nrescales and (any(
-                    chain_init['pir'] * chain_init['mur'] / 
-                    numpy.dot(chain_init['pir'], chain_init['mur']) 
-                    + chain_init[posterrname] - deltar < PRIOR_MIN_VALUE)
-                    or any(chain_init['mur'] + chain_init['epsilonr'] 
-                    - deltar < PRIOR_MIN_VALUE)): 
-                irescale += 1
-                chain_init['epsilonr'] /= rescalefactor
-                chain_init['epsilonr'][iwtchar] = 1.0 - sum(
-                        [chain_init['epsilonr'][ichar] for ichar 
-                        in range(nchars) if ichar != iwtchar])
-                if error_model == 'different':
-                    chain_init['rhor'] /= rescalefactor
-                    chain_init['rhor'][iwtchar] = 1.0 - sum([
-                            chain_init['rhor'][ichar] for ichar in 
-                            range(nchars) if ichar != iwtchar])
-            if (all(chain_init['pir'] * chain_init['mur'] / 
-                    numpy.dot(chain_init['pir'], chain_init['mur']) + 
-                    chain_init[posterrname] - deltar > PRIOR_MIN_VALUE) 
-                    and all(chain_init['mur'] + chain_init['epsilonr'] - 
-                    deltar > PRIOR_MIN_VALUE)):
+
+    def _isvalid(cands):
+        """Whether candidates of shape `(initattempts, nchains)` valid."""
+        if not errnames:
+            return ((cands['pir'] > PRIOR_MIN_VALUE).all(axis=-1) &
+                    (cands['mur'] > PRIOR_MIN_VALUE).all(axis=-1))
+        fr = cands['pir'] * cands['mur']
+        fr /= fr.sum(axis=-1, keepdims=True)
+        return ((fr + cands[errnames[-1]] - deltar >
+                    PRIOR_MIN_VALUE).all(axis=-1) &
+                (cands['mur'] + cands['epsilonr'] - deltar >
+                    PRIOR_MIN_VALUE).all(axis=-1))
+
+    init = [None] * nchains
+    while True: # only repeats for error_model of 'none'
+        cands = dict([(param, random_state.dirichlet(concparams,
+                (initattempts, nchains))) for param in params])
+        valid = _isvalid(cands)
+        for irescale in range(nrescales):
+            if valid.all() or not errnames:
                 break
-        else:
+            # scale down non-wildtype error rates of invalid candidates
+            for param in errnames:
+                rescaled = cands[param] / rescalefactor
+                rescaled[..., iwtchar] = 0
+                rescaled[..., iwtchar] = 1.0 - rescaled.sum(axis=-1)
+                cands[param] = numpy.where(valid[..., None], cands[param],
+                        rescaled)
+            valid = _isvalid(cands)
+        # use first valid attempt for each chain
+        ifirst = valid.argmax(axis=0)
+        for chain in numpy.flatnonzero(valid.any(axis=0)):
+            if init[chain] is None:
+                init[chain] = dict([(param, cands[param][ifirst[chain],
+                        chain]) for param in params])
+        if all(chain_init is not None for chain_init in init):
+            return init
+        elif errnames:
             raise ValueError("Failed to initialize")
-        init.append(chain_init)
-    return init
+
+
+def _mcmcConvergenceStats(draws):
+    """Split R-hat and effective sample size from MCMC draws.
+
+    Computed as by Stan (see Gelman et al, Bayesian Data Analysis, 3rd
+    edition): the R-hat is for chains split in half, and the effective
+    sample size uses Geyer's initial monotone sequence of the
+    autocorrelations.
+
+    Args:
+        `draws` (`numpy.ndarray`)
+            Shape `(niter, nchains, nparams)` post-warmup draws.
+
+    Returns:
+        The 2-tuple `(rhat, neff)` of arrays of length `nparams`.
+        R-hat is `nan` for parameters with no variation.
+
+    >>> numpy.random.seed(1)
+    >>> draws = numpy.random.normal(size=(1000, 4, 2))
+    >>> (rhat, neff) = _mcmcConvergenceStats(draws)
+    >>> bool(numpy.allclose(rhat, 1, atol=0.01))
+    True
+    >>> bool(numpy.allclose(neff, 4000, rtol=0.2))
+    True
+    >>> draws[:, 0] += 3 # one chain is different
+    >>> bool((_mcmcConvergenceStats(draws)[0] > 1.5).all())
+    True
+    """
+    (niter, nchains, nparams) = draws.shape
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        # split R-hat
+        half = niter // 2
+        split = numpy.concatenate([draws[ : half], draws[niter - half : ]],
+                axis=1)
+        w = split.var(axis=0, ddof=1).mean(axis=0)
+        b_over_n = split.mean(axis=0).var(axis=0, ddof=1)
+        rhat = numpy.sqrt(((half - 1) / half * w + b_over_n) / w)
+
+        # effective sample size from autocovariance computed by FFT
+        centered = draws - draws.mean(axis=0)
+        nfft = 2 ** int(math.ceil(math.log2(2 * niter)))
+        transform = numpy.fft.rfft(centered, n=nfft, axis=0)
+        acov = numpy.fft.irfft(transform * numpy.conj(transform), n=nfft,
+                axis=0)[ : niter] / niter
+        w = draws.var(axis=0, ddof=1).mean(axis=0)
+        var_plus = (niter - 1) / niter * w
+        if nchains > 1:
+            var_plus += draws.mean(axis=0).var(axis=0, ddof=1)
+        rho = 1 - (w - acov.mean(axis=1)) / var_plus
+        rho[0] = 1
+        # sums of adjacent pairs, truncated at first negative pair and
+        # made monotone decreasing
+        npairs = niter // 2
+        pairs = rho[0 : 2 * npairs : 2] + rho[1 : 2 * npairs : 2]
+        positive = numpy.cumprod(pairs > 0, axis=0).astype('bool')
+        pairs = numpy.minimum.accumulate(numpy.where(positive, pairs,
+                0), axis=0)
+        tau = -1 + 2 * pairs.sum(axis=0)
+        neff = nchains * niter / numpy.maximum(tau, 1.0 / math.log10(
+                max(nchains * niter, 10)))
+    return (rhat, neff)
 
 
 def inferPrefsByRatio(charlist, sites, wts, pre, post, errpre,
@@ -387,84 +592,113 @@ def inferPrefsByRatio(charlist, sites, wts, pre, post, errpre,
     """
     assert len(wts) == len(sites) > 0
     assert all([wt in charlist for wt in wts]), "invalid char in wts"
-    assert pseudocount > 0, "pseudocount must be greater than zero"
 
-    dfs = {'pre':pre.copy(),
-           'post':post.copy()
-           }
-    if errpre is not None:
-        dfs['errpre'] = errpre.copy()
-    if errpost is not None:
-        dfs['errpost'] = errpost.copy()
-
-    # compute total depth for each sample and sort by sites
-    depths = []
-    for stype in dfs.keys():
-        df = dfs[stype]
+    # counts as arrays with rows ordered by sites
+    counts = {}
+    for (stype, df) in [('pre', pre), ('post', post), ('errpre', errpre),
+            ('errpost', errpost)]:
+        if df is None:
+            counts[stype] = None
+            continue
         assert set(list(charlist) + ['site']) <= set(df.columns)
         assert set(sites) <= set(df['site'])
         df = df.query('site in @sites')
         assert len(df.index) == len(wts) == len(sites)
-        df['site'] = pandas.Categorical(df['site'], sites)
-        df = df.sort_values('site').reset_index(drop=True)
-        df['Nr'] = df[charlist].sum(axis=1).astype('float')
-        depths.append(df['Nr'])
-        dfs[stype] = df
-    mindepth = pandas.concat(depths, axis=1).min(axis=1)
-
-    # calculate scaled pseudocounts
-    pseudocounts = dict([(stype,
-            pseudocount * (dfs[stype]['Nr'] / mindepth).fillna(1.0))
-            for stype in dfs.keys()])
-
-    # calculate frequencies
-    for stype in dfs.keys():
-        df = dfs[stype]
-        for c in charlist:
-            df['f{0}'.format(c)] = (df[c] + pseudocounts[stype]) / (
-                    df['Nr'] + len(charlist) * pseudocounts[stype]) 
-            df['delta{0}'.format(c)] = [int(wt == c) for wt in wts]
-        dfs[stype] = df
-
-    # fill values for errpre / errpost if they were None
-    for stype in ['pre', 'post']:
-        err = 'err{0}'.format(stype)
-        if err not in dfs:
-            dfs[err] = pandas.DataFrame(dict([('site', sites)] +
-                    [('f{0}'.format(c), dfs[stype]['delta{0}'.format(c)])
-                    for c in charlist]))
-
-    # compute phi values
-    fr = {}
-    for (key, f, ferr, p) in [
-            ('before', dfs['pre'], dfs['errpre'], pseudocounts['pre']),
-            ('after', dfs['post'], dfs['errpost'], pseudocounts['post']),
-            ]:
-        fr[key] = {'wt':numpy.zeros(len(sites))}
-        for c in charlist:
-            fr[key][c] = numpy.maximum(
-                    p / (f['Nr'].values + len(charlist) * p),
-                    f['f{0}'.format(c)].values 
-                        + f['delta{0}'.format(c)].values 
-                        - ferr['f{0}'.format(c)].values
-                    )
-            fr[key]['wt'] += fr[key][c] * f['delta{0}'.format(c)].values
-    phi = pandas.DataFrame({'site':sites})
-    for c in charlist:
-        phi[c] = ((fr['after'][c] / fr['after']['wt']) /
-                  (fr['before'][c] / fr['before']['wt']))
-    phi['denom'] = phi[charlist].sum(axis=1)
-
-    # normalize phi values to get pi values
-    prefs = phi[charlist].div(phi['denom'], axis=0)
+        counts[stype] = df.set_index('site').loc[sites, charlist].values
+
+    prefs = pandas.DataFrame(inferPrefsByRatioArrays(
+            [charlist.index(wt) for wt in wts], pseudocount=pseudocount,
+            **counts), columns=charlist)
     prefs.insert(0, 'site', sites)
 
     return prefs
+
+
+def inferPrefsByRatioArrays(iwt, pre, post, errpre, errpost, pseudocount):
+    r"""Preferences from enrichment ratios for arrays of counts.
+
+    Calculates the same preferences as :func:`inferPrefsByRatio`, but
+    for counts in arrays, which can have leading dimensions so that
+    preferences for many samples are calculated at once.
+
+    Args:
+        `iwt` (array-like of int)
+            Index of wildtype character at each site.
+        `pre` (numpy.ndarray)
+            Pre-selection counts, shape `(..., nsites, nchars)` where
+            leading dimensions are, for instance, samples.
+        `post` (numpy.ndarray)
+            Like `pre` but for post-selection counts.
+        `errpre` (`None` or numpy.ndarray)
+            Like `pre` but for pre-selection error-control counts,
+            or `None` if there is no such control.
+        `errpost` (`None` or numpy.ndarray)
+            Like `pre` but for post-selection error-control counts,
+            or `None` if there is no such control.
+        `pseudocount` (float or int)
+            The pseudocount to add to each observation.
+
+    Returns:
+        A `numpy.ndarray` of preferences. Its shape is that of the
+        count arrays broadcast against each other, so for instance
+        error controls of shape `(nsites, nchars)` can be used for
+        counts of shape `(nsamples, nsites, nchars)`.
+
+    >>> pre = numpy.array([[[90, 5, 5], [10, 80, 10]],
+    ...                    [[80, 10, 10], [0, 0, 0]]])
+    >>> post = numpy.array([[[90, 9, 1], [50, 50, 0]],
+    ...                     [[40, 40, 20], [0, 0, 0]]])
+    >>> inferPrefsByRatioArrays([0, 1], pre, post, None, None, 1).round(3)
+    array([[[0.333, 0.556, 0.111],
+            [0.865, 0.118, 0.017]],
+    <BLANKLINE>
+           [[0.082, 0.607, 0.311],
+            [0.333, 0.333, 0.333]]])
+    """
+    assert pseudocount > 0, "pseudocount must be greater than zero"
+    counts = dict([(stype, numpy.asarray(n, dtype='float')) for (stype, n)
+            in [('pre', pre), ('post', post), ('errpre', errpre),
+                ('errpost', errpost)] if n is not None])
+    (nsites, nchars) = counts['pre'].shape[-2 : ]
+    assert all(n.shape[-2 : ] == (nsites, nchars) for n in counts.values())
+    delta = numpy.zeros((nsites, nchars))
+    delta[numpy.arange(nsites), iwt] = 1
+
+    # total depth and scaled pseudocount for each sample
+    depths = dict([(stype, n.sum(axis=-1, keepdims=True)) for (stype, n)
+            in counts.items()])
+    mindepth = functools.reduce(numpy.minimum, depths.values())
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        pseudocounts = {}
+        for (stype, depth) in depths.items():
+            scale = depth / mindepth
+            pseudocounts[stype] = pseudocount * numpy.where(
+                    numpy.isnan(scale), 1.0, scale)
+
+        # error-corrected frequencies before and after selection
+        fr = {}
+        for (key, stype) in [('before', 'pre'), ('after', 'post')]:
+            p = pseudocounts[stype]
+            denom = depths[stype] + nchars * p
+            f = (counts[stype] + p) / denom
+            err = 'err{0}'.format(stype)
+            if err in counts:
+                ferr = (counts[err] + pseudocounts[err]) / (
+                        depths[err] + nchars * pseudocounts[err])
+            else:
+                ferr = delta
+            fr[key] = numpy.maximum(p / denom, f + delta - ferr)
+            fr[key] /= (fr[key] * delta).sum(axis=-1, keepdims=True)
+
+        # normalize enrichment ratios to get preferences
+        phi = fr['after'] / fr['before']
+        return phi / phi.sum(axis=-1, keepdims=True)
     
 
 def inferSitePrefs(charlist, wtchar, error_model, counts, 
         priors, seed=1, niter=10000, increasetries=5, n_jobs=1, 
-        r_max=1.1, neff_min=100, nchains=4, increasefac=2):
+        r_max=1.1, neff_min=100, nchains=4, increasefac=2, nblocks=4,
+        cache=False):
     r"""Infers site-specific preferences by MCMC for a specific site.
 
     Infer the site-specific preferences :math:`\pi_{r,a}` for some site
@@ -504,7 +738,7 @@ def inferSitePrefs(charlist, wtchar, error_model, counts,
 
     The MCMC tries to guarantee convergence via the parameters specified
     by `r_max`, `neff_min`, `nchains`, `niter`, `increasefac`, 
-    and `increasetries`.
+    `increasetries`, and `nblocks`.
 
     Args:
         `charlist` (list)
@@ -566,18 +800,31 @@ def inferSitePrefs(charlist, wtchar, error_model, counts,
             Random number seed for MCMC. 
         `n_jobs` (int)
             Number of CPUs to use, -1 means all available.
-        `niter`, `increasetries`, `r_max`, `neff_min`, `nchains`, `increasefac`
+        `niter`, `increasetries`, `r_max`, `neff_min`, `nchains`, `increasefac`, `nblocks`
             Specify MCMC convergence. They all have reasonable defaults.
             The MCMC is considered to have converged if the mean Gelman-Rubin R
             statistic (http://www.jstor.org/stable/2246093) over all 
             :math:`\pi_{r,x}` values <= `r_max` and the mean effective sample
-            size is >= `neff_min`. The MCMC first runs with `nchains` chains
-            and `niter` iterations. If it fails to converge, it increases
-            the iterations by a factor of `increasefac` and tries again,
-            and repeats until it converges or has tried `increasetries`
-            times to increase the number of iterations. If the effective
+            size is >= `neff_min`. The MCMC runs `nchains` chains
+            with `niter` iterations, of which half are warmup. The
+            post-warmup iterations are run in `nblocks` blocks, and
+            the MCMC stops as soon as it has converged after a block.
+            If it has not converged after `niter` iterations, the chains
+            are continued (keeping all prior draws) to increase the
+            post-warmup iterations by a factor of `increasefac`, and
+            this is repeated until it converges or the iterations have
+            been increased `increasetries` times. If the effective
             sample size exceeds 3 times `neff_min` then we allow
             R to be `1 + 1.5 (r_max - 1)`.
+        `cache` (bool or str)
+            Use on-disk cache? If `True`, cache in
+            :data:`SITE_PREFS_CACHE_DIR`; if a str, cache in that
+            directory. Results that converged are cached by a hash of the
+            model, data, `seed`, and MCMC settings, and re-used if the
+            function is called again with the same values. Entries are
+            never removed, and are **not** invalidated by changes to
+            ``dms_tools2`` that keep its version, so clear the cache
+            directory after changing the code.
 
     Returns:
         The tuple `(converged, pi_means, pi_95credint, logstring)` where:
@@ -634,82 +881,622 @@ def inferSitePrefs(charlist, wtchar, error_model, counts,
     else:
         raise ValueError("Invalid error_model {0}".format(error_model))
 
+    if isinstance(cache, str):
+        cachedir = cache
+    elif cache:
+        cachedir = SITE_PREFS_CACHE_DIR
+    else:
+        cachedir = None
+    if cachedir:
+        key = hashlib.sha256(repr((
+                sm.model_code,
+                pystan.__version__,
+                dms_tools2.__version__,
+                list(charlist),
+                wtchar,
+                sorted((ctype, [int(counts[ctype][c]) for c in charlist])
+                        for ctype in counts),
+                sorted((prior, [float(priors[prior][c]) for c in charlist])
+                        for prior in priors),
+                seed, niter, increasetries, r_max, neff_min, nchains,
+                increasefac, nblocks,
+                )).encode()).hexdigest()
+        cachefile = os.path.join(cachedir, key[ : 2],
+                'siteprefs_{0}.pickle'.format(key))
+        result = _readCacheFile(cachefile)
+        if result is not None:
+            (converged, pi_means, pi_95credint, cachedlog) = result
+            return (converged, pi_means, pi_95credint, '\n'.join([
+                    logstring[0], '\tUsing result cached in {0}:'.format(
+                    cachefile), cachedlog]))
+    else:
+        cachefile = None
+
+    # initial run with warmup, then continue in blocks until converged
+    warmup = niter // 2
+    targetdraws = niter - warmup
+    blocksize = max(1, targetdraws // nblocks)
+    init = _initialValuePrefs(error_model, nchains, charlist.index(wtchar),
+            len(charlist), seed=seed)
+    fit = sm.sampling(data=data, iter=warmup + blocksize, warmup=warmup,
+            chains=nchains, seed=seed, n_jobs=n_jobs, refresh=-1, init=init)
+    # continuations keep each chain's adapted step size and metric
+    stepsize = fit.get_stepsize()
+    inv_metric = fit.get_inv_metric()
+    draws = fit.extract(pars='pir', permuted=False)['pir']
     ntry = 0
+    iblock = 0
     while True: # run until converged or tries exhausted
-        init = _initialValuePrefs(error_model, nchains, 
-                charlist.index(wtchar), len(charlist))
-        fit = sm.sampling(data=data, iter=niter, chains=nchains, 
-                seed=seed, n_jobs=n_jobs, refresh=-1, init=init)
-        # extract output
-        fitsummary = fit.summary()
-        rownames = list(fitsummary['summary_rownames'])
-        colnames = list(fitsummary['summary_colnames'])
-        summary = fitsummary['summary']
-        char_row_indices = dict([(c, rownames.index('pir[{0}]'.format(
-                charlist.index(c) + 1))) for c in charlist]) 
-        rindex = colnames.index('Rhat')
-        neffindex = colnames.index('n_eff')
-        rlist = [summary[char_row_indices[c]][rindex] for c in charlist]
-        rhat_is_nan = [rhat for rhat in rlist if math.isnan(rhat)]
-        rlist = [rhat for rhat in rlist if not math.isnan(rhat)]
-        nefflist = [summary[char_row_indices[c]][neffindex] for c in charlist]
-        neffmean = sum(nefflist) / float(len(nefflist))
+        (rhats, neffs) = _mcmcConvergenceStats(draws)
+        ndraws = draws.shape[0]
+        rlist = [rhat for rhat in rhats if not math.isnan(rhat)]
+        rhat_is_nan = [rhat for rhat in rhats if math.isnan(rhat)]
+        neffmean = float(numpy.mean(neffs))
         if not rlist:
             assert len(rhat_is_nan) == len(charlist)
             rmean = None
             logstring.append('\tAfter {0} MCMC chains each of {1} steps, '
                     'mean R = nan and mean Neff = {2}'.format(
-                    nchains, niter, neffmean))
+                    nchains, warmup + ndraws, neffmean))
         else:
             rmean = sum(rlist) / float(len(rlist))
             logstring.append('\tAfter {0} MCMC chains each of {1} steps, '
                     'mean R = {2} and mean Neff = {3}'.format(
-                    nchains, niter, rmean, neffmean))
+                    nchains, warmup + ndraws, rmean, neffmean))
         if rhat_is_nan:
             logstring.append('\t\tThere are {0} characters where R is nan'
                     .format(len(rhat_is_nan)))
         # allow convergence with stringent criteria when Rhat is nan
         # pystan appears to give Rhat of nan for sites with low preference
         # pystan Rhat values of nan are a bug according to pystan developers
-        if ((len(rhat_is_nan) < 0.25 * len(charlist) and 
+        converged = ((len(rhat_is_nan) < 0.25 * len(charlist) and 
                 rmean != None and rmean <= r_max and neffmean >= neff_min) 
                 or (neffmean >= 3.0 * neff_min and ((rmean == None) 
-                or (rmean != None and rmean <= 1.0 + 1.5 * (r_max - 1.0))))):
-            # converged
-            logstring.append('\tMCMC converged at {0}.'.format(time.asctime()))
-            meanindex = colnames.index('mean')
-            lower95index = colnames.index('2.5%')
-            upper95index = colnames.index('97.5%')
-            pi_means = dict([(c, summary[char_row_indices[c]][meanindex]) 
-                    for c in charlist])
-            pi_95credint = dict([(c, 
-                    (summary[char_row_indices[c]][lower95index], 
-                    summary[char_row_indices[c]][upper95index])) 
-                    for c in charlist])
-            return (True, pi_means, pi_95credint, '\n'.join(logstring))
-        else:
-            # failed to converge
+                or (rmean != None and rmean <= 1.0 + 1.5 * (r_max - 1.0)))))
+        if not converged and ndraws >= targetdraws:
             if ntry < increasetries:
                 ntry += 1
-                niter = int(niter * increasefac)
+                targetdraws = int(targetdraws * increasefac)
                 logstring.append("\tMCMC failed to converge. Doing retry "
-                        "{0} with {1} iterations per chain.".format(
-                        ntry, niter))
+                        "{0} by continuing chains to {1} iterations per "
+                        "chain.".format(ntry, warmup + targetdraws))
             else:
                 with open('_no_converge_prefs_debug.pickle', 'wb') as f_debug:
-                    pickle.dump((counts, init, fitsummary), f_debug)
+                    pickle.dump((counts, init, {'rhat':rhats, 'neff':neffs}),
+                            f_debug)
                 logstring.append("\tMCMC FAILED to converge after "
                         "all attempts at {0}.".format(time.asctime()))
-                meanindex = colnames.index('mean')
-                lower95index = colnames.index('2.5%')
-                upper95index = colnames.index('97.5%')
-                pi_means = dict([(c, summary[char_row_indices[c]][meanindex]) 
-                        for c in charlist])
-                pi_95credint = dict([(c, 
-                        (summary[char_row_indices[c]][lower95index], 
-                        summary[char_row_indices[c]][upper95index])) 
-                        for c in charlist])
-                return (False, pi_means, pi_95credint, '\n'.join(logstring))
+        if converged or ndraws >= targetdraws:
+            if converged:
+                logstring.append('\tMCMC converged at {0}.'.format(
+                        time.asctime()))
+            pidraws = draws.reshape(-1, len(charlist))
+            means = pidraws.mean(axis=0)
+            (lower95, upper95) = numpy.percentile(pidraws, [2.5, 97.5],
+                    axis=0)
+            pi_means = dict([(c, means[i]) for (i, c) in
+                    enumerate(charlist)])
+            pi_95credint = dict([(c, (lower95[i], upper95[i])) for (i, c)
+                    in enumerate(charlist)])
+            result = (converged, pi_means, pi_95credint,
+                    '\n'.join(logstring))
+            if converged and cachefile:
+                _writeCacheFile(cachefile, result)
+            return result
+        # continue chains from their last positions
+        iblock += 1
+        nnew = min(max(blocksize, ndraws // 2), targetdraws - ndraws)
+        fit = sm.sampling(data=data, iter=nnew, warmup=0, chains=nchains,
+                seed=seed + iblock, n_jobs=n_jobs, refresh=-1,
+                init=fit.get_last_position(), control={
+                'adapt_engaged':False, 'stepsize':stepsize,
+                'inv_metric':dict(enumerate(inv_metric))})
+        draws = numpy.concatenate([draws, fit.extract(pars='pir',
+                permuted=False)['pir']])
+
+#: ``pystan`` model for this process, set by :func:`initSitePrefsWorker`
+_WORKER_STAN_MODEL = None
+
+
+def initSitePrefsWorker(error_model):
+    """Initializer for pool processes that run :func:`inferSitePrefsWorker`.
+
+    Loads the ``pystan`` model once per process so that it does not
+    need to be pickled and sent to the process for every site. Use as
+    the `initializer` of a `multiprocessing.Pool`. The model is obtained
+    from the in-process or on-disk cache of compiled models, so compile
+    it in the parent process first (e.g., by creating an instance
+    of the model class) so processes do not each compile it.
+
+    Args:
+        `error_model` (str)
+            The error model: `none`, `same`, or `different`.
+    """
+    global _WORKER_STAN_MODEL
+    _WORKER_STAN_MODEL = {'none':StanModelNoneErr,
+                          'same':StanModelSameErr,
+                          'different':StanModelDifferentErr,
+                          }[error_model]()
+
+
+def inferSitePrefsWorker(site, charlist, wtchar, counts, priors, seed=1,
+        niter=10000, cache=False):
+    """Runs :func:`inferSitePrefs` with model from :func:`initSitePrefsWorker`.
+
+    Args:
+        `site` (str or int)
+            Site label, returned unchanged to identify the result.
+        `charlist`, `wtchar`, `counts`, `priors`, `seed`, `niter`, `cache`
+            Passed to :func:`inferSitePrefs`.
+
+    Returns:
+        The tuple `(site, seed, result)` where `result` is the
+        tuple returned by :func:`inferSitePrefs`.
+    """
+    assert _WORKER_STAN_MODEL is not None, "initSitePrefsWorker not called"
+    return (site, seed, inferSitePrefs(charlist, wtchar, _WORKER_STAN_MODEL,
+            counts, priors, seed=seed, niter=niter, cache=cache))
+
+
+#: environment variable giving the address of a :class:`SitePrefsPool`
+#: served by :func:`serveSitePrefsPool`, which ``dms2_prefs`` then uses
+SITE_PREFS_POOL_ENV = 'DMS_TOOLS2_SITE_PREFS_POOL'
+
+#: environment variable giving the authentication key (as hex) for the
+#: :class:`SitePrefsPool` at the address in :data:`SITE_PREFS_POOL_ENV`
+SITE_PREFS_POOL_AUTHKEY_ENV = 'DMS_TOOLS2_SITE_PREFS_POOL_AUTHKEY'
+
+
+class SitePrefsPool:
+    """Pool of processes that run :func:`inferSitePrefsWorker`.
+
+    Typically served to other processes by :func:`serveSitePrefsPool`,
+    so that the sites of many samples all share one pool of workers.
+
+    Args:
+        `error_model` (str)
+            The error model: `none`, `same`, or `different`.
+        `ncpus` (int)
+            Number of worker processes.
+    """
+
+    def __init__(self, error_model, ncpus):
+        """See main class docstring."""
+        # compile here so workers all get model from the cache
+        initSitePrefsWorker(error_model)
+        self._pool = multiprocessing.Pool(ncpus,
+                initializer=initSitePrefsWorker, initargs=(error_model,))
+
+    def infer(self, *args):
+        """Runs :func:`inferSitePrefsWorker` with `args` in a worker.
+
+        Blocks until a worker is free and the site is done, so call
+        from several threads to keep all workers busy.
+        """
+        return self._pool.apply(inferSitePrefsWorker, args)
+
+
+#: the :class:`SitePrefsPool` in a :func:`serveSitePrefsPool` server
+_SERVED_SITE_PREFS_POOL = None
+
+
+def _initSitePrefsPoolServer(error_model, ncpus):
+    """Creates the :class:`SitePrefsPool` for the server process."""
+    global _SERVED_SITE_PREFS_POOL
+    _SERVED_SITE_PREFS_POOL = SitePrefsPool(error_model, ncpus)
+
+
+def _servedSitePrefsPool():
+    """Returns the :class:`SitePrefsPool` of the server process."""
+    assert _SERVED_SITE_PREFS_POOL is not None, "server not initialized"
+    return _SERVED_SITE_PREFS_POOL
+
+
+class _SitePrefsPoolManager(multiprocessing.managers.BaseManager):
+    """Serves the :class:`SitePrefsPool` of the server process."""
+    pass
+
+_SitePrefsPoolManager.register('sitePrefsPool',
+        callable=_servedSitePrefsPool)
+
+
+def serveSitePrefsPool(error_model, ncpus):
+    """Starts server process with a :class:`SitePrefsPool`.
+
+    Other processes (such as ``dms2_prefs`` runs) get the pool with
+    :func:`connectSitePrefsPool`, so MCMC for all of their sites uses
+    one set of `ncpus` workers. The server listens on a Unix socket
+    in a temporary directory that is removed when this process exits.
+
+    Args:
+        `error_model` (str)
+            The error model: `none`, `same`, or `different`.
+        `ncpus` (int)
+            Number of worker processes.
+
+    Returns:
+        The 3-tuple `(manager, address, authkey)`. Call
+        `manager.shutdown()` when done. Pass `address` and `authkey`
+        to :func:`connectSitePrefsPool`, or set them as the
+        :data:`SITE_PREFS_POOL_ENV` and :data:`SITE_PREFS_POOL_AUTHKEY_ENV`
+        environment variables for ``dms2_prefs`` subprocesses.
+        `address` is the path to the socket, and `authkey` is a
+        hex string.
+    """
+    authkey = os.urandom(16)
+    address = os.path.join(multiprocessing.util.get_temp_dir(),
+            'sitePrefsPool-{0}'.format(os.urandom(8).hex()))
+    manager = _SitePrefsPoolManager(address=address, authkey=authkey)
+    manager.start(initializer=_initSitePrefsPoolServer,
+            initargs=(error_model, ncpus))
+    assert manager.address == address, "server not on Unix socket"
+    return (manager, address, authkey.hex())
+
+
+def connectSitePrefsPool(address, authkey):
+    """Gets :class:`SitePrefsPool` served by :func:`serveSitePrefsPool`.
+
+    Args:
+        `address` (str)
+            The socket path returned by :func:`serveSitePrefsPool`.
+        `authkey` (str)
+            The hex authentication key returned by
+            :func:`serveSitePrefsPool`.
+
+    Returns:
+        A proxy for the :class:`SitePrefsPool`. Its `infer` method
+        can be called concurrently from several threads.
+    """
+    manager = _SitePrefsPoolManager(address=address,
+            authkey=bytes.fromhex(authkey))
+    manager.connect()
+    return manager.sitePrefsPool()
+
+
+def _laplaceObjective(z, error_model, counts, priors, iwt):
+    r"""Log posterior and its gradient for `inferPrefsByLaplace`.
+
+    Args:
+        `z` (`numpy.ndarray`)
+            Shape `(nsites, nsimplices, nchars)` additive log-ratio
+            coordinates of :math:`\pi_r`, :math:`\mu_r`, and (depending
+            on `error_model`) :math:`\epsilon_r` and :math:`\rho_r`,
+            with the wildtype element of each equal to zero.
+        `error_model`, `counts`, `priors`
+            As for `inferPrefsByLaplace`, but with the counts and priors
+            as arrays of shape `(nsites, nchars)`.
+        `iwt` (`numpy.ndarray`)
+            Index of wildtype character at each site.
+
+    Returns:
+        The 2-tuple `(logp, grad)` where `logp` has shape `(nsites,)`
+        and is `-inf` for invalid values, and `grad` has the shape of
+        `z` and is zero for wildtype elements. The log posterior
+        includes the Jacobian of the additive log-ratio transformation.
+    """
+    nsites = z.shape[0]
+    x = numpy.exp(z - z.max(axis=2, keepdims=True))
+    x /= x.sum(axis=2, keepdims=True)
+    pi = x[:, 0]
+    mu = x[:, 1]
+    delta = numpy.zeros(pi.shape)
+    delta[numpy.arange(nsites), iwt] = 1.0
+    s = (pi * mu).sum(axis=1, keepdims=True)
+    f = pi * mu / s
+    if error_model == 'none':
+        m = mu
+        g = f
+    elif error_model == 'same':
+        eps = x[:, 2]
+        m = mu + eps - delta
+        g = f + eps - delta
+    elif error_model == 'different':
+        eps = x[:, 2]
+        rho = x[:, 3]
+        m = mu + eps - delta
+        g = f + rho - delta
+    else:
+        raise ValueError("Invalid error_model {0}".format(error_model))
+    valid = (m > 0).all(axis=1) & (g > 0).all(axis=1) & (x > 0).all(
+            axis=(1, 2))
+    # only evaluate logs for valid sites to avoid warnings
+    m = numpy.where(valid[:, None], m, 1.0)
+    g = numpy.where(valid[:, None], g, 1.0)
+    logx = numpy.log(numpy.where(valid[:, None, None], x, 1.0))
+
+    logp = ((priors['pir_prior_params'] * logx[:, 0]).sum(axis=1) +
+            (priors['mur_prior_params'] * logx[:, 1]).sum(axis=1) +
+            (counts['pre'] * numpy.log(m)).sum(axis=1) +
+            (counts['post'] * numpy.log(g)).sum(axis=1))
+    # gradient is computed as x times partial derivative wrt x
+    w = counts['post'] / g
+    fw = f * (w - (f * w).sum(axis=1, keepdims=True))
+    xgrad = numpy.empty(x.shape)
+    xgrad[:, 0] = priors['pir_prior_params'] + fw
+    xgrad[:, 1] = priors['mur_prior_params'] + fw + mu * counts['pre'] / m
+    if error_model == 'same':
+        logp += ((priors['epsilonr_prior_params'] + counts['err']) *
+                logx[:, 2]).sum(axis=1)
+        xgrad[:, 2] = (priors['epsilonr_prior_params'] + counts['err'] +
+                eps * (counts['pre'] / m + w))
+    elif error_model == 'different':
+        logp += ((priors['epsilonr_prior_params'] + counts['errpre']) *
+                logx[:, 2]).sum(axis=1)
+        logp += ((priors['rhor_prior_params'] + counts['errpost']) *
+                logx[:, 3]).sum(axis=1)
+        xgrad[:, 2] = (priors['epsilonr_prior_params'] + counts['errpre'] +
+                eps * counts['pre'] / m)
+        xgrad[:, 3] = (priors['rhor_prior_params'] + counts['errpost'] +
+                rho * w)
+    grad = xgrad - x * xgrad.sum(axis=2, keepdims=True)
+    grad[numpy.arange(nsites), :, iwt] = 0.0
+    logp[~valid] = -numpy.inf
+    return (logp, grad)
+
+
+def _laplaceHessian(z, grad, free, objective, h=1e-6):
+    """Hessian of `objective` in free coordinates by finite differences.
+
+    Args:
+        `z` (`numpy.ndarray`)
+            Shape `(nsites, nsimplices, nchars)` point for Hessian.
+        `grad` (`numpy.ndarray`)
+            Gradient of `objective` at `z`.
+        `free` (`numpy.ndarray`)
+            Shape `(nsites, nchars - 1)` indices of non-wildtype
+            elements of each simplex at each site.
+        `objective` (function)
+            Takes `z` and returns `(logp, grad)`.
+        `h` (float)
+            Step for forward differences.
+
+    Returns:
+        Array of shape `(nsites, nfree, nfree)` where `nfree` is
+        `nsimplices * (nchars - 1)`.
+    """
+    (nsites, nsimplices, nchars) = z.shape
+    isite = numpy.arange(nsites)
+    nfree = nsimplices * (nchars - 1)
+    freeindex = (isite[:, None, None], numpy.arange(nsimplices)[None, :, None],
+            free[:, None, :])
+    grad = grad[freeindex].reshape(nsites, nfree)
+    hessian = numpy.empty((nsites, nfree, nfree))
+    j = 0
+    for k in range(nsimplices):
+        for i in range(nchars - 1):
+            zh = z.copy()
+            zh[isite, k, free[:, i]] += h
+            hessian[:, :, j] = (objective(zh)[1][freeindex].reshape(
+                    nsites, nfree) - grad) / h
+            j += 1
+    return (hessian + numpy.transpose(hessian, (0, 2, 1))) / 2
+
+
+def inferPrefsByLaplace(charlist, wts, error_model, counts, priors,
+        *, ndraws=1000, seed=1, maxiter=100):
+    r"""Fast approximate Bayesian preferences for many sites at once.
+
+    Uses the same model as `inferSitePrefs`, but rather than MCMC uses
+    a Laplace approximation to the posterior. This is much faster, and
+    all sites are handled together with vectorized ``numpy`` operations,
+    so it is useful for exploratory analyses. The posterior mean and
+    credible intervals are only approximate, and are least accurate
+    for sites with few counts.
+
+    Each of :math:`\boldsymbol{\mathbf{\pi_r}}`,
+    :math:`\boldsymbol{\mathbf{\mu_r}}`,
+    :math:`\boldsymbol{\mathbf{\epsilon_r}}` and
+    :math:`\boldsymbol{\mathbf{\rho_r}}` is transformed to additive
+    log-ratio coordinates relative to the wildtype character. The mode
+    of the posterior density in these coordinates (which includes the
+    Jacobian of the transformation, so that for a Dirichlet-multinomial
+    it is the posterior mean) is found by Newton's method. The posterior
+    is then approximated as a multivariate normal with covariance given
+    by the inverse of the negative Hessian at the mode, and `ndraws`
+    draws of :math:`\boldsymbol{\mathbf{\pi_r}}` from this approximation
+    give the posterior mean and 95% credible interval.
+
+    Args:
+        `charlist` (list)
+            List of valid characters (e.g., codons, amino acids, nts).
+        `wts` (list)
+            Wildtype character at each site.
+        `error_model` (str)
+            `none`, `same`, or `different` as for `inferSitePrefs`.
+        `counts` (dict)
+            Keyed by the same keys as for `inferSitePrefs`, but values
+            are arrays (or data frames with columns for all characters
+            in `charlist`) with a row for each site and a column for
+            each character in `charlist` giving the counts.
+        `priors` (dict)
+            Keyed by the same keys as for `inferSitePrefs`, but values
+            are arrays (or data frames) of prior parameters like for
+            `counts`. Values less than `PRIOR_MIN_VALUE` are set to
+            `PRIOR_MIN_VALUE`.
+        `ndraws` (int)
+            Number of draws from the approximate posterior.
+        `seed` (int)
+            Random number seed for draws.
+        `maxiter` (int)
+            Maximum number of Newton iterations.
+
+    Returns:
+        The tuple `(converged, pi_means, pi_95credint)` where:
+            - `converged` is boolean array that is `True` for
+              sites where the optimization converged.
+            - `pi_means` is array of shape `(nsites, len(charlist))`
+              giving the approximate posterior mean :math:`\pi_{r,a}`.
+            - `pi_95credint` is array of shape 
+              `(nsites, len(charlist), 2)` giving the approximate
+              median-centered 95% credible interval.
+
+    >>> charlist = ['A', 'C', 'G', 'T']
+    >>> counts = {'pre':[[9000, 300, 400, 300], [200, 9500, 100, 200]],
+    ...           'post':[[9000, 600, 100, 300], [50, 9900, 30, 20]]}
+    >>> priors = {'pir_prior_params':numpy.ones((2, 4)),
+    ...           'mur_prior_params':[[3.6, 0.1, 0.2, 0.1],
+    ...                               [0.1, 3.6, 0.2, 0.1]]}
+    >>> (converged, pi_means, pi_95credint) = inferPrefsByLaplace(
+    ...         charlist, ['A', 'C'], 'none', counts, priors)
+    >>> converged.tolist()
+    [True, True]
+    >>> numpy.allclose(pi_means.sum(axis=1), 1)
+    True
+    >>> numpy.round(pi_means, 2)
+    array([[0.24, 0.47, 0.06, 0.24],
+           [0.15, 0.61, 0.18, 0.06]])
+    >>> bool(((pi_95credint[..., 0] < pi_means) &
+    ...       (pi_means < pi_95credint[..., 1])).all())
+    True
+    """
+    assert len(charlist) == len(set(charlist))
+    nchars = len(charlist)
+    nsites = len(wts)
+    iwt = numpy.array([charlist.index(wt) for wt in wts], dtype='int')
+    isite = numpy.arange(nsites)
+
+    def _toArray(x):
+        if isinstance(x, pandas.DataFrame):
+            x = x[charlist].values
+        x = numpy.asarray(x, dtype='float')
+        assert x.shape == (nsites, nchars), "invalid shape {0}".format(
+                x.shape)
+        return x
+
+    prior_keys = ['pir_prior_params', 'mur_prior_params']
+    if error_model == 'none':
+        count_keys = ['pre', 'post']
+    elif error_model == 'same':
+        count_keys = ['pre', 'post', 'err']
+        prior_keys.append('epsilonr_prior_params')
+    elif error_model == 'different':
+        count_keys = ['pre', 'post', 'errpre', 'errpost']
+        prior_keys += ['epsilonr_prior_params', 'rhor_prior_params']
+    else:
+        raise ValueError("Invalid error_model {0}".format(error_model))
+    counts = dict([(key, _toArray(counts[key])) for key in count_keys])
+    priors = dict([(key, numpy.maximum(PRIOR_MIN_VALUE,
+            _toArray(priors[key]))) for key in prior_keys])
+    nsimplices = len(prior_keys)
+
+    def objective(z, sites=slice(None)):
+        """Objective for `z` for subset `sites` of all sites."""
+        return _laplaceObjective(z, error_model,
+                dict([(k, v[sites]) for (k, v) in counts.items()]),
+                dict([(k, v[sites]) for (k, v) in priors.items()]),
+                iwt[sites])
+
+    # valid initial values from observed frequencies
+    delta = numpy.zeros((nsites, nchars))
+    delta[isite, iwt] = 1.0
+
+    def _freqs(n):
+        return (n + 1) / (n + 1).sum(axis=1, keepdims=True)
+
+    def _fillWildtype(x):
+        x = numpy.where(delta > 0, 0, x)
+        return x + delta * (1 - x.sum(axis=1, keepdims=True))
+
+    mfreq = _freqs(counts['pre'])
+    gfreq = _freqs(counts['post'])
+    if error_model == 'none':
+        eps = rho = delta
+    elif error_model == 'same':
+        eps = rho = _fillWildtype(numpy.minimum(_freqs(counts['err']),
+                0.5 * numpy.minimum(mfreq, gfreq)))
+    else:
+        eps = _fillWildtype(numpy.minimum(_freqs(counts['errpre']),
+                0.5 * mfreq))
+        rho = _fillWildtype(numpy.minimum(_freqs(counts['errpost']),
+                0.5 * gfreq))
+    mu = _fillWildtype(mfreq - eps)
+    f = _fillWildtype(gfreq - rho)
+    pi = f / mu
+    pi /= pi.sum(axis=1, keepdims=True)
+    x = numpy.stack([pi, mu, eps, rho][ : nsimplices], axis=1)
+    z = numpy.log(x) - numpy.log(x[isite, :, iwt])[:, :, None]
+
+    # Newton's method with backtracking line search
+    free = numpy.array([[i for i in range(nchars) if i != iwt[r]]
+            for r in range(nsites)], dtype='int').reshape(nsites, nchars - 1)
+    freeindex = (isite[:, None, None], numpy.arange(nsimplices)[None, :, None],
+            free[:, None, :])
+    nfree = nsimplices * (nchars - 1)
+    converged = numpy.zeros(nsites, dtype='bool')
+    (logp, grad) = objective(z)
+    assert numpy.isfinite(logp).all(), "invalid initial values"
+    for _ in range(maxiter):
+        active = ~converged
+        if not active.any():
+            break
+        hessian = _laplaceHessian(z[active], grad[active], free[active],
+                lambda za: objective(za, active))
+        g = grad[freeindex][active].reshape(-1, nfree)
+        step = numpy.linalg.solve(-hessian, g[:, :, None])[:, :, 0]
+        slope = (g * step).sum(axis=1)
+        # where Newton step is not ascent direction, make eigenvalues of
+        # negative Hessian positive
+        notascent = ~(slope > 0)
+        if notascent.any():
+            (evals, evecs) = numpy.linalg.eigh(-hessian[notascent])
+            evals = numpy.maximum(numpy.abs(evals), 1e-8 *
+                    numpy.abs(evals).max(axis=1, keepdims=True))
+            step[notascent] = numpy.einsum('sij,sj->si', evecs,
+                    numpy.einsum('sji,sj->si', evecs, g[notascent]) / evals)
+            slope = (g * step).sum(axis=1)
+        # converged when expected increase in log posterior is negligible
+        newly_converged = slope < 1e-6
+        converged[numpy.flatnonzero(active)[newly_converged]] = True
+        step[newly_converged] = 0
+        freestep = numpy.zeros((nsites, nsimplices, nchars - 1))
+        freestep[active] = step.reshape(-1, nsimplices, nchars - 1)
+        zstep = numpy.zeros((nsites, nsimplices, nchars))
+        zstep[freeindex] = freestep
+        t = numpy.ones(nsites)
+        searching = active.copy()
+        searching[numpy.flatnonzero(active)[newly_converged]] = False
+        aslope = numpy.zeros(nsites)
+        aslope[active] = slope
+        for _ in range(50):
+            if not searching.any():
+                break
+            znew = z[searching] + t[searching, None, None] * zstep[searching]
+            (logpnew, gradnew) = objective(znew, searching)
+            accept = logpnew >= (logp[searching] +
+                    1e-4 * t[searching] * aslope[searching])
+            iaccept = numpy.flatnonzero(searching)[accept]
+            z[iaccept] = znew[accept]
+            logp[iaccept] = logpnew[accept]
+            grad[iaccept] = gradnew[accept]
+            searching[iaccept] = False
+            t[searching] /= 2
+        # sites where line search fails cannot be improved further
+        converged[searching] = True
+
+    # draws of pi from Laplace approximation at the mode
+    hessian = _laplaceHessian(z, grad, free, objective)
+    # covariance of pi, which is first block of coordinates
+    cov = numpy.linalg.inv(-hessian)[:, : nchars - 1, : nchars - 1]
+    try:
+        covsqrt = numpy.linalg.cholesky(cov)
+    except numpy.linalg.LinAlgError:
+        (evals, evecs) = numpy.linalg.eigh(cov)
+        evals = numpy.maximum(evals, 1e-8 * numpy.abs(evals).max(axis=1,
+                keepdims=True))
+        covsqrt = evecs * numpy.sqrt(evals)[:, None, :]
+    random_state = numpy.random.RandomState(seed)
+    pi_means = numpy.empty((nsites, nchars))
+    pi_95credint = numpy.empty((nsites, nchars, 2))
+    for r in range(nsites):
+        zpi = numpy.zeros((ndraws, nchars))
+        zpi[:, free[r]] = z[r, 0, free[r]] + random_state.standard_normal(
+                (ndraws, nchars - 1)).dot(covsqrt[r].T)
+        pidraws = numpy.exp(zpi - zpi.max(axis=1, keepdims=True))
+        pidraws /= pidraws.sum(axis=1, keepdims=True)
+        pi_means[r] = pidraws.mean(axis=0)
+        pi_95credint[r] = numpy.percentile(pidraws, [2.5, 97.5],
+                axis=0).T
+    return (converged, pi_means, pi_95credint)
 
 
 def prefsToMutFromWtEffects(prefs, charlist, wts):
@@ -11,10 +11,11 @@ import collections
 import tempfile
 import re
 
+import Bio.Seq
 import Bio.SeqIO
 import Bio.SeqUtils
 
-from dms_tools2 import NTS
+from dms_tools2 import NTS, NTCOMPLEMENT, CODON_TO_AA
 
 
 class TranscriptConverter:
@@ -32,6 +33,10 @@ class TranscriptConverter:
     this is different than the 0, 1, ... numbering used
     by Python for strings.
 
+    Site and codon lookups are precomputed at initialization, and
+    the results of :class:`TranscriptConverter.aaSubstitutions` are
+    memoized, so conversions for many mutations are table lookups.
+
     Args:
         `genbankfile` (str)
             Genbank file with one or more loci, each of which
@@ -207,6 +212,37 @@ class TranscriptConverter:
                     raise ValueError("unrecognized feature type {0}"
                             .format(feature.type))
 
+        # precompute lookups so conversions are table lookups
+        self._chromosome_seqs = {name:str(c.seq) for name, c in
+                                 self.chromosomes.items()}
+        self._mRNA_seqs = {}
+        self._mRNA_sites = {}
+        for name, feature in self.mRNAs.items():
+            chromosome = self.chromosomes[self.mRNA_chromosome[name]]
+            self._mRNA_seqs[name] = str(feature.extract(chromosome).seq)
+            self._mRNA_sites[name] = list(feature)
+        self._mRNAfragment_offsets = {}
+        # for each CDS, chromosome site (0, 1, ...) -> list of
+        # (codon index, codon offset, strand) for that site in CDS
+        self._cds_codon_sites = {}
+        self._cds_seqs = {}
+        for c in self.chromosomes.values():
+            for cds_name in self.chromosome_CDSs[c.name]:
+                cds = self.CDSs[cds_name]
+                self._cds_seqs[cds_name] = str(cds.extract(c.seq))
+                ncodons = len(self._cds_seqs[cds_name]) // 3
+                codon_sites = collections.defaultdict(list)
+                i_cds = 0
+                for part in cds.location.parts:
+                    for i_chrom in part:
+                        if i_cds // 3 < ncodons:
+                            codon_sites[i_chrom].append(
+                                    (i_cds // 3, i_cds % 3, part.strand))
+                        i_cds += 1
+                self._cds_codon_sites[cds_name] = dict(codon_sites)
+        # memoized results of :meth:`aaSubstitutions`
+        self._aa_substitutions = {}
+
 
     def i_mRNAtoChromosome(self, mRNA, i, *, mRNAfragment=None):
         """Convert site number in mRNA to number in chromosome.
@@ -227,27 +263,28 @@ class TranscriptConverter:
             Site number in chromosome that contains `mRNA`.
         """
         try:
-            chromosome = self.chromosomes[self.mRNA_chromosome[mRNA]]
-            mRNA_feature = self.mRNAs[mRNA]
+            mRNA_seq = self._mRNA_seqs[mRNA]
+            mRNA_sites = self._mRNA_sites[mRNA]
         except KeyError:
             raise ValueError("invalid `mRNA` {0}".format(mRNA))
 
-        mRNA_seq = mRNA_feature.extract(chromosome).seq
-
         if mRNAfragment:
-            if self.to_upper:
-                mRNAfragment = mRNAfragment.upper()
-            n = mRNA_seq.count(mRNAfragment)
-            if n == 1:
-                i += mRNA_seq.find(mRNAfragment)
-            elif n > 1:
-                raise ValueError("`mRNA` {0} does contains {1} "
-                        "copies of `mRNAfragment`".format(mRNA, n))
-            else:
-                raise ValueError("`mRNA` {0} does not contain "
-                        "specified `mRNAfragment`".format(mRNA))
-
-        mRNA_sites = list(mRNA_feature)
+            key = (mRNA, mRNAfragment)
+            if key not in self._mRNAfragment_offsets:
+                if self.to_upper:
+                    mRNAfragment = mRNAfragment.upper()
+                n = mRNA_seq.count(mRNAfragment)
+                if n == 1:
+                    self._mRNAfragment_offsets[key] = mRNA_seq.find(
+                            mRNAfragment)
+                elif n > 1:
+                    raise ValueError("`mRNA` {0} does contains {1} "
+                            "copies of `mRNAfragment`".format(mRNA, n))
+                else:
+                    raise ValueError("`mRNA` {0} does not contain "
+                            "specified `mRNAfragment`".format(mRNA))
+            i += self._mRNAfragment_offsets[key]
+
         if not (1 <= i <= len(mRNA_sites)):
             raise ValueError("`i` of {0} not valid site in `mRNA` {1}"
                     .format(i, mRNA))
@@ -268,7 +305,7 @@ class TranscriptConverter:
             Nucleotide in `chromosome` at site `i`.
         """
         try:
-            chromosome_seq = self.chromosomes[chromosome]
+            chromosome_seq = self._chromosome_seqs[chromosome]
         except KeyError:
             raise ValueError("`chromosome` {0} does not exist"
                     .format(chromosome))
@@ -277,7 +314,7 @@ class TranscriptConverter:
             raise ValueError("`i` of {0} not in `chromosome` {1}"
                     .format(i, chromosome))
 
-        return str(chromosome_seq[i - 1])
+        return chromosome_seq[i - 1]
 
 
     def aaSubstitutions(self, chromosome, mutation, *,
@@ -307,12 +344,6 @@ class TranscriptConverter:
                 - If several mutations, will be str like
                   'fluNS1-His169Leu_fluNS2-Ile12Leu'.
         """
-        try:
-            cds_names = self.chromosome_CDSs[chromosome]
-            chromosome_seq = self.chromosomes[chromosome].seq
-        except KeyError:
-            raise ValueError("invalid `chromosome` {0}".format(chromosome))
-
         if isinstance(mutation, str):
             m = re.match(r'^(?P<wt>[{0}])(?P<i>\d+)(?P<mut>[{0}])$'
                     .format(''.join(NTS)), mutation)
@@ -320,6 +351,23 @@ class TranscriptConverter:
                 raise ValueError("cannot parse mutation {0}"
                         .format(mutation))
             mutation = (m.group('wt'), int(m.group('i')), m.group('mut'))
+        else:
+            mutation = tuple(mutation)
+
+        key = (chromosome, mutation, aa_3letter)
+        if key not in self._aa_substitutions:
+            self._aa_substitutions[key] = self._aaSubstitutions(
+                    chromosome, mutation, aa_3letter)
+        return self._aa_substitutions[key]
+
+
+    def _aaSubstitutions(self, chromosome, mutation, aa_3letter):
+        """Computes uncached result for :meth:`aaSubstitutions`."""
+        try:
+            cds_names = self.chromosome_CDSs[chromosome]
+            chromosome_seq = self._chromosome_seqs[chromosome]
+        except KeyError:
+            raise ValueError("invalid `chromosome` {0}".format(chromosome))
 
         if (len(mutation) != 3) or (mutation[0] not in NTS
                     ) or (mutation[2] not in NTS):
@@ -339,34 +387,40 @@ class TranscriptConverter:
         if wt == mut:
             raise ValueError("wildtype and mutant nt are the same")
 
-        cds_w_mut = [cds for cds in [self.CDSs[cds_name]
-                for cds_name in cds_names] if (i - 1) in cds]
-
         mutstring = []
-        mut_chromosome = None
         for cds_name in cds_names:
-            cds = self.CDSs[cds_name]
-            if (i - 1) in cds:
-                if mut_chromosome is None:
-                    mut_chromosome = chromosome_seq.tomutable()
-                    mut_chromosome[i - 1] = mut
-                wtprot = cds.extract(chromosome_seq).translate()
-                mutprot = cds.extract(mut_chromosome).translate()
-                aa_mut = [(wt, r0 + 1, mut) for r0, (wt, mut) in
-                        enumerate(zip(wtprot, mutprot)) if wt != mut]
-                if len(aa_mut) > 1:
-                    raise ValueError(">1 amino-acid mutation")
-                elif aa_mut:
-                    wt_aa, r, mut_aa = aa_mut[0]
-                    if aa_3letter:
-                        wt_aa = Bio.SeqUtils.seq3(wt_aa)
-                        mut_aa = Bio.SeqUtils.seq3(mut_aa)
-                    mutstring.append('{0}-{1}{2}{3}'.format(cds_name,
-                            wt_aa, r, mut_aa))
+            cds_seq = self._cds_seqs[cds_name]
+            aa_mut = []
+            for r0, offset, strand in self._cds_codon_sites[cds_name].get(
+                    i - 1, []):
+                codon = cds_seq[3 * r0 : 3 * r0 + 3]
+                mut_nt = NTCOMPLEMENT[mut] if strand == -1 else mut
+                mutcodon = codon[ : offset] + mut_nt + codon[offset + 1 : ]
+                wt_aa = _translate(codon)
+                mut_aa = _translate(mutcodon)
+                if wt_aa != mut_aa:
+                    aa_mut.append((wt_aa, r0 + 1, mut_aa))
+            if len(aa_mut) > 1:
+                raise ValueError(">1 amino-acid mutation")
+            elif aa_mut:
+                wt_aa, r, mut_aa = aa_mut[0]
+                if aa_3letter:
+                    wt_aa = Bio.SeqUtils.seq3(wt_aa)
+                    mut_aa = Bio.SeqUtils.seq3(mut_aa)
+                mutstring.append('{0}-{1}{2}{3}'.format(cds_name,
+                        wt_aa, r, mut_aa))
 
         return '_'.join(mutstring)
 
 
+def _translate(codon):
+    """Translates a codon, using :data:`dms_tools2.CODON_TO_AA` if possible."""
+    try:
+        return CODON_TO_AA[codon]
+    except KeyError:
+        return str(Bio.Seq.Seq(codon).translate())
+
+
 
 if __name__ == '__main__':
     import doctest
@@ -669,20 +669,33 @@ def incrementCounts(refseqstart, subamplicon, chartype, counts):
             counts[codon][startcodon + i] += 1
 
 
+#: `numpy.ndarray` of shape `(len(CODONS), len(AAS_WITHSTOP))` with
+#: element `[i, j]` equal to one if `CODONS[i]` encodes `AAS_WITHSTOP[j]`
+CODON_TO_AA_MATRIX = numpy.array([[int(CODON_TO_AA[codon] == aa)
+        for aa in AAS_WITHSTOP] for codon in CODONS], dtype='int64')
+
+
 def codonToAACounts(counts):
     """Makes amino-acid counts `pandas.DataFrame` from codon counts.
 
+    Counts are summed over encoding codons by multiplying the codon
+    counts by `CODON_TO_AA_MATRIX`.
+
     Args:
-        `counts` (`pandas.DataFrame`)
-            Columns are the string `site` `wildtype` and all codons
-            in `CODONS`. Additional columns are allowed
-            but ignored.
+        `counts` (`pandas.DataFrame` or `numpy.ndarray`)
+            If a data frame, columns are the string `site` `wildtype`
+            and all codons in `CODONS`. Additional columns are allowed
+            but ignored. If an array, it has shape `(nsites, len(CODONS))`
+            and gives counts for the codons in the order in `CODONS`.
 
     Returns:
-        `aacounts` (`pandas.DataFrame`)
-            Columns are the string `site` and all amino acids
-            in `AAS_WITHSTOP` with counts for each
-            amino acid made by summing counts for encoding codons.
+        `aacounts` (`pandas.DataFrame` or `numpy.ndarray`)
+            If `counts` is a data frame, columns are the string `site`,
+            `wildtype`, and all amino acids in `AAS_WITHSTOP` with counts
+            for each amino acid made by summing counts for encoding
+            codons. If `counts` is an array, an array of shape
+            `(nsites, len(AAS_WITHSTOP))` giving the counts for the
+            amino acids in the order in `AAS_WITHSTOP`.
 
     >>> d = {'site':[1, 2], 'othercol':[0, 0], 'ATG':[105, 1],
     ...         'GGG':[3, 117], 'GGA':[2, 20], 'TGA':[0, 1],
@@ -706,17 +719,28 @@ def codonToAACounts(counts):
     True
     >>> all(aacounts['V'] == [0, 0])
     True
+
+    Can also pass and get back arrays:
+
+    >>> aacounts_array = codonToAACounts(counts[CODONS].values)
+    >>> aacounts_array.shape == (2, len(AAS_WITHSTOP))
+    True
+    >>> numpy.array_equal(aacounts_array, aacounts[AAS_WITHSTOP].values)
+    True
     """
-    d = dict([(key, []) for key in ['site', 'wildtype'] + 
-            AAS_WITHSTOP])
-    for (i, row) in counts.iterrows():
-        d['site'].append(row['site'])
-        d['wildtype'].append(CODON_TO_AA[row['wildtype']])
-        for aa in AAS_WITHSTOP:
-            d[aa].append(0)
-        for c in CODONS:
-            d[CODON_TO_AA[c]][-1] += (row[c])
-    return pandas.DataFrame(d)
+    if isinstance(counts, numpy.ndarray):
+        if counts.ndim != 2 or counts.shape[1] != len(CODONS):
+            raise ValueError("`counts` array must have shape "
+                    "(nsites, {0})".format(len(CODONS)))
+        return counts.dot(CODON_TO_AA_MATRIX)
+    aacounts = pandas.DataFrame(
+            codonToAACounts(counts[CODONS].values),
+            columns=AAS_WITHSTOP,
+            index=counts.index,
+            )
+    aacounts.insert(0, 'wildtype', counts['wildtype'].map(CODON_TO_AA))
+    aacounts.insert(0, 'site', counts['site'])
+    return aacounts.reset_index(drop=True)
 
 
 def annotateCodonCounts(counts):
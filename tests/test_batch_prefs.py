@@ -5,9 +5,12 @@ Written by Jesse Bloom."""
 
 import sys
 import os
+import shutil
+import tempfile
 import unittest
 import subprocess
 import random
+import glob
 import numpy
 import pandas
 
@@ -42,6 +45,12 @@ class test_batch_prefs(unittest.TestCase):
             if os.path.isfile(f):
                 os.remove(f)
 
+        # cache of site results in temporary directory, not home directory
+        self.cachedir = tempfile.mkdtemp()
+        self.env = dict(os.environ, DMS_TOOLS2_PREFS_CACHE=self.cachedir)
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir)
 
     def test_dms2_batch_prefs(self):
         """Runs ``dms2_batch_prefs`` on test data."""
@@ -66,10 +75,19 @@ class test_batch_prefs(unittest.TestCase):
                 '--indir', self.indir,
                 '--method', self.METHOD,
                 '--ncpus', '1',
+                '--prefs_cachedir', os.path.join(self.cachedir, 'sites'),
                ]
         sys.stderr.write('\nRunning the following command:\n{0}\n'.format(
                 ' '.join(cmds)))
-        subprocess.check_call(cmds)
+        subprocess.check_call(cmds, env=self.env)
+
+        # only Bayesian inference caches results for sites
+        cachefiles = glob.glob(os.path.join(self.cachedir, 'sites', '*',
+                'siteprefs_*.pickle'))
+        if self.METHOD == 'bayesian':
+            self.assertTrue(cachefiles)
+        else:
+            self.assertFalse(cachefiles)
 
         for f in self.outfiles:
             self.assertTrue(os.path.isfile(f), "Failed to create {0}".format(f))
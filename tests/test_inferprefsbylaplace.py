@@ -0,0 +1,99 @@
+"""Tests `dms_tools2.prefs.inferPrefsByLaplace`."""
+
+
+import unittest
+import numpy
+import dms_tools2
+import dms_tools2.prefs
+
+
+
+class TestInferPrefsByLaplace(unittest.TestCase):
+    """Tests Laplace approximation when priors are exactly correct.
+
+    Simulates counts for many sites at once for all three error
+    models and makes sure inferred preferences are close to the
+    correct ones.
+    """
+    SEED = 1
+    CHARLIST = dms_tools2.AAS
+    NSITES = 25
+    DEPTH = 1e9
+    MAXDIFFSUM = 0.01
+
+    def setUp(self):
+        """Simulate parameters for sites."""
+        numpy.random.seed(self.SEED)
+        nchars = len(self.CHARLIST)
+        self.iwt = numpy.random.randint(nchars, size=self.NSITES)
+        self.wts = [self.CHARLIST[i] for i in self.iwt]
+        self.delta = numpy.zeros((self.NSITES, nchars))
+        self.delta[numpy.arange(self.NSITES), self.iwt] = 1.0
+
+        def _rates(low, high):
+            x = numpy.random.uniform(low / nchars, high / nchars,
+                    (self.NSITES, nchars))
+            x[self.delta > 0] = 0
+            return x + self.delta * (1 - x.sum(axis=1, keepdims=True))
+
+        self.mur = _rates(0.005, 0.025)
+        self.epsilonr = _rates(0.0001, 0.0003)
+        self.rhor = _rates(0.0002, 0.0005)
+        self.pir = numpy.random.uniform(1e-5, 0.6, (self.NSITES, nchars))
+        self.pir[self.delta > 0] = 1.0
+        self.pir /= self.pir.sum(axis=1, keepdims=True)
+        self.priors = {
+                'pir_prior_params':self.pir * nchars,
+                'mur_prior_params':self.mur * nchars,
+                'epsilonr_prior_params':self.epsilonr * nchars,
+                'rhor_prior_params':self.rhor * nchars,
+                }
+
+    def _multinomial(self, p):
+        return numpy.array([numpy.random.multinomial(self.DEPTH, pr)
+                for pr in p])
+
+    def test_inferPrefsByLaplace(self):
+        """Infer preferences for all three error models."""
+        fr = self.mur * self.pir / (self.mur * self.pir).sum(axis=1,
+                keepdims=True)
+        countslist = [
+                ('none', {
+                    'pre':self._multinomial(self.mur),
+                    'post':self._multinomial(fr),
+                    }),
+                ('same', {
+                    'pre':self._multinomial(self.mur + self.epsilonr
+                            - self.delta),
+                    'post':self._multinomial(fr + self.epsilonr
+                            - self.delta),
+                    'err':self._multinomial(self.epsilonr),
+                    }),
+                ('different', {
+                    'pre':self._multinomial(self.mur + self.epsilonr
+                            - self.delta),
+                    'post':self._multinomial(fr + self.rhor - self.delta),
+                    'errpre':self._multinomial(self.epsilonr),
+                    'errpost':self._multinomial(self.rhor),
+                    }),
+                ]
+        for (error_model, counts) in countslist:
+            (converged, pi_means, pi_95credint) = \
+                    dms_tools2.prefs.inferPrefsByLaplace(self.CHARLIST,
+                    self.wts, error_model, counts, self.priors)
+            self.assertTrue(converged.all(), error_model)
+            self.assertTrue(numpy.allclose(pi_means.sum(axis=1), 1))
+            diffsum = numpy.abs(pi_means - self.pir).sum(axis=1)
+            self.assertTrue((diffsum < self.MAXDIFFSUM).all(),
+                    '{0}: {1}'.format(error_model, diffsum))
+            self.assertTrue((pi_95credint[..., 0] <= pi_means).all())
+            self.assertTrue((pi_means <= pi_95credint[..., 1]).all())
+            incredint = ((pi_95credint[..., 0] <= self.pir) &
+                    (self.pir <= pi_95credint[..., 1]))
+            self.assertTrue(incredint.mean() > 0.85,
+                    '{0}: {1}'.format(error_model, incredint.mean()))
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    unittest.main(testRunner=runner)
@@ -133,6 +133,52 @@ class TestInferPrefsByRatio(unittest.TestCase):
 
 
 
+    def test_inferPrefsByRatioArrays(self):
+        """Arrays for many samples give same prefs as one sample at a time."""
+        numpy.random.seed(1)
+        nsamples = 5
+        counts = {}
+        for ctype in ['pre', 'post', 'errpre', 'errpost']:
+            counts[ctype] = numpy.random.poisson(numpy.random.uniform(0,
+                    self.Nr_RANGE[1] / self.nchars,
+                    (nsamples, self.nsites, self.nchars)))
+        for n in counts.values():
+            n[:, 0] = 0 # site with no counts
+        iwt = [self.charlist.index(wt) for wt in self.wts]
+        for (errpre, errpost) in [
+                (counts['errpre'], counts['errpost']),
+                (counts['errpre'][1], counts['errpost'][1]), # broadcast
+                (None, None),
+                ]:
+            prefs = dms_tools2.prefs.inferPrefsByRatioArrays(iwt,
+                    counts['pre'], counts['post'], errpre, errpost,
+                    self.pseudocount)
+            self.assertEqual(prefs.shape,
+                    (nsamples, self.nsites, self.nchars))
+            for isample in range(nsamples):
+                dfs = {}
+                for (ctype, n) in [('pre', counts['pre']),
+                        ('post', counts['post']), ('errpre', errpre),
+                        ('errpost', errpost)]:
+                    if n is None:
+                        dfs[ctype] = None
+                        continue
+                    if n.ndim == 3:
+                        n = n[isample]
+                    # rows in reverse order of sites
+                    dfs[ctype] = pandas.DataFrame(n[ : : -1],
+                            columns=self.charlist)
+                    dfs[ctype].insert(0, 'site', self.sites[ : : -1])
+                sampleprefs = dms_tools2.prefs.inferPrefsByRatio(
+                        self.charlist, self.sites, self.wts, dfs['pre'],
+                        dfs['post'], dfs['errpre'], dfs['errpost'],
+                        self.pseudocount)
+                self.assertEqual(list(sampleprefs['site']), self.sites)
+                self.assertTrue(numpy.allclose(prefs[isample],
+                        sampleprefs[self.charlist].values,
+                        atol=self.ATOL, rtol=self.RTOL))
+
+
 class TestInferPrefsByRatioDiffDepth(TestInferPrefsByRatio):
     """Tests `dms_tools2.inferPrefsByRatio` with different depths.
 
@@ -0,0 +1,76 @@
+"""Tests initial values for MCMC in `dms_tools2.prefs`."""
+
+
+import unittest
+import multiprocessing
+import numpy
+import dms_tools2.prefs
+
+
+
+def _initInProcess(args):
+    """Initial values after changing global random state in a process."""
+    numpy.random.seed(args[-1])
+    return dms_tools2.prefs._initialValuePrefs(*args[ : -1])
+
+
+class TestInitialValuePrefs(unittest.TestCase):
+    """Tests `_initialValuePrefs` is valid and reproducible."""
+
+    NCHARS = 21
+    IWT = 4
+    NCHAINS = 4
+
+    def test_Valid(self):
+        """Initial values satisfy constraints of each error model."""
+        deltar = numpy.zeros(self.NCHARS)
+        deltar[self.IWT] = 1
+        minvalue = dms_tools2.prefs.PRIOR_MIN_VALUE
+        for error_model in ['none', 'same', 'different']:
+            for seed in range(20):
+                init = dms_tools2.prefs._initialValuePrefs(error_model,
+                        self.NCHAINS, self.IWT, self.NCHARS, seed=seed)
+                self.assertEqual(len(init), self.NCHAINS)
+                for chain_init in init:
+                    for x in chain_init.values():
+                        self.assertEqual(x.shape, (self.NCHARS,))
+                        self.assertTrue(numpy.allclose(x.sum(), 1))
+                    pir = chain_init['pir']
+                    mur = chain_init['mur']
+                    if error_model == 'none':
+                        self.assertTrue((pir > minvalue).all())
+                        self.assertTrue((mur > minvalue).all())
+                        continue
+                    errpost = chain_init[{'same':'epsilonr',
+                            'different':'rhor'}[error_model]]
+                    self.assertTrue((pir * mur / pir.dot(mur) + errpost
+                            - deltar > minvalue).all())
+                    self.assertTrue((mur + chain_init['epsilonr']
+                            - deltar > minvalue).all())
+
+    def test_Seed(self):
+        """Fixed seed gives same initial values in any process."""
+        for error_model in ['none', 'same', 'different']:
+            args = (error_model, self.NCHAINS, self.IWT, self.NCHARS, 7)
+            init = dms_tools2.prefs._initialValuePrefs(*args)
+            pool = multiprocessing.Pool(2)
+            otherinits = pool.map(_initInProcess, [args + (globalseed,)
+                    for globalseed in range(4)])
+            pool.close()
+            pool.join()
+            for otherinit in otherinits:
+                for (chain_init, other_chain_init) in zip(init, otherinit):
+                    self.assertEqual(set(chain_init), set(other_chain_init))
+                    for param in chain_init:
+                        self.assertTrue(numpy.array_equal(chain_init[param],
+                                other_chain_init[param]))
+            # chains differ, as do initial values with different seed
+            self.assertFalse(numpy.allclose(init[0]['pir'], init[1]['pir']))
+            init2 = dms_tools2.prefs._initialValuePrefs(*args[ : -1],
+                    seed=8)
+            self.assertFalse(numpy.allclose(init[0]['pir'], init2[0]['pir']))
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    unittest.main(testRunner=runner)
@@ -0,0 +1,61 @@
+"""Tests `dms_tools2.minimap2.AlignmentTable`."""
+
+
+import os
+import glob
+import collections
+import unittest
+import pandas
+import dms_tools2.minimap2
+import dms_tools2.pacbio
+
+
+
+class TestAlignmentTable(unittest.TestCase):
+    """Round trip of alignments through an `AlignmentTable`."""
+
+    def setUp(self):
+        """Alignments from test PAF files, with multiple per query."""
+        testdir = os.path.dirname(os.path.abspath(__file__))
+        paf_files = sorted(glob.glob(os.path.join(testdir, '*_files', '**',
+                'alignment.paf'), recursive=True))
+        self.assertTrue(paf_files)
+        byquery = collections.defaultdict(list)
+        for paf_file in paf_files:
+            for (query, a) in dms_tools2.minimap2.parsePAF(paf_file):
+                byquery[(paf_file, query)].append(a)
+        # first alignment for each query, others as additional
+        self.alignments = []
+        for alist in byquery.values():
+            self.alignments.append(alist[0]._replace(additional=alist[1 : ]))
+            self.alignments.append(None)
+        self.assertTrue(any(a.additional for a in self.alignments if a))
+
+    def test_RoundTrip(self):
+        """Alignments to table and back are unchanged."""
+        table = dms_tools2.minimap2.AlignmentTable(self.alignments)
+        self.assertEqual(len(table), len(self.alignments))
+        self.assertEqual(list(table), self.alignments)
+        n = len(self.alignments)
+        for i in range(n):
+            self.assertEqual(table[i], self.alignments[i])
+            self.assertEqual(table[i - n], self.alignments[i])
+        for i in [n, -n - 1]:
+            with self.assertRaises(IndexError):
+                table[i]
+        with self.assertRaises(TypeError):
+            table[0 : 2]
+        self.assertEqual(list(dms_tools2.minimap2.AlignmentTable([])), [])
+
+    def test_compactAlignments(self):
+        """Alignments in data frame to table and back are unchanged."""
+        df = pandas.DataFrame({'name':range(len(self.alignments)),
+                               'alignment':self.alignments})
+        (new_df, table) = dms_tools2.pacbio.compactAlignments(df, 'alignment')
+        self.assertEqual([table[i] for i in new_df['alignment_index']],
+                self.alignments)
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    unittest.main(testRunner=runner)
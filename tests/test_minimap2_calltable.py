@@ -0,0 +1,98 @@
+"""Tests `dms_tools2.minimap2.MutationCaller.callTable`."""
+
+
+import os
+import math
+import unittest
+import numpy
+import Bio.SeqIO
+import dms_tools2.minimap2
+
+
+
+class TestCallTable(unittest.TestCase):
+    """Tests `callTable` gives same mutations as `call`."""
+
+    #: number of alignments from each PAF file
+    NALIGNMENTS = 300
+
+    def setUp(self):
+        """Alignments and Q-values from test PAF files."""
+        testdir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                'test_pacbio_ccs_align_files')
+        numpy.random.seed(1)
+        self.cases = []
+        for (subdir, options) in [
+                ('test_pacbio_CCS_align_short_codonDMS',
+                    dms_tools2.minimap2.OPTIONS_CODON_DMS),
+                ('test_pacbio_CCS_align_short_virus_w_del',
+                    dms_tools2.minimap2.OPTIONS_VIRUS_W_DEL),
+                ]:
+            targetfile = os.path.join(testdir, subdir, 'target.fasta')
+            targets = {s.id:str(s.seq) for s in
+                    Bio.SeqIO.parse(targetfile, 'fasta')}
+            mapper = dms_tools2.minimap2.Mapper(targetfile, options)
+            alignments = [a for (_, a) in dms_tools2.minimap2.parsePAF(
+                    os.path.join(testdir, subdir, 'alignment.paf'),
+                    targets, introns_to_gaps=True)][ : self.NALIGNMENTS]
+            alignments[1] = None # query that did not align
+            qvals = [None if a is None else
+                    numpy.random.randint(1, 94, a.q_len)
+                    for a in alignments]
+            self.cases.append((mapper, alignments, qvals))
+
+    def _expected(self, mutcaller, alignments, qvals):
+        """Rows of table built from :meth:`MutationCaller.call`."""
+        rows = []
+        for (name, (a, q)) in enumerate(zip(alignments, qvals)):
+            if a is None:
+                continue
+            muts = mutcaller.call(a, q)
+            for mut_type in ['substitution', 'insertion', 'deletion']:
+                method = getattr(muts, mut_type + 's')
+                mutations = method()
+                sites = method(returnval='site')
+                accs = method(returnval='accuracy')
+                if mut_type == 'substitution':
+                    hplens = [math.nan] * len(mutations)
+                else:
+                    hplens = method(returnval='homopolymer_length')
+                for (m, r, acc, hplen) in zip(mutations, sites, accs, hplens):
+                    if mut_type == 'substitution':
+                        (wt, mut) = (m[0], m[-1])
+                    else:
+                        (wt, mut) = ('', '')
+                    rows.append((name, mut_type, r, m, wt, mut, acc, hplen))
+        return rows
+
+    def _assertRowsEqual(self, df, expected):
+        self.assertEqual(len(df), len(expected))
+        actual = list(df.itertuples(index=False, name=None))
+        for (x, y) in zip(actual, expected):
+            self.assertEqual(x[ : 6], y[ : 6])
+            self.assertTrue(numpy.allclose(x[6 : ], y[6 : ], equal_nan=True),
+                    '{0} != {1}'.format(x, y))
+
+    def test_callTable(self):
+        """Same mutations as `call`, with and without `ncpus`."""
+        nmuts = 0
+        for (mapper, alignments, qvals) in self.cases:
+            for kwargs in [{}, {'target_clip':5, 'query_softclip':3}]:
+                mutcaller = dms_tools2.minimap2.MutationCaller(mapper,
+                        **kwargs)
+                for q in [qvals, None]:
+                    if q is None:
+                        expected = self._expected(mutcaller, alignments,
+                                [None] * len(alignments))
+                    else:
+                        expected = self._expected(mutcaller, alignments, q)
+                    nmuts += len(expected)
+                    for ncpus in [1, 2]:
+                        df = mutcaller.callTable(alignments, q, ncpus=ncpus)
+                        self._assertRowsEqual(df, expected)
+        self.assertTrue(nmuts > 0)
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    unittest.main(testRunner=runner)
@@ -0,0 +1,78 @@
+"""Tests `dms_tools2.minimap2.MutationConsensus.callConsensusTable`."""
+
+
+import math
+import random
+import unittest
+
+import pandas
+
+import dms_tools2.minimap2
+
+
+class test_callConsensusTable(unittest.TestCase):
+    """Compare `callConsensusTable` to `callConsensus`."""
+
+    def randomMutations(self, mutation_type):
+        """Random `Mutations` with mutations of `mutation_type`."""
+        tups = {}
+        for _ in range(random.randint(0, 3)):
+            acc = random.choice([math.nan, 0.99, 0.9999, 0.99999])
+            i = random.randint(1, 12)
+            hplen = random.choice([math.nan, 1, 3, 4])
+            if mutation_type == 'substitutions':
+                mut_str = 'A{0}{1}'.format(i, random.choice('CGT'))
+                tups[mut_str] = (i, mut_str, acc)
+            elif mutation_type == 'insertions':
+                length = random.choice([1, 1, 2, 5])
+                mut_str = 'ins{0}len{1}'.format(i, length)
+                tups[mut_str] = (i, length, mut_str, acc, hplen)
+            else:
+                iend = i + random.choice([1, 1, 2, 9, 10, 11]) - 1
+                mut_str = 'del{0}to{1}'.format(i, iend)
+                tups[mut_str] = (i, iend, mut_str, acc, hplen)
+        kwargs = {'substitution_tuples':[], 'insertion_tuples':[],
+                  'deletion_tuples':[]}
+        kwargs[mutation_type[ : -1] + '_tuples'] = list(tups.values())
+        return dms_tools2.minimap2.Mutations(acc_not_q=True, **kwargs)
+
+    def test_callConsensusTable(self):
+        """Test `callConsensusTable` on random mutations."""
+        random.seed(1)
+        for mutcons in [dms_tools2.minimap2.MutationConsensus(),
+                        dms_tools2.minimap2.MutationConsensus(
+                            n_mut=1, min_acc=0.9, homopolymer_calling={})]:
+            for mutation_type in ['substitutions', 'insertions',
+                                  'deletions']:
+                barcodes = {'bc{0}'.format(i):
+                            [self.randomMutations(mutation_type)
+                             for _ in range(random.randint(1, 8))]
+                            for i in range(300)}
+                rows = []
+                for bc, mutationlist in barcodes.items():
+                    for m in mutationlist:
+                        func = getattr(m, mutation_type)
+                        if mutation_type == 'substitutions':
+                            hplens = [math.nan] * len(func())
+                        else:
+                            hplens = func(returnval='homopolymer_length')
+                        rows += zip([bc] * len(hplens), func(),
+                                    func(returnval='accuracy'), hplens)
+                mutations = pandas.DataFrame.from_records(rows,
+                        columns=['barcode', 'mutation', 'accuracy',
+                                 'homopolymer_length'])
+                consensus = mutcons.callConsensusTable(
+                        mutations,
+                        {bc:len(ml) for bc, ml in barcodes.items()},
+                        mutation_type,
+                        include_stats=True)
+                self.assertEqual(list(consensus.barcode), list(barcodes))
+                for bc, c in zip(consensus.barcode, consensus.consensus):
+                    self.assertEqual(c, mutcons.callConsensus(
+                            barcodes[bc], mutation_type,
+                            include_stats=True))
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    unittest.main(testRunner=runner)
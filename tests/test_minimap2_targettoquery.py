@@ -0,0 +1,40 @@
+"""Tests `dms_tools2.minimap2.targetToQueryMap`."""
+
+
+import os
+import glob
+import unittest
+import dms_tools2.minimap2
+
+
+
+class TestTargetToQueryMap(unittest.TestCase):
+    """Tests `targetToQueryMap` gives same sites as `iTargetToQuery`."""
+
+    def test_targetToQueryMap(self):
+        """Same query sites as `iTargetToQuery` for test PAF files."""
+        testdir = os.path.dirname(os.path.abspath(__file__))
+        paf_files = sorted(glob.glob(os.path.join(testdir, '*_files', '**',
+                'alignment.paf'), recursive=True))
+        self.assertTrue(paf_files)
+        nalignments = 0
+        for paf_file in paf_files:
+            for (i, (_, a)) in enumerate(
+                    dms_tools2.minimap2.parsePAF(paf_file)):
+                if i >= 100:
+                    break
+                if '~' in a.cigar_str:
+                    continue # introns not handled
+                t_to_q = dms_tools2.minimap2.targetToQueryMap(a)
+                self.assertEqual(len(t_to_q), a.r_len)
+                expected = [dms_tools2.minimap2.iTargetToQuery(a, i)
+                            for i in range(a.r_len)]
+                self.assertEqual([None if j < 0 else j for j in t_to_q],
+                                 expected)
+                nalignments += 1
+        self.assertTrue(nalignments > 0)
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    unittest.main(testRunner=runner)
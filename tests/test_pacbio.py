@@ -6,6 +6,7 @@ analysis at https://github.com/jbloomlab/IFNsorted_flu_single_cell"""
 
 import os
 import unittest
+import unittest.mock
 
 import pandas
 from pandas.testing import assert_frame_equal
@@ -149,6 +150,55 @@ class test_pacbio(unittest.TestCase):
         assert_frame_equal(alignment_info, expected_alignment_info)
 
 
+    def test_matchAndAlignCCS_ncpus(self):
+        """`dms_tools2.pacbio.matchAndAlignCCS` same with multiple CPUs."""
+
+        cwd = os.path.abspath(os.path.dirname(__file__))
+        indir = f'{cwd}/pacbio_files'
+
+        ccslist = [
+                dms_tools2.pacbio.CCS(
+                    name,
+                    f'{indir}/{name}.bam',
+                    None)
+                for name in ['CCSs-1', 'CCSs-2']]
+
+        mapper = dms_tools2.minimap2.Mapper(
+                f'{indir}/targets.fasta',
+                dms_tools2.minimap2.OPTIONS_VIRUS_W_DEL,
+                )
+
+        mutationcaller = dms_tools2.minimap2.MutationCaller(
+                mapper,
+                query_softclip=10,
+                target_clip=20
+                )
+
+        dfs = []
+        for ncpus in [1, 2]:
+            # so chunks are processed in a pool even on a single CPU
+            with unittest.mock.patch('multiprocessing.cpu_count',
+                                     return_value=ncpus):
+                df_ccs = dms_tools2.pacbio.matchAndAlignCCS(
+                        ccslist=ccslist,
+                        mapper=mapper,
+                        termini5='GCAAAAGCAGG|GCGAAAGCAGG',
+                        gene='N+B',
+                        spacer='AAA(A{19,}){e<=2}AAA',
+                        umi='N{10}',
+                        barcode='N{16}',
+                        termini3='AGATCGGAAGAGCGTCGTGTAG',
+                        mutationcaller=mutationcaller,
+                        ncpus=ncpus
+                        )
+            # alignments and mutations compared by their string forms
+            dfs.append(df_ccs
+                       .reset_index(drop=True)
+                       .apply(lambda col: col.map(repr)
+                              if col.dtype == object else col))
+        self.assertTrue(dfs[0]['gene_aligned'].any())
+        assert_frame_equal(dfs[0], dfs[1])
+
 
 if __name__ == '__main__':
     runner = unittest.TextTestRunner()
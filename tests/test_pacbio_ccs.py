@@ -6,6 +6,7 @@ import unittest
 import copy
 
 import numpy
+import pandas
 import pysam
 
 import dms_tools2.pacbio
@@ -42,6 +43,43 @@ class test_pacbio_CCS(unittest.TestCase):
                     atol=1e-5, rtol=1e-5)
 
 
+    def test_qvalsToSpanAccuracies(self):
+        """Test `qvalsToSpanAccuracies`."""
+        qvals = self.ccs.df.CCS_qvals.tolist()
+        numpy.random.seed(1)
+        reads = numpy.random.randint(0, len(qvals), 500)
+        lengths = numpy.array([len(qvals[i]) for i in reads])
+        starts = (numpy.random.random(500) * lengths).astype('int')
+        ends = starts + ((lengths - starts) *
+                numpy.random.random(500)).astype('int')
+        accs = dms_tools2.pacbio.qvalsToSpanAccuracies(
+                qvals, reads, starts, ends)
+        expected = [dms_tools2.pacbio.qvalsToAccuracy(qvals[i][s : e])
+                    for i, s, e in zip(reads, starts, ends)]
+        numpy.testing.assert_allclose(accs, expected, rtol=1e-10)
+
+
+    def test_iterCCSchunks(self):
+        """Test `iterCCSchunks` and `compact_qvals`."""
+        chunksize = 100
+        chunks = list(dms_tools2.pacbio.iterCCSchunks('test',
+                self.ccs.ccsfile, chunksize))
+        self.assertEqual(len(chunks),
+                         -(-self.bamlines // chunksize))
+        self.assertTrue(all(len(chunk) <= chunksize for chunk in chunks))
+        df = pandas.concat(chunks, ignore_index=True)
+        pandas.testing.assert_frame_equal(
+                df.drop(columns='CCS_qvals'),
+                self.ccs.df.drop(columns='CCS_qvals'))
+        for q_compact, q in zip(df.CCS_qvals, self.ccs.df.CCS_qvals):
+            self.assertEqual(q_compact.dtype, numpy.uint8)
+            numpy.testing.assert_array_equal(q_compact, q)
+
+        ccs_compact = dms_tools2.pacbio.CCS('test', self.ccs.ccsfile,
+                None, compact_qvals=True)
+        self.assertTrue(all(q.base is ccs_compact.df.CCS_qvals[0].base
+                            for q in ccs_compact.df.CCS_qvals))
+
     def test_zmw_report(self):
         """Test creation of `CCS.zmw_report`."""
         self.assertAlmostEqual(
@@ -94,6 +132,25 @@ class test_pacbio_CCS(unittest.TestCase):
 
         self.assertEqual(len(df), 2 * len(ccs2.zmw_report))
 
+    def test_summarizeCCSreports_from_files(self):
+        """Test `summarizeCCSreports` on report files only."""
+        ccs2 = copy.deepcopy(self.ccs)
+        ccs2.samplename = 'test2'
+        expected = dms_tools2.pacbio.summarizeCCSreports(
+                [self.ccs, ccs2], 'subread', None)[0]
+
+        for ncpus in [1, 2]:
+            df = dms_tools2.pacbio.summarizeCCSreports(
+                    {'test':self.ccs.reportfile, 'test2':ccs2.reportfile},
+                    'subread', None, ncpus=ncpus, plot=False)
+            pandas.testing.assert_frame_equal(df, expected)
+
+        zmw_report, subread_report = dms_tools2.pacbio.parseCCSreport(
+                self.ccs.reportfile)
+        pandas.testing.assert_frame_equal(zmw_report, self.ccs.zmw_report)
+        pandas.testing.assert_frame_equal(subread_report,
+                                          self.ccs.subread_report)
+
 
 
 if __name__ == '__main__':
@@ -0,0 +1,102 @@
+"""Tests aligning CCSs in both orientations in `dms_tools2.pacbio`.
+
+Compares `_alignCCSBothOrientations` to aligning every CCS in both
+orientations and using the reverse-complement alignment only when
+there is no forward one.
+"""
+
+
+import os
+import unittest
+import pandas
+from pandas.testing import assert_frame_equal
+import dms_tools2.utils
+import dms_tools2.pacbio
+import dms_tools2.minimap2
+
+
+
+def _alignBothOrientations(df, mapper):
+    """Align all CCSs forward and reverse complemented."""
+    df_bi = (df.pipe(dms_tools2.pacbio.alignSeqs,
+                     mapper=mapper,
+                     query_col='CCS',
+                     aligned_col='CCS_for_aligned')
+               .assign(CCS_rev=lambda x: x.CCS.map(
+                       dms_tools2.utils.reverseComplement))
+               .pipe(dms_tools2.pacbio.alignSeqs,
+                     mapper=mapper,
+                     query_col='CCS_rev',
+                     aligned_col='CCS_rev_aligned')
+               )
+    return (df.assign(CCS_aligned=df_bi.CCS_for_aligned |
+                      df_bi.CCS_rev_aligned)
+            .assign(CCS_aligned_alignment=
+                    df_bi.CCS_for_aligned_alignment.where(
+                    df_bi.CCS_for_aligned,
+                    df_bi.CCS_rev_aligned_alignment))
+            .assign(CCS_aligned_target=lambda x:
+                    x.CCS_aligned_alignment.map(
+                    lambda x: x.target if x is not None else ''))
+            )
+
+
+class TestAlignCCSBothOrientations(unittest.TestCase):
+    """Tests `_alignCCSBothOrientations`."""
+
+    #: number of CCSs from the test BAM file
+    NCCS = 300
+
+    def setUp(self):
+        """CCSs as sequenced, reverse complemented, and unalignable."""
+        indir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'pacbio_files')
+        self.mapper = dms_tools2.minimap2.Mapper(
+                os.path.join(indir, 'targets.fasta'),
+                dms_tools2.minimap2.OPTIONS_VIRUS_W_DEL)
+        df = (dms_tools2.pacbio.CCS('CCSs-1',
+                                    os.path.join(indir, 'CCSs-1.bam'),
+                                    None)
+              .df
+              .head(self.NCCS)
+              [['name', 'samplename', 'CCS']]
+              )
+        self.df = pandas.concat([
+                df,
+                df.assign(name=lambda x: x.name + '_rc',
+                          CCS=lambda x: x.CCS.map(
+                                dms_tools2.utils.reverseComplement)),
+                pandas.DataFrame({'name':['unaligned'],
+                                  'samplename':['CCSs-1'],
+                                  'CCS':['ACGT' * 50]}),
+                ], ignore_index=True, sort=False)
+
+    def test_alignCCSBothOrientations(self):
+        """Same alignments as aligning every CCS in both orientations."""
+        expected = _alignBothOrientations(self.df, self.mapper)
+        # some CCSs align only forward, only reverse, or not at all
+        for_aligned = dms_tools2.pacbio.alignSeqs(self.df,
+                mapper=self.mapper, query_col='CCS',
+                aligned_col='for_aligned')['for_aligned']
+        self.assertTrue(for_aligned.any())
+        self.assertTrue((expected['CCS_aligned'] & ~for_aligned).any())
+        self.assertFalse(expected['CCS_aligned'].all())
+
+        actual = dms_tools2.pacbio._alignCCSBothOrientations(self.df,
+                                                             self.mapper)
+        assert_frame_equal(actual, expected)
+
+    def test_allAlignForward(self):
+        """No reverse alignment if all CCSs align forward."""
+        expected = _alignBothOrientations(self.df, self.mapper)
+        df = self.df[dms_tools2.pacbio.alignSeqs(self.df,
+                mapper=self.mapper, query_col='CCS',
+                aligned_col='for_aligned')['for_aligned'].values]
+        assert_frame_equal(
+                dms_tools2.pacbio._alignCCSBothOrientations(df, self.mapper),
+                expected[expected.name.isin(df.name)])
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    unittest.main(testRunner=runner)
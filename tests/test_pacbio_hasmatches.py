@@ -0,0 +1,115 @@
+"""Tests `dms_tools2.pacbio.hasMatches`.
+
+Compares to searching each sequence and its reverse complement
+with the full fuzzy pattern, as :meth:`dms_tools2.pacbio.matchSeqs`
+does.
+"""
+
+
+import random
+import unittest
+import regex
+import pandas
+import dms_tools2.utils
+import dms_tools2.pacbio
+
+
+
+#: fuzzy constraints combined with quantifiers and alternation
+MATCH_STRS = {
+        'has_polyA':'AAA(A{15,}){e<=2}AAA',
+        'has_termini5':'(?P<termini5>GCAAAAGCAGG|GCGAAAGCAGG){e<=2}',
+        'has_repeat':'((?:CAT){3,5}){e<=1}',
+        'has_pair':'(?P<t>ACGTTGCA){e<=1}N{3,8}(?P<u>GGATCC){s<=1}',
+        'has_ambiguous':'(?P<t>RCGTYNNAC){i<=1,d<=1}',
+        'has_exact':'GGTACC',
+        }
+
+#: motifs that give near matches to the patterns in `MATCH_STRS`
+MOTIFS = ['AAA' + 'A' * 16 + 'AAA', 'GCAAAAGCAGG', 'GCGAAAGCAGG',
+          'CATCATCATCAT', 'ACGTTGCA' + 'GTCAG' + 'GGATCC', 'ACGTCTCAC',
+          'GGTACC']
+
+
+def _mutate(seq, nmuts):
+    """Make `nmuts` random substitutions, insertions, or deletions."""
+    seq = list(seq)
+    for _ in range(nmuts):
+        i = random.randrange(len(seq))
+        mut_type = random.choice(['sub', 'ins', 'del'])
+        if mut_type == 'sub':
+            seq[i] = random.choice('ACGT')
+        elif mut_type == 'ins':
+            seq.insert(i, random.choice('ACGT'))
+        elif len(seq) > 1:
+            del seq[i]
+    return ''.join(seq)
+
+
+def _hasMatch(match_str, seqs):
+    """Does full fuzzy pattern match each sequence or its complement?"""
+    matcher = regex.compile(dms_tools2.pacbio.re_expandIUPAC(match_str),
+                            flags=regex.BESTMATCH)
+    return [bool(matcher.search(s) or
+                 matcher.search(dms_tools2.utils.reverseComplement(s)))
+            for s in seqs]
+
+
+class TestHasMatches(unittest.TestCase):
+    """Tests `hasMatches` against one search per pattern."""
+
+    def setUp(self):
+        """Random sequences with motifs carrying up to four errors."""
+        random.seed(1)
+        seqs = []
+        for _ in range(3000):
+            s = ''.join(random.choice('ACGT') for _ in range(
+                    random.randint(10, 80)))
+            for _ in range(random.randint(0, 2)):
+                motif = _mutate(random.choice(MOTIFS), random.randint(0, 4))
+                if random.random() < 0.5:
+                    motif = dms_tools2.utils.reverseComplement(motif)
+                i = random.randint(0, len(s))
+                s = s[ : i] + motif + s[i : ]
+            seqs.append(s)
+        self.df = pandas.DataFrame({'CCS':seqs})
+
+    def test_hasMatches(self):
+        """Same matches as searching with each full pattern."""
+        df = dms_tools2.pacbio.hasMatches(self.df,
+                dict(MATCH_STRS, has_none=None), 'CCS')
+        self.assertNotIn('has_none', df.columns)
+        for col, match_str in MATCH_STRS.items():
+            expected = _hasMatch(match_str, self.df['CCS'])
+            self.assertEqual(df[col].tolist(), expected, col)
+            # some matches and non-matches, including fuzzy ones
+            self.assertTrue(0 < sum(expected) < len(expected), col)
+            if col != 'has_exact':
+                exact = _hasMatch(dms_tools2.pacbio._FUZZY_CONSTRAINT_MATCH
+                                  .sub('', match_str), self.df['CCS'])
+                self.assertNotEqual(exact, expected, col)
+
+    def test_hasMatches_implied_by(self):
+        """Rows in `implied_by` are `True` and others are searched."""
+        implied = [random.random() < 0.3 for _ in range(len(self.df))]
+        df = dms_tools2.pacbio.hasMatches(self.df.assign(implied=implied),
+                MATCH_STRS, 'CCS', implied_by='implied')
+        for col, match_str in MATCH_STRS.items():
+            expected = [imp or m for imp, m in
+                        zip(implied, _hasMatch(match_str, self.df['CCS']))]
+            self.assertEqual(df[col].tolist(), expected, col)
+
+    def test_hasMatches_overwrite(self):
+        """Error if adding existing column unless `overwrite`."""
+        df = self.df.assign(has_exact=False)
+        with self.assertRaises(ValueError):
+            dms_tools2.pacbio.hasMatches(df, MATCH_STRS, 'CCS')
+        df = dms_tools2.pacbio.hasMatches(df, MATCH_STRS, 'CCS',
+                                          overwrite=True)
+        self.assertEqual(df['has_exact'].tolist(),
+                         _hasMatch(MATCH_STRS['has_exact'], self.df['CCS']))
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    unittest.main(testRunner=runner)
@@ -0,0 +1,85 @@
+"""Tests Arrow / Parquet output in `dms_tools2.pacbio`."""
+
+
+import os
+import unittest
+
+import numpy
+import pandas
+
+import dms_tools2.pacbio
+import dms_tools2.minimap2
+
+try:
+    import pyarrow
+    _has_pyarrow = True
+except ImportError:
+    _has_pyarrow = False
+
+
+@unittest.skipUnless(_has_pyarrow, 'requires `pyarrow`')
+class test_pacbio_parquet(unittest.TestCase):
+    """Tests `writeParquet` and `readParquet`."""
+
+    def setUp(self):
+        """Align some CCSs and call mutations."""
+        cwd = os.path.abspath(os.path.dirname(__file__))
+        indir = f'{cwd}/pacbio_files'
+        self.testdir = os.path.join(cwd, 'test_pacbio_parquet_files')
+        os.makedirs(self.testdir, exist_ok=True)
+
+        ccs = dms_tools2.pacbio.CCS('CCSs-1', f'{indir}/CCSs-1.bam', None)
+        mapper = dms_tools2.minimap2.Mapper(
+                f'{indir}/targets.fasta',
+                dms_tools2.minimap2.OPTIONS_VIRUS_W_DEL)
+        mutationcaller = dms_tools2.minimap2.MutationCaller(mapper)
+        self.df = (ccs.df
+                   .head(500)
+                   .pipe(dms_tools2.pacbio.alignSeqs,
+                         mapper=mapper,
+                         query_col='CCS',
+                         aligned_col='CCS_aligned',
+                         mutationcaller=mutationcaller)
+                   )
+        self.assertTrue(self.df.CCS_aligned.any())
+        self.assertFalse(self.df.CCS_aligned.all())
+
+    def test_roundtrip(self):
+        """Write and read Parquet file."""
+        parquetfile = os.path.join(self.testdir, 'aligned.parquet')
+        dms_tools2.pacbio.writeParquet(self.df, parquetfile)
+
+        df = dms_tools2.pacbio.readParquet(parquetfile)
+        self.assertEqual(list(df.columns), list(self.df.columns))
+        pandas.testing.assert_frame_equal(
+                df.drop(columns=['CCS_qvals', 'CCS_aligned_alignment',
+                                 'CCS_aligned_mutations']),
+                self.df.drop(columns=['CCS_qvals', 'CCS_aligned_alignment',
+                                      'CCS_aligned_mutations']),
+                check_dtype=False)
+        self.assertEqual(df.CCS_aligned_alignment.tolist(),
+                         self.df.CCS_aligned_alignment.tolist())
+        self.assertEqual(df.CCS_aligned_mutations.map(str).tolist(),
+                         self.df.CCS_aligned_mutations.map(str).tolist())
+        for q, q_expected in zip(df.CCS_qvals, self.df.CCS_qvals):
+            self.assertEqual(q.dtype, numpy.uint8)
+            numpy.testing.assert_array_equal(q, q_expected)
+
+        # read just some columns
+        df_targets = dms_tools2.pacbio.readParquet(parquetfile,
+                columns=['name', 'CCS_aligned_alignment.target'])
+        self.assertEqual(list(df_targets.columns),
+                         ['name', 'CCS_aligned_alignment.target'])
+        self.assertEqual(
+                df_targets['CCS_aligned_alignment.target'].tolist(),
+                [None if a is None else a.target
+                 for a in self.df.CCS_aligned_alignment])
+        df_alignments = dms_tools2.pacbio.readParquet(parquetfile,
+                columns=['CCS_aligned_alignment'])
+        self.assertEqual(df_alignments.CCS_aligned_alignment.tolist(),
+                         self.df.CCS_aligned_alignment.tolist())
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    unittest.main(testRunner=runner)
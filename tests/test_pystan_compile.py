@@ -1,7 +1,10 @@
 """Tests compilation of ``pystan`` models."""
 
 
+import os
+import tempfile
 import unittest
+import unittest.mock
 import dms_tools2.prefs
 
 
@@ -37,6 +40,65 @@ class test_pyStanModels_Different(test_pyStanModels):
         m = self.MODEL(verbose=True)
         self.assertTrue(m is not None)
 
+
+class test_pyStanModelCache(unittest.TestCase):
+    """Tests on-disk cache of compiled ``pystan`` models."""
+
+    def test_pystan_cache(self):
+        """Compiled model is re-used from on-disk cache."""
+        cachedir_orig = dms_tools2.prefs.STAN_MODEL_CACHE_DIR
+        models_orig = dict(dms_tools2.prefs._STAN_MODELS)
+        try:
+            with tempfile.TemporaryDirectory() as cachedir:
+                dms_tools2.prefs.STAN_MODEL_CACHE_DIR = cachedir
+                dms_tools2.prefs._STAN_MODELS.clear()
+                m = dms_tools2.prefs.StanModelNoneErr()
+                self.assertEqual(len(os.listdir(cachedir)), 1)
+
+                # load in "new process" from disk rather than compiling
+                dms_tools2.prefs._STAN_MODELS.clear()
+                with unittest.mock.patch('pystan.StanModel') as stanmodel:
+                    m2 = dms_tools2.prefs.StanModelNoneErr()
+                    self.assertEqual(stanmodel.call_count, 0)
+                self.assertEqual(len(os.listdir(cachedir)), 1)
+                self.assertEqual(m.model.model_code, m2.model.model_code)
+                fit = m2.model.sampling(data={'Nchar':2, 'nrpre':[5, 5],
+                        'nrpost':[2, 8], 'pir_prior_params':[1, 1],
+                        'mur_prior_params':[1, 1]}, iter=100, chains=1)
+                self.assertIn('pir', fit.extract())
+        finally:
+            dms_tools2.prefs.STAN_MODEL_CACHE_DIR = cachedir_orig
+            dms_tools2.prefs._STAN_MODELS.clear()
+            dms_tools2.prefs._STAN_MODELS.update(models_orig)
+
+    def test_pystan_cache_unreadable(self):
+        """Unreadable cache file is replaced by re-compiled model."""
+        cachedir_orig = dms_tools2.prefs.STAN_MODEL_CACHE_DIR
+        models_orig = dict(dms_tools2.prefs._STAN_MODELS)
+        try:
+            with tempfile.TemporaryDirectory() as cachedir:
+                dms_tools2.prefs.STAN_MODEL_CACHE_DIR = cachedir
+                with unittest.mock.patch('pystan.StanModel',
+                                         return_value='model1'):
+                    dms_tools2.prefs._cachedStanModel('code')
+                (cachefile,) = os.listdir(cachedir)
+                with open(os.path.join(cachedir, cachefile), 'wb') as f:
+                    f.write(b'')
+                dms_tools2.prefs._STAN_MODELS.clear()
+                with unittest.mock.patch('pystan.StanModel',
+                                         return_value='model2') as stanmodel:
+                    self.assertEqual('model2',
+                            dms_tools2.prefs._cachedStanModel('code'))
+                    self.assertEqual(stanmodel.call_count, 1)
+                self.assertEqual(os.listdir(cachedir), [cachefile])
+                self.assertEqual('model2', dms_tools2.prefs._readCacheFile(
+                        os.path.join(cachedir, cachefile)))
+        finally:
+            dms_tools2.prefs.STAN_MODEL_CACHE_DIR = cachedir_orig
+            dms_tools2.prefs._STAN_MODELS.clear()
+            dms_tools2.prefs._STAN_MODELS.update(models_orig)
+
+
 if __name__ == '__main__':
     runner = unittest.TextTestRunner()
     unittest.main(testRunner=runner)
@@ -3,6 +3,8 @@
 
 import sys
 import os
+import shutil
+import tempfile
 import unittest
 import random
 import numpy
@@ -32,6 +34,13 @@ class TestInferSitePreferences(unittest.TestCase):
     def setUp(self):
         """Configuration information for test."""
         self.n_jobs = -1
+        self.cachedir = tempfile.mkdtemp()
+        self.old_cachedir = dms_tools2.prefs.SITE_PREFS_CACHE_DIR
+        dms_tools2.prefs.SITE_PREFS_CACHE_DIR = self.cachedir
+
+    def tearDown(self):
+        dms_tools2.prefs.SITE_PREFS_CACHE_DIR = self.old_cachedir
+        shutil.rmtree(self.cachedir)
 
     def test_inferSitePrefs(self):
         """Inference with with correct priors."""
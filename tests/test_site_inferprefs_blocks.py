@@ -0,0 +1,84 @@
+"""Tests block-wise continuation of MCMC in `inferSitePrefs`."""
+
+
+import os
+import re
+import shutil
+import tempfile
+import unittest
+import numpy
+import dms_tools2.prefs
+from dms_tools2 import NTS
+
+
+
+class TestInferSitePrefsBlocks(unittest.TestCase):
+    """Tests MCMC stops once converged and otherwise runs to cap."""
+
+    SEED = 1
+    CHARLIST = NTS
+
+    def setUp(self):
+        """Simulate counts and priors for a site with no errors."""
+        self.testdir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.testdir) # non-converged runs write debug pickle
+        self.old_cachedir = dms_tools2.prefs.SITE_PREFS_CACHE_DIR
+        dms_tools2.prefs.SITE_PREFS_CACHE_DIR = self.testdir
+        numpy.random.seed(self.SEED)
+        nchars = len(self.CHARLIST)
+        self.wtchar = self.CHARLIST[0]
+        mur = numpy.random.uniform(0.005 / nchars, 0.025 / nchars, nchars)
+        mur[0] = 1 - mur[1 : ].sum()
+        pir = numpy.random.uniform(1e-5, 0.6, nchars)
+        pir /= pir.sum()
+        depth = 1e7
+        nrpre = numpy.random.multinomial(depth, mur)
+        nrpost = numpy.random.multinomial(depth, mur * pir / mur.dot(pir))
+        self.counts = {
+                'pre':dict(zip(self.CHARLIST, nrpre)),
+                'post':dict(zip(self.CHARLIST, nrpost)),
+                }
+        self.priors = {
+                'pir_prior_params':dict(zip(self.CHARLIST, pir * nchars)),
+                'mur_prior_params':dict(zip(self.CHARLIST, mur * nchars)),
+                }
+
+    def tearDown(self):
+        dms_tools2.prefs.SITE_PREFS_CACHE_DIR = self.old_cachedir
+        os.chdir(self.cwd)
+        shutil.rmtree(self.testdir)
+
+    def _steps(self, logstring):
+        """Number of steps per chain at each convergence check."""
+        return [int(n) for n in re.findall(
+                r'MCMC chains each of (\d+) steps', logstring)]
+
+    def test_StopsEarly(self):
+        """Converged MCMC stops after its first block."""
+        (converged, pi_means, pi_95credint, logstring) = \
+                dms_tools2.prefs.inferSitePrefs(self.CHARLIST, self.wtchar,
+                'none', self.counts, self.priors, niter=2000, nblocks=4)
+        self.assertTrue(converged, logstring)
+        self.assertEqual(self._steps(logstring), [1000 + 250])
+        self.assertTrue(numpy.allclose(sum(pi_means.values()), 1))
+        for c in self.CHARLIST:
+            (lower, upper) = pi_95credint[c]
+            self.assertTrue(lower <= pi_means[c] <= upper)
+
+    def test_RunsToCap(self):
+        """Non-converged MCMC continues until block cap is reached."""
+        (converged, pi_means, pi_95credint, logstring) = \
+                dms_tools2.prefs.inferSitePrefs(self.CHARLIST, self.wtchar,
+                'none', self.counts, self.priors, niter=200, nblocks=2,
+                neff_min=1e9, increasetries=1, increasefac=2)
+        self.assertFalse(converged, logstring)
+        # 100 warmup; 100 draws in 2 blocks; then continue to 200 draws
+        self.assertEqual(self._steps(logstring), [150, 200, 250, 300])
+        self.assertIn('MCMC FAILED to converge', logstring)
+        self.assertTrue(os.path.isfile('_no_converge_prefs_debug.pickle'))
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    unittest.main(testRunner=runner)
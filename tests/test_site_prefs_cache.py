@@ -0,0 +1,110 @@
+"""Tests on-disk cache of `dms_tools2.prefs.inferSitePrefs` results."""
+
+
+import os
+import glob
+import shutil
+import tempfile
+import unittest
+import dms_tools2.prefs
+from dms_tools2 import NTS
+
+
+
+class TestSitePrefsCache(unittest.TestCase):
+    """Tests converged results are cached by their inputs."""
+
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.cwd = os.getcwd()
+        os.chdir(self.cachedir) # non-converged runs write debug pickle
+        self.old_cachedir = dms_tools2.prefs.SITE_PREFS_CACHE_DIR
+        dms_tools2.prefs.SITE_PREFS_CACHE_DIR = self.cachedir
+        self.counts = {
+                'pre':dict(zip(NTS, [100000, 300, 300, 300])),
+                'post':dict(zip(NTS, [100000, 900, 100, 10])),
+                }
+        self.priors = {
+                'pir_prior_params':dict((c, 1.0) for c in NTS),
+                'mur_prior_params':dict(zip(NTS,
+                        [4 * 0.99] + [0.04 / 3] * 3)),
+                }
+
+    def tearDown(self):
+        dms_tools2.prefs.SITE_PREFS_CACHE_DIR = self.old_cachedir
+        os.chdir(self.cwd)
+        shutil.rmtree(self.cachedir)
+
+    def _cachefiles(self):
+        return glob.glob(os.path.join(self.cachedir, '*',
+                'siteprefs_*.pickle'))
+
+    def _infer(self, counts, cache=True, **kwargs):
+        return dms_tools2.prefs.inferSitePrefs(NTS, 'A', 'none', counts,
+                self.priors, niter=1000, cache=cache, **kwargs)
+
+    def test_Cache(self):
+        """Results re-used only when inputs unchanged."""
+        result = self._infer(self.counts)
+        self.assertTrue(result[0], result[3])
+        self.assertEqual(len(self._cachefiles()), 1)
+        self.assertNotIn('cached', result[3])
+
+        # same inputs read from cache
+        cached = self._infer(self.counts)
+        self.assertIn('Using result cached', cached[3])
+        self.assertEqual(cached[ : 3], result[ : 3])
+
+        # different counts or seed are re-sampled and cached separately
+        newcounts = dict(self.counts)
+        newcounts['post'] = dict(zip(NTS, [100000, 900, 100, 11]))
+        for (counts, kwargs) in [(newcounts, {}), (self.counts, {'seed':2})]:
+            newresult = self._infer(counts, **kwargs)
+            self.assertNotIn('cached', newresult[3])
+            self.assertNotEqual(newresult[1], result[1])
+        self.assertEqual(len(self._cachefiles()), 3)
+
+        # no cache if not requested
+        uncached = dms_tools2.prefs.inferSitePrefs(NTS, 'A', 'none',
+                self.counts, self.priors, niter=1000)
+        self.assertNotIn('cached', uncached[3])
+        self.assertEqual(uncached[ : 3], result[ : 3])
+
+        # corrupted cache files are ignored and rewritten
+        for f in self._cachefiles():
+            with open(f, 'wb') as fout:
+                fout.write(b'corrupted')
+        rerun = self._infer(self.counts)
+        self.assertNotIn('cached', rerun[3])
+        self.assertEqual(rerun[ : 3], result[ : 3])
+        self.assertIn('cached', self._infer(self.counts)[3])
+
+    def test_NotConverged(self):
+        """Results that do not converge are not cached."""
+        result = self._infer(self.counts, neff_min=1e9, increasetries=0)
+        self.assertFalse(result[0])
+        self.assertEqual(self._cachefiles(), [])
+        self.assertEqual(glob.glob(os.path.join(self.cachedir, '*',
+                '*.tmp')), [])
+
+    def test_CacheDir(self):
+        """Results cached in directory given by `cache`."""
+        cachedir = os.path.join(self.cachedir, 'other')
+        result = self._infer(self.counts, cache=cachedir)
+        self.assertEqual(self._cachefiles(), [])
+        self.assertEqual(len(glob.glob(os.path.join(cachedir, '*',
+                'siteprefs_*.pickle'))), 1)
+        self.assertIn('cached', self._infer(self.counts,
+                cache=cachedir)[3])
+
+        # worker does not cache by default
+        dms_tools2.prefs.initSitePrefsWorker('none')
+        (_, _, workerresult) = dms_tools2.prefs.inferSitePrefsWorker(0, NTS,
+                'A', self.counts, self.priors, niter=1000)
+        self.assertNotIn('cached', workerresult[3])
+        self.assertEqual(self._cachefiles(), [])
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    unittest.main(testRunner=runner)
@@ -0,0 +1,75 @@
+"""Tests `dms_tools2.prefs.serveSitePrefsPool`."""
+
+
+import os
+import shutil
+import tempfile
+import unittest
+import multiprocessing.dummy
+import numpy
+import dms_tools2.prefs
+from dms_tools2 import NTS
+
+
+
+class TestSitePrefsPool(unittest.TestCase):
+    """Tests inferring sites from several threads in a served pool."""
+
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.old_cachedir = dms_tools2.prefs.SITE_PREFS_CACHE_DIR
+        dms_tools2.prefs.SITE_PREFS_CACHE_DIR = self.cachedir
+
+    def tearDown(self):
+        dms_tools2.prefs.SITE_PREFS_CACHE_DIR = self.old_cachedir
+        shutil.rmtree(self.cachedir)
+
+    def test_SitePrefsPool(self):
+        """Sites inferred in a shared pool."""
+        (manager, address, authkey) = dms_tools2.prefs.serveSitePrefsPool(
+                'none', 2)
+        try:
+            # address and key are strings that can be environment variables
+            self.assertTrue(os.path.isabs(address))
+            self.assertTrue(os.path.exists(address))
+            self.assertEqual(len(bytes.fromhex(authkey)), 16)
+            sitepool = dms_tools2.prefs.connectSitePrefsPool(address, authkey)
+            priors = {
+                    'pir_prior_params':dict((c, 1.0) for c in NTS),
+                    'mur_prior_params':dict(zip(NTS,
+                            [4 * 0.99] + [0.04 / 3] * 3)),
+                    }
+            argslist = []
+            for (site, post) in enumerate([[100000, 900, 100, 10],
+                                           [100000, 10, 1000, 1000],
+                                           [100000, 300, 300, 300]]):
+                counts = {
+                        'pre':dict(zip(NTS, [100000, 300, 300, 300])),
+                        'post':dict(zip(NTS, post)),
+                        }
+                argslist.append((site, NTS, 'A', counts, priors, site + 1,
+                        2000))
+            threads = multiprocessing.dummy.Pool(len(argslist))
+            results = threads.starmap(sitepool.infer, argslist)
+            threads.close()
+            threads.join()
+            for ((site, seed, result), args) in zip(results, argslist):
+                self.assertEqual((site, seed), (args[0], args[5]))
+                (converged, pi_means, pi_95credint, logstring) = result
+                self.assertTrue(converged, logstring)
+                post = numpy.array([args[3]['post'][c] for c in NTS])
+                pre = numpy.array([args[3]['pre'][c] for c in NTS])
+                ratio = (post / post.sum()) / (pre / pre.sum())
+                self.assertTrue(numpy.allclose([pi_means[c] for c in NTS],
+                        ratio / ratio.sum(), atol=0.05))
+            # errors in workers are raised by caller
+            with self.assertRaises(KeyError):
+                sitepool.infer(0, NTS, 'A', {'pre':{}}, priors)
+        finally:
+            manager.shutdown()
+        self.assertFalse(os.path.exists(address))
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    unittest.main(testRunner=runner)
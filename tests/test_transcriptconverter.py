@@ -0,0 +1,145 @@
+"""Tests `dms_tools2.seqnumbering.TranscriptConverter`.
+
+Compares to conversions computed directly from the ``Bio.SeqFeature``
+objects as :class:`TranscriptConverter` did before it precomputed
+its lookups.
+"""
+
+
+import os
+import io
+import random
+import unittest
+import Bio.SeqUtils
+from dms_tools2 import NTS
+import dms_tools2.seqnumbering
+
+
+
+#: chromosome with CDSs on the minus strand, one spliced
+MINUS_STRAND_GENBANK = """
+LOCUS       minus                    120 bp    DNA              UNK 01-JAN-1980
+FEATURES             Location/Qualifiers
+     mRNA            complement(3..110)
+                     /label="m1"
+     CDS             complement(10..102)
+                     /label="c1"
+     mRNA            complement(join(3..40,61..110))
+                     /label="m2"
+     CDS             complement(join(10..40,61..102))
+                     /label="c2"
+ORIGIN
+        1 agttacttat tagcgcatgc cctgaacctt cgcaagtcgt gaatcagcac tggtaggact
+       61 cgtaaacgca tcgggctttg tcagcagttc gaagaccata ctaatcccac ttaggagcag
+//
+"""
+
+
+def _i_mRNAtoChromosome(converter, mRNA, i, mRNAfragment=None):
+    """Site in chromosome computed from `Bio.SeqFeature`."""
+    chromosome = converter.chromosomes[converter.mRNA_chromosome[mRNA]]
+    feature = converter.mRNAs[mRNA]
+    if mRNAfragment:
+        i += feature.extract(chromosome).seq.find(mRNAfragment.upper())
+    return list(feature)[i - 1] + 1
+
+
+def _aaSubstitutions(converter, chromosome, mutation, aa_3letter):
+    """Amino-acid substitutions by translating mutant CDSs."""
+    (wt, i, mut) = mutation
+    seq = converter.chromosomes[chromosome].seq
+    mut_seq = seq.tomutable()
+    mut_seq[i - 1] = mut
+    mutstring = []
+    for cds_name in converter.chromosome_CDSs[chromosome]:
+        cds = converter.CDSs[cds_name]
+        if (i - 1) in cds:
+            wtprot = cds.extract(seq).translate()
+            mutprot = cds.extract(mut_seq).translate()
+            for (r0, (wt_aa, mut_aa)) in enumerate(zip(wtprot, mutprot)):
+                if wt_aa != mut_aa:
+                    if aa_3letter:
+                        wt_aa = Bio.SeqUtils.seq3(wt_aa)
+                        mut_aa = Bio.SeqUtils.seq3(mut_aa)
+                    mutstring.append('{0}-{1}{2}{3}'.format(cds_name,
+                            wt_aa, r0 + 1, mut_aa))
+    return '_'.join(mutstring)
+
+
+class TestTranscriptConverter(unittest.TestCase):
+    """Compare conversions to those computed from features."""
+
+    def setUp(self):
+        testdir = os.path.dirname(os.path.abspath(__file__))
+        self.converters = [
+                dms_tools2.seqnumbering.TranscriptConverter(
+                    os.path.join(testdir, 'pacbio_files', 'flu-wsn.gb'),
+                    ignore_other_features=True),
+                dms_tools2.seqnumbering.TranscriptConverter(
+                    io.StringIO(MINUS_STRAND_GENBANK)),
+                ]
+        self.assertTrue(any(cds.location.strand == -1 for cds in
+                self.converters[1].CDSs.values()))
+
+    def test_i_mRNAtoChromosome(self):
+        """Sites in full mRNAs and fragments of them."""
+        random.seed(1)
+        for converter in self.converters:
+            for mRNA in converter.mRNAs:
+                chromosome = converter.chromosomes[
+                        converter.mRNA_chromosome[mRNA]]
+                mRNA_seq = str(converter.mRNAs[mRNA].extract(
+                        chromosome).seq)
+                for i in range(1, len(mRNA_seq) + 1):
+                    self.assertEqual(
+                            converter.i_mRNAtoChromosome(mRNA, i),
+                            _i_mRNAtoChromosome(converter, mRNA, i))
+                with self.assertRaises(ValueError):
+                    converter.i_mRNAtoChromosome(mRNA, len(mRNA_seq) + 1)
+                # fragments long enough to be unique in the mRNA
+                for _ in range(5):
+                    start = random.randint(0, len(mRNA_seq) - 40)
+                    fragment = mRNA_seq[start : start + 40].lower()
+                    if mRNA_seq.count(fragment.upper()) != 1:
+                        continue
+                    for i in range(1, 41):
+                        self.assertEqual(
+                                converter.i_mRNAtoChromosome(mRNA, i,
+                                    mRNAfragment=fragment),
+                                _i_mRNAtoChromosome(converter, mRNA, i,
+                                    fragment))
+
+    def test_aaSubstitutions(self):
+        """Amino-acid substitutions for all point mutations in CDSs."""
+        for converter in self.converters:
+            nmuts = 0
+            for (chromosome, cds_names) in converter.chromosome_CDSs.items():
+                seq = str(converter.chromosomes[chromosome].seq)
+                sites = sorted(set(i + 1 for cds_name in cds_names
+                        for i in converter.CDSs[cds_name].location))
+                if converter is self.converters[0]:
+                    sites = sites[ : : 7] # subsample for speed
+                for i in sites:
+                    wt = seq[i - 1]
+                    self.assertEqual(converter.ntIdentity(chromosome, i), wt)
+                    for mut in NTS:
+                        if mut == wt:
+                            continue
+                        for aa_3letter in [True, False]:
+                            expected = _aaSubstitutions(converter,
+                                    chromosome, (wt, i, mut), aa_3letter)
+                            self.assertEqual(expected,
+                                    converter.aaSubstitutions(chromosome,
+                                    '{0}{1}{2}'.format(wt, i, mut),
+                                    aa_3letter=aa_3letter))
+                            # repeat to check memoized result
+                            self.assertEqual(expected,
+                                    converter.aaSubstitutions(chromosome,
+                                    (wt, i, mut), aa_3letter=aa_3letter))
+                            nmuts += bool(expected)
+            self.assertTrue(nmuts > 0)
+
+
+if __name__ == '__main__':
+    runner = unittest.TextTestRunner()
+    unittest.main(testRunner=runner)